@@ -1,11 +1,19 @@
 import requests
-import json
+from urllib3.util.retry import Retry
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
 class ApiClient:
     def __init__(self, api_key):
         self.api_key = api_key
         self.base_url = "https://api.bitcoin.de/v4"
+        # Keep-alive Session: die Kurse aller Paare gehen über dieselben Verbindungen
+        self.session = requests.Session()
+        # Kurse sind reine GET-Anfragen: bei 429/5xx und Verbindungsfehlern mit Backoff wiederholen
+        retries = Retry(total=2, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+                        allowed_methods=('GET',), raise_on_status=False)
+        self.session.mount('https://', requests.adapters.HTTPAdapter(pool_maxsize=10, max_retries=retries))
+        self.timeout = (5, 15)  # Verbindungsaufbau, Antwort (Sekunden)
 
     def get_basic_rates(self, trading_pair):
         """Get rates using Basic API"""
@@ -13,15 +21,31 @@ class ApiClient:
             url = f"{self.base_url}/{trading_pair}/basic/rate.json"
             params = {'apikey': self.api_key}
             
-            response = requests.get(url, params=params)
+            response = self.session.get(url, params=params, timeout=self.timeout)
             response.raise_for_status()
             
             data = response.json()
-            logging.info(f"Fetched rates for {trading_pair}: {json.dumps(data, indent=2)}")
+            logging.info(f"Fetched rates for {trading_pair}")
+            logging.debug("Antwort %s: %s", trading_pair, data)  # nur formatiert, wenn DEBUG aktiv ist
             return data
             
         except Exception as e:
             logging.error(f"Fehler beim Abrufen der Basisraten: {str(e)}")
             if hasattr(e, 'response'):
-                logging.error(f"Antwortinhalt: {e.response.text}")
-            raise
\ No newline at end of file
+                logging.error(f"Antwortinhalt: {e.response.text[:500]}")
+            raise
+
+    def get_basic_rates_many(self, trading_pairs, max_workers=10):
+        """Get the rates of several trading pairs concurrently, returns {trading_pair: response}"""
+        trading_pairs = list(trading_pairs)
+        if not trading_pairs:
+            return {}
+        rates = {}
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(trading_pairs))) as executor:
+            futures = {executor.submit(self.get_basic_rates, pair): pair for pair in trading_pairs}
+            for future, pair in futures.items():
+                try:
+                    rates[pair] = future.result()
+                except Exception as e:
+                    logging.error(f"Fehler beim Abrufen der Basisraten für {pair}: {str(e)}")
+        return rates
@@ -256,9 +256,11 @@ class CryptoRsiGUI:
             }
             interval_display = self.interval_var.get()
             interval = interval_mapping[interval_display]  # Map to the actual interval value
+            # Kurse aller Paare gleichzeitig abrufen, dann nacheinander auswerten
+            all_rates = self.api_client.get_basic_rates_many(trading_pairs)
             for pair in trading_pairs:
                 try:
-                    rates = self.api_client.get_basic_rates(pair)
+                    rates = all_rates.get(pair)
                     if rates and 'rate' in rates:
                         rate_weighted = float(rates['rate']['rate_weighted'])
                         if self.database:
@@ -16,6 +16,7 @@ from tkinter import messagebox, ttk
 from logging.handlers import RotatingFileHandler
 from cryptography.fernet import Fernet
 from api_client import ApiClient
+from rates_cache import RatesCache
 from database import Database
 from rsi_calculator import RsiCalculator
 from sma_calculator import SmaCalculator
@@ -83,6 +84,8 @@ class CryptoRsiApp:
         self.key_file = os.path.join(self.config_dir, "key.key")
         self.load_settings()
         self.api_client = ApiClient(self.api_key)
+        # Gleichzeitig fällige Intervalle teilen sich einen Kursabruf
+        self.rates_cache = RatesCache(self.api_client)
         self.cipher = Fernet(self.load_key())
         
         # Überprüfen, ob alle erforderlichen Datenbankverbindungsdaten vorhanden sind
@@ -269,9 +272,11 @@ class CryptoRsiApp:
             logging.error(f"Fehler beim Speichern der Einstellungen: {e}")
 
     def fetch_and_store_data(self, interval):
+        # Kurse aller Paare gleichzeitig abrufen, dann nacheinander auswerten
+        all_rates = self.rates_cache.get_all(self.trading_pairs)
         for pair in self.trading_pairs:
             try:
-                rates = self.api_client.get_basic_rates(pair)
+                rates = all_rates.get(pair)
                 if rates and 'rate' in rates:
                     rate_weighted = float(rates['rate']['rate_weighted'])
                     if self.database:
@@ -0,0 +1,71 @@
+import logging
+import threading
+import time
+
+
+class RatesCache:
+    """
+    Shared cache of the Basic API rates for the interval threads (30m, 1h, 8h, 24h).
+
+    When several intervals are due at the same time they share one fetch: rates younger than
+    the TTL are served from the cache and only one thread fetches at a time, the others wait
+    for its result. Only valid responses (with 'rate') are cached.
+    """
+
+    def __init__(self, api_client, ttl=60, fetch_timeout=30):
+        self.api_client = api_client
+        self.ttl = ttl
+        self.fetch_timeout = fetch_timeout
+        self.lock = threading.Lock()
+        self.rates = {}  # trading_pair -> (fetched_at, response)
+        self.in_flight = None  # (Event, abgerufene Paare) des laufenden Abrufs
+
+    def _fresh(self, trading_pairs):
+        # Nur frische Kurse: ein Intervall soll keinen alten Kurs erneut speichern
+        now = time.monotonic()
+        return {
+            pair: self.rates[pair][1] for pair in trading_pairs
+            if pair in self.rates and now - self.rates[pair][0] <= self.ttl
+        }
+
+    def get_all(self, trading_pairs):
+        """Rates of the trading pairs, fetching the missing and outdated ones"""
+        trading_pairs = list(trading_pairs)
+        attempted = set()  # Paare, die ein anderes Intervall für diesen Aufruf schon abgerufen hat
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                stale = [
+                    pair for pair in trading_pairs
+                    if pair not in attempted and (pair not in self.rates or now - self.rates[pair][0] > self.ttl)
+                ]
+                if not stale:
+                    return self._fresh(trading_pairs)
+                if self.in_flight is None:
+                    event = threading.Event()
+                    self.in_flight = (event, stale)
+                    break
+                event, requested = self.in_flight
+
+            # Ein anderes Intervall ruft die Kurse bereits ab - danach nur die Paare holen, die es nicht abgerufen hat
+            if not event.wait(self.fetch_timeout):
+                with self.lock:
+                    return self._fresh(trading_pairs)
+            attempted.update(requested)
+
+        try:
+            fetched = self.api_client.get_basic_rates_many(stale)
+            fetched_at = time.monotonic()
+            with self.lock:
+                for pair, response in fetched.items():
+                    if response and 'rate' in response:
+                        self.rates[pair] = (fetched_at, response)
+        except Exception as e:
+            logging.error(f"Fehler beim Abrufen der Kurse: {str(e)}")
+        finally:
+            with self.lock:
+                self.in_flight = None
+            event.set()
+
+        with self.lock:
+            return self._fresh(trading_pairs)
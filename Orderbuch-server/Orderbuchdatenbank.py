@@ -10,6 +10,7 @@ from tkinter import ttk, messagebox
 import logging
 from websocket_client import WebSocketClient
 from database_handler import DatabaseHandler
+from event_journal import EventJournal
 from cryptography.fernet import Fernet
 import threading
 import queue
@@ -88,11 +89,22 @@ class OrderbuchDatenbank:
             self.logger.error(f"Failed to initialize DatabaseHandler: {str(e)}")
             self.db_handler = None
 
+        # Optional event journal for backtests (enabled by setting ORDERBUCH_JOURNAL_DIR)
+        self.journal = None
+        journal_dir = os.environ.get('ORDERBUCH_JOURNAL_DIR')
+        if journal_dir:
+            self.journal = EventJournal(
+                self.logger,
+                journal_dir,
+                snapshot_provider=self.db_handler.get_all_orders if self.db_handler else None
+            )
+
         # Initialize components without database connection
         self.ws_client = WebSocketClient(
             callback=self.handle_ws_message,
             logger=self.logger,
-            db_handler=self.db_handler  # Pass the db_handler here
+            db_handler=self.db_handler,  # Pass the db_handler here
+            journal=self.journal
         )
         self.logger.debug(f"WebSocketClient initialized with db_handler: {self.ws_client.db_handler is not None}")
 
@@ -575,6 +587,8 @@ class OrderbuchDatenbank:
         try:
             if hasattr(self, 'ws_client'):
                 self.ws_client.disconnect()
+            if getattr(self, 'journal', None):
+                self.journal.close()
             if hasattr(self, 'db_handler'):
                 self.db_handler.close()
             self.logger.info("Anwendung beendet")
@@ -6,6 +6,22 @@ import threading
 import json
 import time
 import os 
+import hashlib
+from decimal import Decimal, ROUND_HALF_UP
+
+CHECKSUM_QUANT = Decimal('0.00000001')  # DECIMAL(20,8) der orders Tabelle
+
+def order_checksum(order_id, price, amount):
+    """
+    64-bit hash of one order for the rolling orderbook checksum.
+    The book checksum is the XOR over all orders of a pair, so it can be updated per order.
+    Must produce the same values as orderbook_data.order_checksum in the desktop app.
+    """
+    # NULL (die Spalten sind nullable) zählt wie 0
+    price = Decimal(str(price or 0)).quantize(CHECKSUM_QUANT, rounding=ROUND_HALF_UP)
+    amount = Decimal(str(amount or 0)).quantize(CHECKSUM_QUANT, rounding=ROUND_HALF_UP)
+    digest = hashlib.blake2b(f"{order_id}|{price:f}|{amount:f}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
 
 class DatabaseHandler:
     def __init__(self, logger, db_config):
@@ -80,14 +96,60 @@ class DatabaseHandler:
                 CREATE INDEX IF NOT EXISTS idx_timestamp 
                 ON orders(timestamp)
             ''')
+
+            # Rolling checksum per trading pair (XOR of order_checksum over all orders)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS orderbook_checksums (
+                    trading_pair VARCHAR(255) PRIMARY KEY,
+                    checksum BIGINT UNSIGNED NOT NULL DEFAULT 0,
+                    order_count INT NOT NULL DEFAULT 0,
+                    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+                )
+            ''')
             
             conn.commit()
             self.logger.info("Database setup completed successfully")
+            self.rebuild_checksums()
             
         except mysql.connector.Error as e:
             self.logger.error(f"Database setup error: {str(e)}")
             raise
     
+    def rebuild_checksums(self):
+        """Recalculate the checksums of all trading pairs from the orders table"""
+        try:
+            with self.lock:
+                conn = self.get_connection()
+                cursor = conn.cursor()
+                cursor.execute("SELECT trading_pair, order_id, price, amount FROM orders")
+                checksums = {}
+                for trading_pair, order_id, price, amount in cursor.fetchall():
+                    checksum, count = checksums.get(trading_pair, (0, 0))
+                    checksums[trading_pair] = (checksum ^ order_checksum(order_id, price, amount), count + 1)
+
+                cursor.execute("DELETE FROM orderbook_checksums")
+                cursor.executemany(
+                    "INSERT INTO orderbook_checksums (trading_pair, checksum, order_count) VALUES (%s, %s, %s)",
+                    [(pair, checksum, count) for pair, (checksum, count) in checksums.items()]
+                )
+                conn.commit()
+                cursor.close()
+            self.logger.info(f"Orderbook checksums rebuilt for {len(checksums)} trading pairs")
+        except mysql.connector.Error as e:
+            self.logger.error(f"Error rebuilding orderbook checksums: {str(e)}")
+        except Exception as e:
+            # Darf den Start des Servers nicht verhindern - die Prüfsummen fehlen dann nur
+            self.logger.error(f"Unexpected error rebuilding orderbook checksums: {str(e)}")
+
+    def _update_checksum(self, cursor, trading_pair, checksum_delta, count_delta):
+        """XOR an order hash into the checksum of the pair (same transaction as the order change)"""
+        cursor.execute('''
+            INSERT INTO orderbook_checksums (trading_pair, checksum, order_count)
+            VALUES (%s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+            checksum = checksum ^ VALUES(checksum), order_count = order_count + VALUES(order_count)
+        ''', (trading_pair, checksum_delta, count_delta))
+
     def _add_order(self, order):
         """Add or update order in database"""
         try:
@@ -114,6 +176,13 @@ class DatabaseHandler:
                         'raw_data': json.dumps(order)
                     }
                     
+                    # Previous version of the order, needed to update the checksum
+                    cursor.execute(
+                        "SELECT trading_pair, order_id, price, amount FROM orders WHERE id = %s",
+                        (order_data['id'],)
+                    )
+                    previous = cursor.fetchone()
+
                     # Insert or replace order
                     cursor.execute('''
                         INSERT INTO orders 
@@ -130,6 +199,15 @@ class DatabaseHandler:
                         seat_of_bank=VALUES(seat_of_bank), min_trust_level=VALUES(min_trust_level), trade_to_sepa_country=VALUES(trade_to_sepa_country),
                         is_kyc_full=VALUES(is_kyc_full), payment_option=VALUES(payment_option), raw_data=VALUES(raw_data)
                     ''', order_data)
+
+                    if previous:
+                        self._update_checksum(cursor, previous[0], order_checksum(previous[1], previous[2], previous[3]), -1)
+                    self._update_checksum(
+                        cursor,
+                        order_data['trading_pair'],
+                        order_checksum(order_data['order_id'], order_data['price'], order_data['amount']),
+                        1
+                    )
                     
                     conn.commit()
                     self.logger.info(f"Successfully added/updated order: {order_data['order_id']}")
@@ -164,10 +242,13 @@ class DatabaseHandler:
                 cursor = conn.cursor()
                 
                 try:
-                    # Log the current state
-                    cursor.execute("SELECT order_id FROM orders WHERE order_id = %s", 
-                                 (order.get('order_id'),))
-                    if cursor.fetchone():
+                    # Log the current state (the rows are also needed to update the checksums)
+                    cursor.execute(
+                        "SELECT trading_pair, order_id, price, amount FROM orders WHERE order_id = %s OR id = %s",
+                        (order.get('order_id'), order.get('id'))
+                    )
+                    removed_rows = cursor.fetchall()
+                    if removed_rows:
                         self.logger.info(f"Found order {order.get('order_id')} to remove")
                     else:
                         self.logger.warning(f"Order {order.get('order_id')} not found in database")
@@ -179,6 +260,8 @@ class DatabaseHandler:
                     ''', (order.get('order_id'), order.get('id')))
                     
                     deleted_count = cursor.rowcount
+                    for trading_pair, order_id, price, amount in removed_rows:
+                        self._update_checksum(cursor, trading_pair, order_checksum(order_id, price, amount), -1)
                     conn.commit()
                     
                     self.logger.info(f"Removed {deleted_count} orders with ID {order.get('order_id')}")
@@ -328,6 +411,8 @@ class DatabaseHandler:
                 deleted_count = cursor.rowcount
                 if deleted_count > 0:
                     self.logger.info(f"Cleaned up {deleted_count} old orders")
+            if deleted_count > 0:
+                self.rebuild_checksums()
                 
         except Exception as e:
             self.logger.error(f"Error during cleanup: {str(e)}")
@@ -366,6 +451,23 @@ class DatabaseHandler:
             self.logger.error(f"Error getting orders count for {trading_pair}: {str(e)}")
             return 0
 
+    def get_all_orders(self):
+        """Get all current orders (used for the snapshot at the start of an event journal file)"""
+        try:
+            with self.lock:
+                conn = self.get_connection()
+                cursor = conn.cursor(dictionary=True)
+                cursor.execute('''
+                    SELECT id, order_id, order_type, trading_pair, price, amount, min_amount
+                    FROM orders
+                ''')
+                orders = cursor.fetchall()
+                cursor.close()
+                return orders
+        except Exception as e:
+            self.logger.error(f"Error getting all orders: {str(e)}")
+            return []
+
     def get_trading_pairs(self):
         """Get list of all trading pairs in database"""
         try:
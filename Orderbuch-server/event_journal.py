@@ -0,0 +1,76 @@
+# event_journal.py
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+JOURNAL_FIELDS = ('id', 'order_id', 'order_type', 'trading_pair', 'price', 'amount', 'min_amount')
+
+class EventJournal:
+    """
+    Optional append-only journal of the orderbook events (one JSON object per line).
+
+    One file per day (orderbook-YYYY-MM-DD.jsonl). Every file starts with a snapshot of the
+    current orders, so it can be replayed on its own (e.g. by backtester.py in the main program).
+
+    Line format:
+        {"ts": 1700000000.123, "action": "snapshot", "orders": [{...}, ...]}
+        {"ts": 1700000000.456, "action": "add", "order": {...}}
+        {"ts": 1700000000.789, "action": "remove", "order": {...}}
+    """
+
+    def __init__(self, logger, directory, snapshot_provider=None):
+        self.logger = logger
+        self.directory = directory
+        self.snapshot_provider = snapshot_provider  # callable -> list of order dicts
+        self.lock = threading.Lock()
+        self.file = None
+        self.current_day = None
+        self.events_written = 0
+        os.makedirs(self.directory, exist_ok=True)
+        self.logger.info(f"Event journal enabled: {self.directory}")
+
+    def _open_for_today(self):
+        """Open the file of the current day (writes the initial snapshot for a new file)"""
+        day = datetime.now().strftime('%Y-%m-%d')
+        if day == self.current_day and self.file:
+            return
+        if self.file:
+            self.file.close()
+        path = os.path.join(self.directory, f"orderbook-{day}.jsonl")
+        self.file = open(path, 'a', encoding='utf-8', buffering=1)  # zeilengepuffert
+        self.current_day = day
+        self.logger.info(f"Event journal file: {path}")
+
+        if self.snapshot_provider:
+            try:
+                orders = [self._order_fields(order) for order in self.snapshot_provider()]
+                self._write_line({'ts': time.time(), 'action': 'snapshot', 'orders': orders})
+            except Exception as e:
+                self.logger.error(f"Error writing journal snapshot: {str(e)}")
+
+    @staticmethod
+    def _order_fields(order):
+        return {field: order.get(field) for field in JOURNAL_FIELDS}
+
+    def _write_line(self, entry):
+        self.file.write(json.dumps(entry, separators=(',', ':'), default=str) + '\n')
+        self.events_written += 1
+
+    def write(self, action, order):
+        """Append an add/remove event"""
+        try:
+            with self.lock:
+                self._open_for_today()
+                self._write_line({'ts': time.time(), 'action': action, 'order': self._order_fields(order)})
+        except Exception as e:
+            self.logger.error(f"Error writing journal event: {str(e)}")
+
+    def close(self):
+        with self.lock:
+            if self.file:
+                self.file.close()
+                self.file = None
+                self.current_day = None
+        self.logger.info(f"Event journal closed ({self.events_written} entries written)")
@@ -5,10 +5,11 @@ import threading
 import time
 
 class WebSocketClient:
-    def __init__(self, callback, logger, db_handler):
+    def __init__(self, callback, logger, db_handler, journal=None):
         self.callback = callback
         self.logger = logger
         self.db_handler = db_handler
+        self.journal = journal  # Optionales EventJournal für Backtests
         self.connected = False
         self.running = False
         self.db_queue = Queue()
@@ -152,6 +153,8 @@ class WebSocketClient:
                 'order': processed_order
             })
             self.logger.info(f"Queued add_order to database: {processed_order['order_id']}")
+            if self.journal:
+                self.journal.write('add', processed_order)
             
             # Call callback for GUI update AFTER queueing
             if self.callback:
@@ -186,6 +189,8 @@ class WebSocketClient:
                 'order': processed_order
             })
             self.logger.info(f"Queued remove_order to database: {order_id}")
+            if self.journal:
+                self.journal.write('remove', processed_order)
             
             # Call callback for GUI update AFTER queueing
             if self.callback:
@@ -0,0 +1,254 @@
+"""
+Latency benchmark of the API client against a local mock of the bitcoin.de API (no credentials,
+no credits, nothing goes out).
+
+Compares a new connection per request (module-level requests.get, as the client did before)
+with the pooled keep-alive session of BitcoinDeApiClient.
+
+Usage:
+    python api_benchmark.py --requests 200 --connect-delay-ms 30 --response-delay-ms 50
+    python api_benchmark.py --resilience      (nonces, retries, timeouts and circuit breaker)
+--connect-delay-ms emulates the TCP/TLS handshake to api.bitcoin.de (paid once per new
+connection), --response-delay-ms the processing time of the API (paid by every request).
+"""
+import argparse
+import json
+import logging
+import socket
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from api_budget import ApiBudget
+from api_client import BitcoinDeApiClient
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from bot_engine import percentile
+from constants import TradingPairs
+
+
+class MockApiHandler(BaseHTTPRequestHandler):
+    """Answers every request with a small JSON body like the bitcoin.de API"""
+    protocol_version = 'HTTP/1.1'  # Keep-alive
+
+    def setup(self):
+        super().setup()
+        # Kopf und Inhalt der Antwort gehen getrennt raus: ohne TCP_NODELAY warten Keep-alive
+        # Verbindungen auf das verzögerte ACK (~40 ms), das würde die Messung verfälschen
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.server.connections += 1
+        time.sleep(self.server.connect_delay)  # Handshake einer neuen Verbindung
+
+    def respond(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length:
+            self.rfile.read(length)
+        nonce = self.headers.get('X-API-NONCE')
+        if nonce:
+            self.server.nonces.append(int(nonce))
+        self.server.requests += 1
+        status_code, delay = self.server.next_response()
+        time.sleep(self.server.response_delay + delay)
+        errors = [] if status_code < 400 else [{'message': 'Mock-Fehler', 'code': status_code}]
+        body = json.dumps({'orders': [], 'errors': errors, 'credits': 20}).encode('utf-8')
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = respond
+    do_POST = respond
+    do_DELETE = respond
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockApiServer(ThreadingHTTPServer):
+    """Local mock API on a free port, runs in a daemon thread"""
+    daemon_threads = True
+
+    def __init__(self, connect_delay_ms=0, response_delay_ms=0, handler=MockApiHandler):
+        super().__init__(('127.0.0.1', 0), handler)
+        self.connect_delay = connect_delay_ms / 1000.0
+        self.response_delay = response_delay_ms / 1000.0
+        self.connections = 0
+        self.requests = 0
+        self.nonces = []  # X-API-NONCE der signierten Anfragen in Eingangsreihenfolge
+        self.scenario = deque()  # (status_code, delay_seconds) der nächsten Antworten, danach 200
+        self.scenario_lock = threading.Lock()
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    def play(self, *responses):
+        """Answer the next requests with these (status_code, delay_seconds) instead of 200"""
+        with self.scenario_lock:
+            self.scenario.clear()
+            self.scenario.extend(responses)
+            self.requests = 0
+
+    def next_response(self):
+        with self.scenario_lock:
+            return self.scenario.popleft() if self.scenario else (200, 0)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/v4"
+
+    def handle_error(self, request, client_address):
+        pass  # z. B. abgebrochene Verbindungen nach einem Client-Timeout
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def benchmark_client(base_url, logger):
+    """API client against the mock, without credit limit"""
+    client = BitcoinDeApiClient(api_key='benchmark', api_secret='benchmark', api_basic='benchmark', logger=logger)
+    client.base_url = base_url
+    client.budget = ApiBudget("Benchmark", capacity=10 ** 9, refill_per_second=10 ** 9)
+    client.basic_budget = ApiBudget("Benchmark-Basic", capacity=10 ** 9, refill_per_second=10 ** 9, reserve={})
+    return client
+
+
+def measure(call, count):
+    """Duration of every call in ms"""
+    durations = []
+    for _ in range(count):
+        started = time.perf_counter()
+        call()
+        durations.append((time.perf_counter() - started) * 1000)
+    return durations
+
+
+def report(name, durations, requests_per_call=1):
+    values = sorted(durations)
+    print(
+        f"{name:<32} p50 {percentile(values, 50):7.2f} ms   p95 {percentile(values, 95):7.2f} ms   "
+        f"Mittel {sum(values) / len(values):7.2f} ms   ({requests_per_call} Anfrage(n) je Aufruf)"
+    )
+
+
+def check(name, passed, detail=""):
+    print(f"{'OK    ' if passed else 'FEHLER'} {name}" + (f" ({detail})" if detail else ""))
+    return passed
+
+
+def resilience_check(logger):
+    """Nonces, retries, per-call timeouts and circuit breaker of the client against scripted mock responses"""
+    server = MockApiServer().start()
+    results = []
+    try:
+        client = benchmark_client(server.base_url, logger)
+
+        # Nonces: gleichzeitig signierende Threads
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            nonces = [int(nonce) for nonce in executor.map(lambda _: client.create_nonce(), range(8000))]
+        results.append(check("Nonces eindeutig (8 Threads)", len(set(nonces)) == len(nonces), f"{len(nonces)} Nonces"))
+
+        # GET: 503 und 429 werden wiederholt
+        server.play((503, 0), (429, 0))
+        response = client.make_api_request('orders')
+        results.append(check("GET nach 503 und 429 wiederholt", response is not None and server.requests == 3,
+                             f"{server.requests} Anfragen"))
+
+        # POST: 503 wird nicht wiederholt (das Order könnte angelegt sein), 429 schon
+        server.play((503, 0))
+        try:
+            client.make_post_request('btceur/orders', {'max_amount': 0.1, 'price': 100, 'type': 'buy'})
+            failed = False
+        except requests.exceptions.HTTPError:
+            failed = True
+        results.append(check("POST nach 503 nicht wiederholt", failed and server.requests == 1, f"{server.requests} Anfragen"))
+        server.play((429, 0))
+        client.make_post_request('btceur/orders', {'max_amount': 0.1, 'price': 100, 'type': 'buy'})
+        results.append(check("POST nach 429 wiederholt", server.requests == 2, f"{server.requests} Anfragen"))
+
+        # Timeout pro Aufruf
+        server.play(*[(200, 1.0)] * 3)
+        started = time.perf_counter()
+        try:
+            client.make_api_request('orders', timeout=(1, 0.2))
+            timed_out = False
+        except requests.exceptions.Timeout:
+            timed_out = True
+        elapsed = time.perf_counter() - started
+        results.append(check("Timeout pro Aufruf (0,2 s, 2 Wiederholungen)", timed_out, f"{elapsed:.1f} s"))
+
+        # Circuit Breaker: nach 3 Fehlern in Folge sofort abweisen, nach der Pause eine Testanfrage
+        client.breaker = CircuitBreaker("Mock-API", failure_threshold=3, reset_seconds=0.5, logger=logger)
+        server.play(*[(503, 0)] * 3)
+        try:
+            client.make_api_request('orders')
+        except requests.exceptions.HTTPError:
+            pass
+        started = time.perf_counter()
+        try:
+            client.make_api_request('orders')
+            rejected = False
+        except CircuitOpenError:
+            rejected = True
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        results.append(check("Circuit Breaker weist sofort ab", rejected and server.requests == 3, f"{elapsed_ms:.2f} ms"))
+        time.sleep(0.6)
+        client.make_api_request('orders')
+        results.append(check("Circuit Breaker nach Testanfrage geschlossen",
+                             client.get_breaker_status()['state'] == CircuitBreaker.CLOSED))
+
+        results.append(check("Nonces beim Server streng steigend", server.nonces == sorted(set(server.nonces)),
+                             f"{len(server.nonces)} signierte Anfragen"))
+    finally:
+        server.stop()
+    return all(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latenz-Benchmark des API-Clients gegen eine lokale Mock-API")
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--connect-delay-ms', type=float, default=30, help="Kosten einer neuen Verbindung")
+    parser.add_argument('--response-delay-ms', type=float, default=0, help="Bearbeitungszeit je Anfrage")
+    parser.add_argument('--resilience', action='store_true', help="Wiederholungen, Timeouts und Circuit Breaker prüfen")
+    args = parser.parse_args()
+
+    logger = logging.getLogger("ApiBenchmark")
+    logger.setLevel(logging.WARNING)  # Antworten nicht protokollieren
+    if args.resilience:
+        logger.setLevel(logging.CRITICAL)  # erwartete Fehler nicht ausgeben
+        raise SystemExit(0 if resilience_check(logger) else 1)
+
+    server = MockApiServer(args.connect_delay_ms, args.response_delay_ms).start()
+    try:
+        client = benchmark_client(server.base_url, logger)
+        url = f"{server.base_url}/orders"
+
+        before = server.connections
+        durations = measure(lambda: requests.get(url, timeout=client.timeout).json(), args.requests)
+        report("vorher: requests.get je Aufruf", durations)
+        print(f"{'':<32} {server.connections - before} Verbindungen")
+
+        before = server.connections
+        durations = measure(lambda: client.make_api_request('orders'), args.requests)
+        report("nachher: Session (signiert)", durations)
+        print(f"{'':<32} {server.connections - before} Verbindungen")
+
+        # Kurse aller Handelspaare: nacheinander gegen gleichzeitig
+        pairs = TradingPairs.get_all_pairs()
+        rounds = max(args.requests // len(pairs), 1)
+        durations = measure(lambda: [client.get_basic_rates(pair) for pair in pairs], rounds)
+        report(f"Kurse {len(pairs)} Paare nacheinander", durations, len(pairs))
+        durations = measure(lambda: client.get_basic_rates_many(pairs), rounds)
+        report(f"Kurse {len(pairs)} Paare gleichzeitig", durations, len(pairs))
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
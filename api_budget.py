@@ -0,0 +1,133 @@
+import threading
+import time
+
+from constants import ApiBudgetSettings
+
+
+class ApiBudgetExceeded(Exception):
+    """Raised when a call could not get enough credits within its maximum wait (the call is deferred)"""
+
+
+class ApiBudget:
+    """
+    Token bucket for the bitcoin.de API credits, shared by all callers of one API client.
+
+    - every call spends the credits of its operation (ApiBudgetSettings.COSTS)
+    - lower priorities have to leave a reserve for higher ones, so a ledger download
+      can never use up the credits the trade bot needs for its orders
+    - a waiting caller blocks all callers of lower priority
+    - the credits reported by the API in each response correct the local estimate
+    """
+
+    def __init__(self, name, capacity=ApiBudgetSettings.CAPACITY, refill_per_second=ApiBudgetSettings.REFILL_PER_SECOND,
+                 reserve=None):
+        self.name = name
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.reserve = ApiBudgetSettings.RESERVE if reserve is None else reserve  # {} = keine Reserven
+        self.tokens = float(capacity)
+        self.last_refill = time.monotonic()
+        self.condition = threading.Condition()
+        self.waiting = {priority: 0 for priority in ApiBudgetSettings.MAX_WAIT_SECONDS}
+
+        # Statistiken
+        self.calls = 0
+        self.spent = 0
+        self.waited_seconds = 0.0
+        self.deferred = 0
+        self.syncs = 0  # Abgleiche mit den Credits der API (sync/exhaust)
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.refill_per_second)
+        self.last_refill = now
+
+    def _can_spend(self, cost, priority):
+        if any(count for other, count in self.waiting.items() if other < priority):
+            return False  # höhere Priorität wartet
+        return self.tokens - cost >= self._reserve(cost, priority)
+
+    def _reserve(self, cost, priority):
+        # nie mehr Reserve als die Kapazität zulässt, sonst käme der Aufruf nie dran
+        return max(min(self.reserve.get(priority, 0), self.capacity - cost), 0)
+
+    def acquire(self, cost, priority=ApiBudgetSettings.PRIORITY_INTERACTIVE, max_wait=None):
+        """Wait until cost credits are available for the priority, raise ApiBudgetExceeded after max_wait seconds"""
+        if max_wait is None:
+            max_wait = ApiBudgetSettings.MAX_WAIT_SECONDS.get(priority, 30)
+        deadline = time.monotonic() + max_wait
+        started = time.monotonic()
+
+        with self.condition:
+            self._refill()
+            if not self._can_spend(cost, priority):
+                self.waiting[priority] = self.waiting.get(priority, 0) + 1
+                try:
+                    while True:
+                        self._refill()
+                        if self._can_spend(cost, priority):
+                            break
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self.deferred += 1
+                            raise ApiBudgetExceeded(
+                                f"{self.name}: nicht genug API-Credits ({self.tokens:.1f} verfügbar, {cost} benötigt)"
+                            )
+                        missing = cost + self._reserve(cost, priority) - self.tokens
+                        self.condition.wait(min(remaining, max(missing / self.refill_per_second, 0.05)))
+                finally:
+                    self.waiting[priority] -= 1
+                    self.condition.notify_all()
+
+            self.tokens -= cost
+            self.calls += 1
+            self.spent += cost
+            self.waited_seconds += time.monotonic() - started
+
+    def sync(self, credits):
+        """Use the remaining credits reported by the API"""
+        if credits is None:
+            return
+        try:
+            credits = float(credits)
+        except (TypeError, ValueError):
+            return
+        with self.condition:
+            self._refill()
+            self.tokens = max(min(credits, self.capacity), 0.0)
+            self.syncs += 1
+            self.condition.notify_all()
+
+    def exhaust(self):
+        """The API answered 429: no credits left"""
+        with self.condition:
+            self.tokens = 0.0
+            self.last_refill = time.monotonic()
+            self.syncs += 1
+
+    def refund(self, cost, syncs=None):
+        """
+        Return the credits of a reserved call that was not sent. Skipped if the API reported its
+        credits after the reservation (syncs = self.syncs at that time): those do not include the call.
+        """
+        with self.condition:
+            if syncs is not None and syncs != self.syncs:
+                return
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + cost)
+            self.spent -= cost
+            self.condition.notify_all()
+
+    def get_status(self):
+        with self.condition:
+            self._refill()
+            return {
+                'name': self.name,
+                'credits': self.tokens,
+                'capacity': self.capacity,
+                'waiting': sum(self.waiting.values()),
+                'calls': self.calls,
+                'spent': self.spent,
+                'deferred': self.deferred,
+                'waited_seconds': round(self.waited_seconds, 1)
+            }
@@ -2,285 +2,245 @@ from hmac import new as hmac_new
 from hashlib import md5, sha256
 import hashlib 
 import hmac 
+import random
 import time
 import requests
-import json
 import threading 
-from datetime import datetime
-from urllib.parse import urlencode
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urlsplit
+from api_budget import ApiBudget, ApiBudgetExceeded
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from constants import ApiBudgetSettings, HttpSettings, ResponseLogSettings
+from response_log import LazyJson, ResponseLogger
+
+EMPTY_MD5 = hashlib.md5(b'').hexdigest()  # Body-Hash von GET/DELETE und leeren POSTs
 
 class BitcoinDeApiClient:
-    def __init__(self, api_key, api_secret, api_basic, logger):
+    def __init__(self, api_key, api_secret, api_basic, logger, wire_debug=HttpSettings.WIRE_DEBUG):
         self.api_key = api_key
         self.api_secret = api_secret
+        # Mit dem Secret vorbelegter HMAC-Zustand, pro Anfrage nur kopiert (sign)
+        self.hmac_base = hmac.new((api_secret or '').encode('utf-8'), digestmod=hashlib.sha256)
+        # Anfragen und Antworten komplett protokollieren (nur dieser Client)
+        self.wire_debug = wire_debug
+        self.response_log = ResponseLogger(logger, full_bodies=wire_debug)
         self.api_basic = api_basic
         self.logger = logger
         self.base_url = "https://api.bitcoin.de/v4"
+        # Eine Keep-alive Session für alle Anfragen: kein neuer TCP/TLS-Handshake pro Aufruf
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=HttpSettings.POOL_CONNECTIONS,
+            pool_maxsize=HttpSettings.POOL_MAXSIZE
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.timeout = (HttpSettings.CONNECT_TIMEOUT_SECONDS, HttpSettings.READ_TIMEOUT_SECONDS)
+        self.last_nonce = 0
+        self.nonce_lock = threading.RLock()  # Bots, Tabs und Scheduler signieren gleichzeitig
+        # Bei einem Ausfall der API sofort abweisen statt jeden Thread bis zum Timeout zu blockieren
+        self.breaker = CircuitBreaker("bitcoin.de API", logger=logger)
+        # API-Credits: ein gemeinsames Budget für alle Aufrufer (Bots, Tabs, Kontoauszüge)
+        self.budget = ApiBudget("Trading-API")
+        self.basic_budget = ApiBudget("Basic-API", reserve={})  # nur Kurse, keine Reserve für Orders nötig
 
     def log_message(self, message, level="DEBUG"):
         """Helper method to log messages using the provided logger"""
         if hasattr(self.logger, level.lower()):
             getattr(self.logger, level.lower())(message)
 
-    def get_basic_rates(self, trading_pair):
+    def spend_credits(self, operation, priority, budget=None):
+        """Wait for the credits of an API method, raises ApiBudgetExceeded if the call has to be deferred"""
+        budget = budget or self.budget
+        try:
+            budget.acquire(ApiBudgetSettings.COSTS.get(operation, ApiBudgetSettings.DEFAULT_COST), priority)
+        except ApiBudgetExceeded as e:
+            self.logger.warning(f"{operation} zurückgestellt: {str(e)}")
+            raise
+
+    def track_credits(self, response, data, budget=None):
+        """Update the budget with the credits reported in the response (429: none left)"""
+        budget = budget or self.budget
+        if response.status_code == 429:
+            budget.exhaust()
+        elif isinstance(data, dict):
+            budget.sync(data.get('credits'))
+
+    def get_budget_status(self):
+        return self.budget.get_status()
+
+    def get_breaker_status(self):
+        return self.breaker.get_status()
+
+    def get_basic_rates(self, trading_pair, timeout=None):
         """Get rates using Basic API"""
         try:
             url = f"{self.base_url}/{trading_pair}/basic/rate.json"
             params = {'apikey': self.api_basic}
-            
+
+            def build_request():
+                self.spend_credits('showRates', ApiBudgetSettings.PRIORITY_BACKGROUND, self.basic_budget)
+                return self.session.prepare_request(requests.Request('GET', url, params=params))
+
             self.logger.info(f"Fetching rates for {trading_pair}")
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            
-            data = response.json()
-            self.logger.info(f"Rates response: {json.dumps(data, indent=2)}")
-            
+            data = self.dispatch(build_request, self.basic_budget, timeout)
+
             # Add trading pair to response for identification
-            if 'data' in data:
+            if data and 'data' in data:
                 data['data']['trading_pair'] = trading_pair
             return data
-            
+
         except Exception as e:
             self.logger.error(f"Error fetching basic rates: {str(e)}")
-            if hasattr(e, 'response'):
-                self.logger.error(f"Response content: {e.response.text}")
             raise
 
-    def make_api_request(self, endpoint, params=None):
-        try:
-            endpoint = endpoint.lstrip('/')
-            url = f"{self.base_url}/{endpoint}"
-            nonce = str(int(datetime.now().timestamp() * 1000000))
-    
-            # Always use empty string MD5 hash for GET requests
-            md5_hash = 'd41d8cd98f00b204e9800998ecf8427e'
-    
-            # Create HMAC input data
-            hmac_data = '#'.join([
-                'GET',  # Always GET
-                url,
-                self.api_key,
-                nonce,
-                md5_hash
-            ])
-    
-            self.logger.info("=== GET Request Details ===")
-            self.logger.debug(f"Endpoint: {endpoint}")
-            self.logger.debug(f"Full URL: {url}")
-            self.logger.debug(f"Nonce: {nonce}")
-            self.logger.debug(f"MD5 hash: {md5_hash}")
-            self.logger.debug(f"HMAC data: {hmac_data}")
-    
-            # Create HMAC-SHA256 signature
-            signature = hmac.new(
-                self.api_secret.encode('utf-8'),
-                hmac_data.encode('utf-8'),
-                hashlib.sha256
-            ).hexdigest()
-    
-            self.logger.debug(f"Generated signature: {signature}")
-    
-            headers = {
-                'Content-Type': 'application/x-www-form-urlencoded',
-                'X-API-KEY': self.api_key,
-                'X-API-NONCE': nonce,
-                'X-API-SIGNATURE': signature
-            }
-    
-            self.logger.debug("Headers:")
-            for key, value in headers.items():
-                self.logger.debug(f"{key}: {value}")
-    
-            if params:
-                self.logger.debug(f"Query parameters: {params}")
-    
-            # Enable requests debug logging
-            import http.client as http_client
-            http_client.HTTPConnection.debuglevel = 1
-    
-            # Make GET request
-            response = requests.get(url, headers=headers, params=params)
-    
-            # Reset debug level
-            http_client.HTTPConnection.debuglevel = 0
-    
-            # Log response details
-            self.logger.info("=== Response Details ===")
-            self.logger.info(f"Status code: {response.status_code}")
-            self.logger.debug(f"Response headers: {dict(response.headers)}")
-            
+    def get_basic_rates_many(self, trading_pairs, max_workers=HttpSettings.POOL_MAXSIZE):
+        """
+        Get the rates of several trading pairs concurrently (within the Basic API budget).
+        Returns {trading_pair: response}; pairs that failed are logged and missing.
+        """
+        trading_pairs = list(trading_pairs)
+        if not trading_pairs:
+            return {}
+        rates = {}
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(trading_pairs)), thread_name_prefix="rates") as executor:
+            futures = {executor.submit(self.get_basic_rates, pair): pair for pair in trading_pairs}
+            for future, pair in futures.items():
+                try:
+                    response = future.result()
+                    if response:
+                        rates[pair] = response
+                except Exception as e:
+                    self.logger.error(f"Failed to fetch rates for {pair}: {str(e)}")
+        return rates
+
+    def make_api_request(self, endpoint, params=None, priority=ApiBudgetSettings.PRIORITY_INTERACTIVE, timeout=None):
+        """Signed GET request (orders, account)"""
+        operation = {'orders': 'showMyOrders', 'account': 'showAccountInfo'}.get(endpoint.lstrip('/').split('/')[0])
+        return self.signed_request('GET', endpoint, operation, priority, params=params, timeout=timeout)
+
+    def signed_request(self, method, endpoint, operation, priority, params=None, form_data=None, timeout=None):
+        """Spend the credits of the API method, then sign and send the request (with retries, see dispatch)"""
+        def build_request():
+            # Jeder Versuch braucht eine neue Nonce und kostet erneut Credits
+            self.spend_credits(operation, priority)
+            return self.prepare_signed_request(method, endpoint, form_data, params)
+        return self.dispatch(build_request, timeout=timeout)
+
+    def dispatch(self, build_request, budget=None, timeout=None):
+        """
+        Send the request built by build_request, retrying with exponential backoff and jitter
+        (see retry_delay). build_request is called again for every attempt.
+        """
+        attempt = 0
+        while True:
+            prepared = build_request()
             try:
-                response_json = response.json()
-                self.logger.info(f"Response body: {json.dumps(response_json, indent=2)}")
-            except json.JSONDecodeError:
-                self.logger.debug(f"Raw response body: {response.text}")
-    
-            response.raise_for_status()
-            return response.json()
-    
-        except requests.exceptions.RequestException as e:
-            self.logger.error(f"API request failed: {str(e)}")
-            if hasattr(e, 'response') and e.response is not None:
-                self.logger.error(f"Error response: {e.response.text}")
-            raise
+                return self.send_prepared(prepared, budget, timeout)
+            except CircuitOpenError:
+                raise
+            except requests.exceptions.RequestException as e:
+                delay = self.retry_delay(prepared.method, e, attempt)
+                if delay is None:
+                    raise
+                attempt += 1
+                self.logger.warning(
+                    f"{prepared.method} {urlsplit(prepared.url).path}: Versuch {attempt} fehlgeschlagen, "
+                    f"Wiederholung in {delay:.1f} s"
+                )
+                time.sleep(delay)
+
+    def retry_delay(self, method, error, attempt):
+        """
+        Wait time before the next attempt, None if the request must not be retried:
+        429 always (the API did not execute the request), 5xx, timeouts and connection errors
+        only if the request may be repeated - a POST could have created an order already,
+        so it is only retried if the connection could not be established.
+        """
+        if attempt >= HttpSettings.MAX_RETRIES:
+            return None
+        response = getattr(error, 'response', None)
+        status_code = response.status_code if response is not None else None
+        if status_code == 429:
+            retryable = True
+        elif method == 'POST':
+            retryable = isinstance(error, requests.exceptions.ConnectTimeout)
+        elif status_code is not None:
+            retryable = status_code >= 500
+        else:
+            retryable = isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+        if not retryable:
+            return None
+        delay = random.uniform(0, min(HttpSettings.BACKOFF_MAX_SECONDS, HttpSettings.BACKOFF_BASE_SECONDS * 2 ** attempt))
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, min(float(retry_after), HttpSettings.BACKOFF_MAX_SECONDS))
+        return delay
        
-    def create_signature(self, method, endpoint, nonce, params=None):
-        try:
-            # Ensure endpoint doesn't start with slash
-            endpoint = endpoint.lstrip('/')
-    
-            # Construct the full URI
-            uri = f"{self.base_url}/{endpoint}"
-    
-            # For POST requests with params, create MD5 hash of URL-encoded params
-            if method == "POST" and params:
-                # Sort parameters
-                sorted_params = dict(sorted(params.items()))
-                
-                # Create URL-encoded string with proper encoding
-                encoded_params = []
-                for key, value in sorted_params.items():
-                    # Properly encode the key (especially for array-style parameters)
-                    encoded_key = key.replace('[', '%5B').replace(']', '%5D')
-                    
-                    if isinstance(value, (list, tuple)):
-                        formatted_value = str(value[0])
-                    elif isinstance(value, float):
-                        formatted_value = str(value)
-                    else:
-                        formatted_value = str(value)
-                    
-                    # URL encode the value
-                    encoded_value = requests.utils.quote(formatted_value)
-                    encoded_params.append(f"{encoded_key}={encoded_value}")
-                
-                url_encoded_query = '&'.join(encoded_params)
-                self.logger.debug(f"URL-encoded query for MD5: {url_encoded_query}")
-                md5_hash = hashlib.md5(url_encoded_query.encode('utf-8')).hexdigest()
-            else:
-                md5_hash = 'd41d8cd98f00b204e9800998ecf8427e'
-    
-            # Create HMAC input data
-            hmac_data = '#'.join([
-                method,
-                uri,
-                self.api_key,
-                nonce,
-                md5_hash
-            ])
-    
-            self.logger.debug(f"HMAC data: {hmac_data}")
-    
-            # Create HMAC-SHA256 signature
-            signature = hmac.new(
-                self.api_secret.encode('utf-8'),
-                hmac_data.encode('utf-8'),
-                hashlib.sha256
-            ).hexdigest()
-    
-            self.logger.debug(f"Generated signature: {signature}")
-            return signature
-    
-        except Exception as e:
-            self.logger.error(f"Error creating signature: {str(e)}")
-            raise
-     
-    def make_post_request(self, endpoint, params):
-        try:
-            method = 'POST'
-            nonce = str(int(datetime.now().timestamp() * 1000000))
-            
-            # Prepare the complete form data first
-            form_data = {
-                'max_amount_currency_to_trade': str(params['max_amount']),
-                'min_amount_currency_to_trade': str(params['max_amount']),  # Same as max by default
-                'price': str(params['price']),
-                'type': params['type'],
-                'new_order_for_remaining_amount': '1',
-                'only_kyc_full': '1'
-            }
-            
-            # Add optional parameters
-            if 'end_datetime' in params:
-                form_data['end_datetime'] = params['end_datetime']
-            if 'min_trust_level' in params:
-                form_data['min_trust_level'] = params['min_trust_level']
-            if 'payment_option' in params:
-                form_data['payment_option'] = str(params['payment_option'])
-            if 'sepa_option' in params:
-                form_data['sepa_option'] = str(params['sepa_option'])
-            if 'seat_of_bank' in params:
-                if isinstance(params['seat_of_bank'], (list, tuple)):
-                    for i, country in enumerate(params['seat_of_bank']):
-                        form_data[f'seat_of_bank[{i}]'] = country
-                else:
-                    form_data['seat_of_bank[0]'] = params['seat_of_bank']
-            
-            # Sort form data alphabetically
-            sorted_form_data = dict(sorted(form_data.items()))
-            
-            # Get signature using all parameters
-            signature = self.create_signature(
-                method=method,
-                endpoint=endpoint,
-                nonce=nonce,
-                params=sorted_form_data  # Use all sorted parameters for signature
-            )
-            
-            request_uri = f"{self.base_url}/{endpoint}"
-            
-            headers = {
-                'Content-Type': 'application/x-www-form-urlencoded',
-                'X-API-KEY': self.api_key,
-                'X-API-NONCE': nonce,
-                'X-API-SIGNATURE': signature
-            }
-            
-            self.logger.debug("Request details:")
-            self.logger.debug(f"URI: {request_uri}")
-            self.logger.debug("Headers:")
-            for key, value in headers.items():
-                self.logger.debug(f"{key}: {value}")
-            self.logger.debug(f"Form data (sorted): {sorted_form_data}")
-            
-            # Enable requests debug logging
-            import http.client as http_client
-            http_client.HTTPConnection.debuglevel = 1
-            
-            # Make request with sorted form data
-            response = requests.post(request_uri, headers=headers, data=sorted_form_data)
-            
-            # Reset debug level
-            http_client.HTTPConnection.debuglevel = 0
-            
-            # Log response details
-            self.logger.info("=== Response Details ===")
-            self.logger.info(f"Status code: {response.status_code}")
-            self.logger.debug(f"Response headers: {dict(response.headers)}")
-            
-            try:
-                response_json = response.json()
-                self.logger.info(f"Response body: {json.dumps(response_json, indent=2)}")
-            except json.JSONDecodeError:
-                self.logger.debug(f"Raw response body: {response.text}")
-            
-            response.raise_for_status()
-            return response.json()
-            
-        except requests.exceptions.RequestException as e:
-            self.logger.error(f"API request failed: {str(e)}")
-            if hasattr(e, 'response') and e.response is not None:
-                self.logger.error(f"Error response: {e.response.text}")
-            raise
+    def body_md5(self, form_data):
+        """MD5 of the URL-encoded, sorted form data of a POST request (part of the signature)"""
+        encoded_params = []
+        for key, value in sorted(form_data.items()):
+            # Properly encode the key (especially for array-style parameters)
+            encoded_key = key.replace('[', '%5B').replace(']', '%5D')
+            formatted_value = str(value[0]) if isinstance(value, (list, tuple)) else str(value)
+            encoded_params.append(f"{encoded_key}={requests.utils.quote(formatted_value)}")
+        return hashlib.md5('&'.join(encoded_params).encode('utf-8')).hexdigest()
+
+    def sign(self, method, uri, nonce, body_md5=EMPTY_MD5):
+        """HMAC-SHA256 signature; the keyed HMAC state is built once and copied per request"""
+        mac = self.hmac_base.copy()
+        mac.update('#'.join([method, uri, self.api_key, nonce, body_md5]).encode('utf-8'))
+        return mac.hexdigest()
      
-    def create_order(self, trading_pair, type, max_amount_currency_to_trade, price, 
-                    end_datetime=None, min_trust_level=None,
-                    payment_option=None, sepa_option=None,
-                    seat_of_bank=None):
-        """Create a new order on Bitcoin.de"""
-        endpoint = f"{trading_pair}/orders"
+    def create_nonce(self):
+        """Microsecond nonce, strictly increasing across all threads and for requests signed in advance"""
+        with self.nonce_lock:
+            nonce = max(time.time_ns() // 1000, self.last_nonce + 1)
+            self.last_nonce = nonce
+        return str(nonce)
+
+    def build_order_form_data(self, params):
+        """Form data of a create order request, sorted alphabetically"""
+        form_data = {
+            'max_amount_currency_to_trade': str(params['max_amount']),
+            'min_amount_currency_to_trade': str(params['max_amount']),  # Same as max by default
+            'price': str(params['price']),
+            'type': params['type'],
+            'new_order_for_remaining_amount': '1',
+            'only_kyc_full': '1'
+        }
         
-        # Build parameters
+        # Add optional parameters
+        if 'end_datetime' in params:
+            form_data['end_datetime'] = params['end_datetime']
+        if 'min_trust_level' in params:
+            form_data['min_trust_level'] = params['min_trust_level']
+        if 'payment_option' in params:
+            form_data['payment_option'] = str(params['payment_option'])
+        if 'sepa_option' in params:
+            form_data['sepa_option'] = str(params['sepa_option'])
+        if 'seat_of_bank' in params:
+            if isinstance(params['seat_of_bank'], (list, tuple)):
+                for i, country in enumerate(params['seat_of_bank']):
+                    form_data[f'seat_of_bank[{i}]'] = country
+            else:
+                form_data['seat_of_bank[0]'] = params['seat_of_bank']
+        
+        # Sort form data alphabetically
+        return dict(sorted(form_data.items()))
+
+    def make_post_request(self, endpoint, params, priority=ApiBudgetSettings.PRIORITY_ORDER):
+        """Signed POST request of a new order"""
+        return self.signed_request(
+            'POST', endpoint, 'createOrder', priority, form_data=self.build_order_form_data(params)
+        )
+     
+    def build_create_params(self, type, max_amount_currency_to_trade, price,
+                            end_datetime=None, min_trust_level=None,
+                            payment_option=None, sepa_option=None,
+                            seat_of_bank=None):
+        """Parameters of a create order request"""
         params = {
             "type": type,
             "max_amount": float(max_amount_currency_to_trade),
@@ -298,16 +258,27 @@ class BitcoinDeApiClient:
             params["sepa_option"] = int(sepa_option)
         if seat_of_bank:
             params["seat_of_bank"] = seat_of_bank
+        return params
+
+    def create_order(self, trading_pair, type, max_amount_currency_to_trade, price, 
+                    end_datetime=None, min_trust_level=None,
+                    payment_option=None, sepa_option=None,
+                    seat_of_bank=None):
+        """Create a new order on Bitcoin.de"""
+        endpoint = f"{trading_pair}/orders"
+        params = self.build_create_params(
+            type, max_amount_currency_to_trade, price, end_datetime,
+            min_trust_level, payment_option, sepa_option, seat_of_bank
+        )
     
         try:
-            self.logger.info(f"Creating order for {trading_pair}: {json.dumps(params, indent=2)}")
+            self.logger.info("Creating order for %s: %s", trading_pair, LazyJson(params))
             response = self.make_post_request(endpoint, params)
             
             if response is None:
                 self.logger.error("Received None response from API")
                 raise ValueError("Received None response from API")
             
-            self.logger.info(f"API response: {json.dumps(response, indent=2)}")
             return response
                 
         except Exception as e:
@@ -325,14 +296,14 @@ class BitcoinDeApiClient:
             self.log_message(f"Error fetching account info: {str(e)}", level="ERROR")
             raise
 
-    def get_orders(self):
+    def get_orders(self, priority=ApiBudgetSettings.PRIORITY_INTERACTIVE):
         """
         Get all active orders
         GET https://api.bitcoin.de/v4/orders
         """
         try:
             # Use make_api_request method
-            response = self.make_api_request('orders')
+            response = self.make_api_request('orders', priority=priority)
             
             if response and 'orders' in response:
                 self.logger.info(f"Successfully retrieved {len(response['orders'])} orders")
@@ -345,161 +316,190 @@ class BitcoinDeApiClient:
             self.logger.error(f"Error getting orders: {str(e)}")
             return {"orders": []}
     
-    def delete_order(self, trading_pair, order_id):
+    def delete_order(self, trading_pair, order_id, priority=ApiBudgetSettings.PRIORITY_ORDER):
         """
         Delete a specific order
         DELETE https://api.bitcoin.de/v4/:trading_pair/orders/:order_id
         """
+        self.logger.info(f"Deleting order {order_id} ({trading_pair})")
+        return self.signed_request('DELETE', f"{trading_pair}/orders/{order_id}", 'deleteOrder', priority)
+      
+    def prepare_signed_request(self, method, endpoint, form_data=None, params=None):
+        """Build and sign a request without sending it"""
+        endpoint = endpoint.lstrip('/')
+        url = f"{self.base_url}/{endpoint}"
+        if params:
+            url = f"{url}?{urlencode(params)}"  # die Query ist Teil der signierten URI
+        nonce = self.create_nonce()
+        body_md5 = self.body_md5(form_data) if method == 'POST' and form_data else EMPTY_MD5
+        headers = {
+            'Content-Type': 'application/x-www-form-urlencoded',
+            'X-API-KEY': self.api_key,
+            'X-API-NONCE': nonce,
+            'X-API-SIGNATURE': self.sign(method, url, nonce, body_md5)
+        }
+        request = requests.Request(method, url, headers=headers, data=form_data)
+        return self.session.prepare_request(request)
+
+    def prepare_delete_order(self, trading_pair, order_id):
+        """Signed DELETE request for an order"""
+        return self.prepare_signed_request('DELETE', f"{trading_pair}/orders/{order_id}")
+
+    def prepare_create_order(self, trading_pair, **order_params):
+        """Signed POST request for a new order (same parameters as create_order)"""
+        params = self.build_create_params(**order_params)
+        return self.prepare_signed_request('POST', f"{trading_pair}/orders", self.build_order_form_data(params))
+
+    def send_prepared(self, prepared, budget=None, timeout=None):
+        """
+        Send a prepared request over the keep-alive session: the one dispatch point of the client
+        (circuit breaker, credits, logging, error handling). Returns the JSON body (None if the body is no JSON).
+        timeout overrides the client timeout for this call (seconds or (connect, read)).
+        """
+        path = urlsplit(prepared.url).path  # ohne Query (Basic API Schlüssel)
+        self.breaker.before_call()
+        if self.wire_debug:
+            self.log_wire_request(prepared)
+        started = time.perf_counter()
         try:
-            endpoint = f"{trading_pair}/orders/{order_id}"
-            endpoint = endpoint.lstrip('/')
-            url = f"{self.base_url}/{endpoint}"
-            nonce = str(int(datetime.now().timestamp() * 1000000))
-    
-            # Always use empty string MD5 hash for DELETE requests
-            md5_hash = 'd41d8cd98f00b204e9800998ecf8427e'
-    
-            # Create HMAC input data
-            hmac_data = '#'.join([
-                'DELETE',  # Use DELETE method
-                url,
-                self.api_key,
-                nonce,
-                md5_hash
-            ])
-    
-            self.logger.info("=== DELETE Request Details ===")
-            self.logger.debug(f"Endpoint: {endpoint}")
-            self.logger.debug(f"Full URL: {url}")
-            self.logger.debug(f"Nonce: {nonce}")
-            self.logger.debug(f"MD5 hash: {md5_hash}")
-            self.logger.debug(f"HMAC data: {hmac_data}")
-    
-            # Create HMAC-SHA256 signature
-            signature = hmac.new(
-                self.api_secret.encode('utf-8'),
-                hmac_data.encode('utf-8'),
-                hashlib.sha256
-            ).hexdigest()
-    
-            self.logger.debug(f"Generated signature: {signature}")
-    
-            headers = {
-                'Content-Type': 'application/x-www-form-urlencoded',
-                'X-API-KEY': self.api_key,
-                'X-API-NONCE': nonce,
-                'X-API-SIGNATURE': signature
-            }
-    
-            self.logger.debug("Headers:")
-            for key, value in headers.items():
-                self.logger.debug(f"{key}: {value}")
-    
-            # Enable requests debug logging
-            import http.client as http_client
-            http_client.HTTPConnection.debuglevel = 1
-    
-            # Make DELETE request
-            response = requests.delete(url, headers=headers)
-    
-            # Reset debug level
-            http_client.HTTPConnection.debuglevel = 0
-    
-            # Log response details
-            self.logger.info("=== Response Details ===")
-            self.logger.info(f"Status code: {response.status_code}")
-            self.logger.debug(f"Response headers: {dict(response.headers)}")
-            
-            try:
-                response_json = response.json()
-                self.logger.info(f"Response body: {json.dumps(response_json, indent=2)}")
-            except json.JSONDecodeError:
-                self.logger.debug(f"Raw response body: {response.text}")
-    
-            response.raise_for_status()
-            return response.json()
-    
+            response = self.session.send(prepared, timeout=timeout or self.timeout)
         except requests.exceptions.RequestException as e:
-            self.logger.error(f"API request failed: {str(e)}")
-            if hasattr(e, 'response') and e.response is not None:
-                self.logger.error(f"Error response: {e.response.text}")
+            self.breaker.record_failure()
+            self.logger.error(f"API request failed: {prepared.method} {path}: {str(e)}")
             raise
-      
-    def validate_credentials(self) -> bool:
-        """Validate API credentials"""
-        return bool(self.api_key and self.api_secret)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
 
-    def take_post_request(self, endpoint, params):
+        if self.wire_debug:
+            self.logger.info(f"< Response headers: {dict(response.headers)}")
         try:
-            method = 'POST'
-            nonce = str(int(datetime.now().timestamp() * 1000000))
-        
-            # Prepare the complete form data first
-            form_data = {
-                'amount_currency_to_trade': str(params['amount_currency_to_trade']),
-                'type': params['type']
-            }
-        
-            # Add optional parameters
-            if 'payment_option' in params:
-                form_data['payment_option'] = str(params['payment_option'])
-
-            # Sort form data alphabetically
-            sorted_form_data = dict(sorted(form_data.items()))
-
-            # Get signature using all parameters
-            signature = self.create_signature(
-                method=method,
-                endpoint=endpoint,
-                nonce=nonce,
-                params=sorted_form_data  # Use all sorted parameters for signature
-            )
-
-            request_uri = f"{self.base_url}/{endpoint}"
-
-            headers = {
-                'Content-Type': 'application/x-www-form-urlencoded',
-                'X-API-KEY': self.api_key,
-                'X-API-NONCE': nonce,
-                'X-API-SIGNATURE': signature
-            }
-
-            self.logger.info("=== Request details ===")
-            self.logger.debug(f"URI: {request_uri}")
-            self.logger.debug("Headers:")
-            for key, value in headers.items():
-                self.logger.debug(f"{key}: {value}")
-            self.logger.debug(f"Form data (sorted): {sorted_form_data}")
-
-            # Enable requests debug logging
-            import http.client as http_client
-            http_client.HTTPConnection.debuglevel = 1
-
-            # Make request with sorted form data
-            response = requests.post(request_uri, headers=headers, data=sorted_form_data)
-
-            # Reset debug level
-            http_client.HTTPConnection.debuglevel = 0
-
-            # Log response details
-            self.logger.info("=== Response Details ===")
-            self.logger.info(f"Status code: {response.status_code}")
-            self.logger.debug(f"Response headers: {dict(response.headers)}")
-
-            try:
-                response_json = response.json()
-                self.logger.info(f"Response body: {json.dumps(response_json, indent=2)}")
-            except json.JSONDecodeError:
-                self.logger.debug(f"Raw response body: {response.text}")
+            response_json = response.json()
+        except ValueError:
+            response_json = None
+            self.logger.debug("Raw response body: %s", response.text[:ResponseLogSettings.MAX_CHARS])
+        self.response_log.log(prepared.method, path, response.status_code, response_json, elapsed_ms)
+        self.track_credits(response, response_json, budget)
 
+        try:
             response.raise_for_status()
-            return response.json()
+        except requests.exceptions.HTTPError:
+            self.logger.error(f"API request failed: {prepared.method} {path}: Status code {response.status_code}")
+            self.logger.error(f"Error response: {response.text[:ResponseLogSettings.MAX_CHARS]}")
+            raise
+        return response_json
+
+    def log_wire_request(self, prepared):
+        """Log a request as it goes over the wire (only with wire_debug, per client)"""
+        self.logger.info(f"> {prepared.method} {prepared.url}")
+        for key, value in prepared.headers.items():
+            self.logger.info(f"> {key}: {value}")
+        if prepared.body:
+            self.logger.info(f"> {prepared.body}")
+
+    def replace_order(self, trading_pair, order_id, **order_params):
+        """
+        Replace an order with as little time as possible without an order in the book.
+        Both requests are built and signed before the DELETE is sent (the create nonce is the
+        higher one), the POST goes out on the same connection as soon as the DELETE is confirmed.
+        If another request took a newer nonce during the DELETE, the POST is signed again before
+        it is sent; if the API still rejects its nonce, it is signed and sent once more.
+        Returns (delete_response, create_response, timings) - create_response is None if the
+        DELETE failed. timings: delete_ms, create_ms and gap_ms (DELETE sent -> order created).
+        The credits of both requests are reserved before signing, so the POST never waits for
+        the budget; the POST credits are returned if it is not sent.
+        """
+        create_cost = ApiBudgetSettings.COSTS['createOrder']
+        self.budget.acquire(ApiBudgetSettings.COSTS['deleteOrder'] + create_cost, ApiBudgetSettings.PRIORITY_ORDER)
+        syncs = self.budget.syncs
+        delete_request = self.prepare_delete_order(trading_pair, order_id)
+        create_request = self.prepare_create_order(trading_pair, **order_params)
+
+        timings = {}
+        delete_sent = time.perf_counter()
+        try:
+            delete_response = self.send_prepared(delete_request)  # Fehler protokolliert send_prepared
+        except Exception:
+            self.budget.refund(create_cost, syncs)
+            raise
+        delete_confirmed = time.perf_counter()
+        timings['delete_ms'] = (delete_confirmed - delete_sent) * 1000
+        if not delete_response or delete_response.get('errors'):
+            self.budget.refund(create_cost, syncs)
+            return delete_response, None, timings
+
+        # Die Sperre nur zum Prüfen halten - gesendet wird ohne, sonst warten alle anderen Anfragen auf den POST
+        with self.nonce_lock:
+            if self.last_nonce > int(create_request.headers['X-API-NONCE']):
+                # Eine andere Anfrage hat während des DELETE eine höhere Nonce bekommen
+                self.logger.debug(f"Order {order_id}: POST mit neuer Nonce signiert")
+                create_request = self.prepare_create_order(trading_pair, **order_params)
+        create_response = self.send_create(create_request)
+        if self.nonce_rejected(create_response):
+            # Eine später signierte Anfrage kam zuerst an - einmal mit neuer Nonce wiederholen
+            self.logger.warning(f"Order {order_id}: POST wegen Nonce abgelehnt, neuer Versuch")
+            try:
+                self.spend_credits('createOrder', ApiBudgetSettings.PRIORITY_ORDER)
+                create_response = self.send_create(self.prepare_create_order(trading_pair, **order_params))
+            except ApiBudgetExceeded as e:
+                create_response = {'errors': [str(e)]}
+        created = time.perf_counter()
+        timings['create_ms'] = (created - delete_confirmed) * 1000
+        timings['gap_ms'] = (created - delete_sent) * 1000
+        self.logger.info(
+            f"Order {order_id} ersetzt: Löschen {timings['delete_ms']:.0f} ms, "
+            f"Erstellen {timings['create_ms']:.0f} ms, Lücke {timings['gap_ms']:.0f} ms"
+        )
+        return delete_response, create_response, timings
 
+    def send_create(self, create_request):
+        """Send the POST of replace_order, errors are returned as {'errors': [...]} (with the API error body if there is one)"""
+        try:
+            return self.send_prepared(create_request)
+        except requests.exceptions.HTTPError as e:
+            try:
+                body = e.response.json()
+            except ValueError:
+                body = None
+            if isinstance(body, dict) and body.get('errors'):
+                return body
+            return {'errors': [str(e)]}
         except requests.exceptions.RequestException as e:
-            self.logger.error(f"API request failed: {str(e)}")
-            if hasattr(e, 'response') and e.response is not None:
-                self.logger.error(f"Error response: {e.response.text}")
-            raise   
+            return {'errors': [str(e)]}
+
+    @staticmethod
+    def nonce_rejected(response_json):
+        """Check if the API rejected a request because of its nonce"""
+        errors = response_json.get('errors') if isinstance(response_json, dict) else None
+        return any(
+            isinstance(error, dict) and str(error.get('code')) == str(HttpSettings.INVALID_NONCE_ERROR_CODE)
+            for error in errors or []
+        )
+
+    def close(self):
+        """Close the pooled connections"""
+        self.session.close()
+
+    def validate_credentials(self) -> bool:
+        """Validate API credentials"""
+        return bool(self.api_key and self.api_secret)
+
+    def take_post_request(self, endpoint, params, priority=ApiBudgetSettings.PRIORITY_ORDER):
+        """Signed POST request of a trade"""
+        form_data = {
+            'amount_currency_to_trade': str(params['amount_currency_to_trade']),
+            'type': params['type']
+        }
+
+        # Add optional parameters
+        if 'payment_option' in params:
+            form_data['payment_option'] = str(params['payment_option'])
+
+        # Sort form data alphabetically
+        sorted_form_data = dict(sorted(form_data.items()))
+        return self.signed_request('POST', endpoint, 'executeTrade', priority, form_data=sorted_form_data)
     
         # Kaufen
     def take_order(self, trading_pair, order_id, type, amount_currency_to_trade, payment_option=None):
@@ -517,14 +517,13 @@ class BitcoinDeApiClient:
             params["payment_option"] = int(payment_option)
 
         try:
-            self.logger.info(f"Taking order {trading_pair}: {json.dumps(params, indent=2)}")
+            self.logger.info("Taking order %s: %s", trading_pair, LazyJson(params))
             response = self.take_post_request(endpoint, params)
 
             if response is None:
                 self.logger.error("Received None response from API")
                 raise ValueError("Received None response from API")
 
-            self.logger.info(f"API response: {json.dumps(response, indent=2)}")
             return response
 
         except Exception as e:
@@ -550,14 +549,13 @@ class BitcoinDeApiClient:
         }
     
         try:
-            self.logger.info(f"Taking buy order {trading_pair}: {json.dumps(params, indent=2)}")
+            self.logger.info("Taking buy order %s: %s", trading_pair, LazyJson(params))
             response = self.take_post_request(endpoint, params)
     
             if response is None:
                 self.logger.error("Received None response from API")
                 raise ValueError("Received None response from API")
     
-            self.logger.info(f"API response: {json.dumps(response, indent=2)}")
             return response
     
         except Exception as e:
@@ -566,88 +564,9 @@ class BitcoinDeApiClient:
                 self.logger.error(f"API Error Response: {e.response.text}")
             raise
 
-    def make_api_request_ledger(self, endpoint, params=None):
-        try:
-            endpoint = endpoint.lstrip('/')
-            url = f"{self.base_url}/{endpoint}"
-            nonce = str(int(datetime.now().timestamp() * 1000000))
-    
-            # Always use empty string MD5 hash for GET requests
-            md5_hash = 'd41d8cd98f00b204e9800998ecf8427e'
-    
-            # URL encode the parameters
-            if params:
-                query_string = urlencode(params)
-                url = f"{url}?{query_string}"
-    
-            # Create HMAC input data
-            hmac_data = '#'.join([
-                'GET',  # Always GET
-                url,
-                self.api_key,
-                nonce,
-                md5_hash
-            ])
-    
-            self.logger.info("=== GET Request Details ===")
-            self.logger.debug(f"Endpoint: {endpoint}")
-            self.logger.debug(f"Full URL: {url}")
-            self.logger.debug(f"Nonce: {nonce}")
-            self.logger.debug(f"MD5 hash: {md5_hash}")
-            self.logger.debug(f"HMAC data: {hmac_data}")
-    
-            # Create HMAC-SHA256 signature
-            signature = hmac.new(
-                self.api_secret.encode('utf-8'),
-                hmac_data.encode('utf-8'),
-                hashlib.sha256
-            ).hexdigest()
-    
-            self.logger.debug(f"Generated signature: {signature}")
-    
-            headers = {
-                'Content-Type': 'application/x-www-form-urlencoded',
-                'X-API-KEY': self.api_key,
-                'X-API-NONCE': nonce,
-                'X-API-SIGNATURE': signature
-            }
-    
-            self.logger.debug("Headers:")
-            for key, value in headers.items():
-                self.logger.debug(f"{key}: {value}")
-    
-            if params:
-                self.logger.debug(f"Query parameters: {params}")
-    
-            # Enable requests debug logging
-            import http.client as http_client
-            http_client.HTTPConnection.debuglevel = 1
-    
-            # Make GET request
-            response = requests.get(url, headers=headers)
-    
-            # Reset debug level
-            http_client.HTTPConnection.debuglevel = 0
-    
-            # Log response details
-            self.logger.info("=== Response Details ===")
-            self.logger.info(f"Status code: {response.status_code}")
-            self.logger.debug(f"Response headers: {dict(response.headers)}")
-            
-            try:
-                response_json = response.json()
-                self.logger.info(f"Response body: {json.dumps(response_json, indent=2)}")
-            except json.JSONDecodeError:
-                self.logger.debug(f"Raw response body: {response.text}")
-    
-            response.raise_for_status()
-            return response_json
-    
-        except requests.exceptions.RequestException as e:
-            self.logger.error(f"API request failed: {str(e)}")
-            if hasattr(e, 'response') and e.response is not None:
-                self.logger.error(f"Error response: {e.response.text}")
-            raise
+    def make_api_request_ledger(self, endpoint, params=None, priority=ApiBudgetSettings.PRIORITY_BACKGROUND):
+        """Signed GET request of an account ledger page"""
+        return self.signed_request('GET', endpoint, 'showAccountLedger', priority, params=params)
 
     def get_all_account_ledgers(self, currencies, datetime_start='2013-01-20T15:00:00+02:00', type='all', page=1):
         """Get account ledger for all specified currencies using Full API"""
@@ -0,0 +1,488 @@
+"""
+Offline backtest of the trade bot repricing strategy.
+
+Replays an orderbook event journal of the Orderbuch-server (ORDERBUCH_JOURNAL_DIR) through the
+same decision function as the live bot (bot_engine.decide_order_price) against a simulated
+exchange and reports fills, queue position and P&L.
+
+Fill model: bitcoin.de has no matching engine, takers pick an order from the book. The backtest
+assumes takers always take the best order, so when an order of our side that is queued behind
+our own order (worse price, or same price but newer) is removed while nothing is queued ahead of
+ours, our order would have been taken first and counts as filled (up to the removed amount).
+With orders ahead of ours such a removal can only be a cancellation. Cancellations behind a
+top-of-queue order can not be told apart from trades in the journal, so the fill numbers are an
+optimistic estimate.
+
+Usage:
+    python backtester.py journal/orderbook-2024-05-*.jsonl --pair btceur --type buy \\
+        --amount 0.01 --min-price 60000 --max-price 61000 61500 62000 --order-interval 15 30
+Every option with several values is part of the parameter grid; the grid runs in a process pool.
+"""
+import argparse
+import csv
+import glob
+import itertools
+import json
+import logging
+import time
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from bot_engine import decide_order_price
+from constants import BacktestSettings, TradeBotSettings
+from orderbook_data import BookIndex
+
+OWN_ORDER_ID = '__own__'
+QUEUE_EPSILON = 1e-9  # Rundungsrest der inkrementell geführten Menge vor dem eigenen Order
+
+# Ereignisse: (ts, Aktion, order_id, Seite, Preis, Menge)
+ADD, REMOVE, SNAPSHOT = 0, 1, 2
+
+
+def load_journal(paths, trading_pair):
+    """
+    Read journal files into a compact event list for one trading pair.
+    Snapshot lines become a SNAPSHOT event followed by one ADD per order.
+    """
+    events = []
+    pair_marker = f'"{trading_pair}"'
+    for path in paths:
+        with open(path, encoding='utf-8') as journal:
+            for line in journal:
+                if pair_marker not in line:
+                    continue  # schneller Vorfilter, ohne JSON zu parsen
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                ts = entry.get('ts', 0.0)
+                action = entry.get('action')
+                if action == 'snapshot':
+                    events.append((ts, SNAPSHOT, None, None, 0.0, 0.0))
+                    for order in entry.get('orders', []):
+                        if order.get('trading_pair') == trading_pair:
+                            events.append(order_event(ts, ADD, order))
+                elif action in ('add', 'remove'):
+                    order = entry.get('order', {})
+                    if order.get('trading_pair') == trading_pair:
+                        events.append(order_event(ts, ADD if action == 'add' else REMOVE, order))
+    return events
+
+
+def order_event(ts, action, order):
+    side = 'asks' if (order.get('order_type') or '').lower() == 'sell' else 'bids'
+    return (ts, action, order.get('order_id'), side, float(order.get('price') or 0), float(order.get('amount') or 0))
+
+
+class ReplaySide:
+    """One side of the replayed book, sorted by priority (best price first, then time)"""
+
+    def __init__(self, side):
+        self.side = side
+        self.keys = []  # Sortierschlüssel: asks Preis, bids -Preis
+        self.ids = []
+        self.amounts = {}
+
+    def key(self, price):
+        return price if self.side == 'asks' else -price
+
+    def add(self, order_id, price, amount):
+        if order_id in self.amounts:
+            self.remove(order_id)
+        key = self.key(price)
+        index = bisect_right(self.keys, key)  # hinter allen Orders zum gleichen Preis
+        self.keys.insert(index, key)
+        self.ids.insert(index, order_id)
+        self.amounts[order_id] = amount
+        return index
+
+    def position(self, order_id, price):
+        """Index of an order in the priority queue or -1"""
+        key = self.key(price)
+        index = bisect_left(self.keys, key)
+        while index < len(self.keys) and self.keys[index] == key:
+            if self.ids[index] == order_id:
+                return index
+            index += 1
+        return -1
+
+    def remove_at(self, index):
+        del self.keys[index]
+        order_id = self.ids.pop(index)
+        return self.amounts.pop(order_id, 0.0)
+
+    def remove(self, order_id, price=None):
+        """Remove an order, returns (index, amount) or (-1, 0)"""
+        if order_id not in self.amounts:
+            return -1, 0.0
+        index = self.position(order_id, price) if price is not None else -1
+        if index < 0:
+            index = self.ids.index(order_id)
+        return index, self.remove_at(index)
+
+    def best_other(self):
+        """Best price without the own order"""
+        for key, order_id in zip(self.keys, self.ids):
+            if order_id != OWN_ORDER_ID:
+                return abs(key)
+        return None
+
+    def amount_ahead(self, index):
+        return sum(self.amounts[order_id] for order_id in self.ids[:index])
+
+    def book_index(self):
+        prices = np.abs(np.array(self.keys, dtype=float))
+        amounts = np.array([self.amounts[order_id] for order_id in self.ids], dtype=float)
+        return BookIndex(prices, amounts, np.array(self.ids, dtype=object), self.side)
+
+
+class ReplaySnapshot:
+    """Minimal stand-in for OrderbookSnapshot as used by decide_order_price"""
+
+    def __init__(self, book):
+        self.book = book
+        self.indexes = {}
+
+    def index(self, side):
+        index = self.indexes.get(side)
+        if index is None:
+            index = self.book[side].book_index()
+            self.indexes[side] = index
+        return index
+
+
+class BacktestParams:
+    """One parameter set of the grid"""
+
+    FIELDS = ('trade_type', 'amount', 'min_price', 'max_price', 'check_interval',
+              'order_interval', 'debounce_ms', 'latency_ms', 'fee_rate', 'restart_after_fill')
+
+    def __init__(self, trade_type, amount, min_price, max_price, check_interval=30, order_interval=15,
+                 debounce_ms=TradeBotSettings.TOP_OF_BOOK_DEBOUNCE_MS, latency_ms=BacktestSettings.LATENCY_MS,
+                 fee_rate=BacktestSettings.FEE_RATE, restart_after_fill=True):
+        self.trade_type = trade_type
+        self.amount = float(amount)
+        self.min_price = float(min_price)
+        self.max_price = float(max_price)
+        self.check_interval = float(check_interval)
+        self.order_interval = float(order_interval)
+        self.debounce_ms = float(debounce_ms)
+        self.latency_ms = float(latency_ms)
+        self.fee_rate = float(fee_rate)
+        self.restart_after_fill = bool(restart_after_fill)
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+
+class Backtest:
+    """Event-driven replay of one parameter set"""
+
+    def __init__(self, params, logger=None):
+        self.params = params
+        self.logger = logger or logging.getLogger("Backtester")
+        self.side = 'bids' if params.trade_type == 'buy' else 'asks'
+        self.book = {'asks': ReplaySide('asks'), 'bids': ReplaySide('bids')}
+        self.order_sides = {}  # order_id -> (side, price)
+
+        # Eigenes Order
+        self.own_price = None
+        self.own_remaining = 0.0
+        self.own_active_from = 0.0  # Latenz: das Order steht erst ab diesem Zeitpunkt im Buch
+        self.own_ahead = 0.0  # Menge vor dem eigenen Order (inkrementell geführt)
+        self.stopped = False
+
+        # Ablaufsteuerung wie im Bot: Obergrenze durch Intervalle, früher nach Änderung am besten Preis
+        self.deadline = None
+        self.wake_at = None
+        self.last_top_of_book = None
+
+        # Ergebnis
+        self.fills = []  # (ts, price, amount)
+        self.decisions = 0
+        self.replaces = 0
+        self.position = 0.0
+        self.cash = 0.0
+        self.fees = 0.0
+        self.queue_time = 0.0
+        self.queue_orders_weighted = 0.0
+        self.queue_amount_weighted = 0.0
+        self.top_time = 0.0
+        self.last_ts = None
+
+    # Buch
+    def apply(self, event):
+        ts, action, order_id, side, price, amount = event
+        if action == SNAPSHOT:
+            # Das Journal beginnt eine neue Datei: Buch neu aufbauen, eigenes Order behalten
+            own = self.own_price is not None
+            self.book = {'asks': ReplaySide('asks'), 'bids': ReplaySide('bids')}
+            self.order_sides = {}
+            if own:
+                self.book[self.side].add(OWN_ORDER_ID, self.own_price, self.own_remaining)
+            self.own_ahead = 0.0
+            return
+        if action == ADD:
+            known = self.order_sides.get(order_id)
+            if known:
+                self.remove_order(ts, order_id, known, check_fill=False)
+            own_index = self.own_index() if side == self.side else -1
+            index = self.book[side].add(order_id, price, amount)
+            if 0 <= index <= own_index:
+                self.own_ahead += amount
+            self.order_sides[order_id] = (side, price)
+            return
+
+        known = self.order_sides.pop(order_id, None)
+        if known:
+            self.remove_order(ts, order_id, known)
+
+    def own_index(self):
+        if self.own_price is None:
+            return -1
+        return self.book[self.side].position(OWN_ORDER_ID, self.own_price)
+
+    def remove_order(self, ts, order_id, known, check_fill=True):
+        side, price = known
+        own_index = self.own_index() if side == self.side else -1
+        index, removed_amount = self.book[side].remove(order_id, price)
+        if index < 0 or own_index < 0:
+            return
+        if index < own_index:
+            self.own_ahead -= removed_amount
+        elif check_fill:
+            self.check_fill(ts, removed_amount)
+
+    def check_fill(self, ts, removed_amount):
+        """
+        A removed order behind the own order means the own order would have been taken first -
+        but only if it is at the top of the queue, otherwise the orders ahead would have been taken
+        """
+        if self.own_price is None or ts < self.own_active_from:
+            return
+        if self.own_ahead > QUEUE_EPSILON:
+            return  # Orders vor dem eigenen sind noch da: das entfernte Order wurde gelöscht
+        fill_amount = min(removed_amount, self.own_remaining)
+        if fill_amount <= 0:
+            return
+        self.record_fill(ts, self.own_price, fill_amount)
+        self.own_remaining -= fill_amount
+        if self.own_remaining <= 1e-12:
+            self.book[self.side].remove(OWN_ORDER_ID, self.own_price)
+            self.own_price = None
+            # Der Live-Bot stoppt, wenn sein Order verschwindet
+            if self.params.restart_after_fill:
+                self.deadline = ts
+            else:
+                self.stopped = True
+        else:
+            # Teilausführung: Restmenge bleibt an gleicher Stelle stehen
+            self.book[self.side].amounts[OWN_ORDER_ID] = self.own_remaining
+
+    def record_fill(self, ts, price, amount):
+        value = price * amount
+        fee = value * self.params.fee_rate
+        self.fees += fee
+        if self.params.trade_type == 'buy':
+            self.position += amount
+            self.cash -= value + fee
+        else:
+            self.position -= amount
+            self.cash += value - fee
+        self.fills.append((ts, price, amount))
+
+    # Strategie
+    def own_order(self):
+        if self.own_price is None:
+            return None
+        return {'order_id': OWN_ORDER_ID, 'type': self.params.trade_type, 'price': self.own_price}
+
+    def place(self, ts, price):
+        """Replace the own order (new order joins the end of its price level)"""
+        if self.own_price is not None:
+            self.book[self.side].remove(OWN_ORDER_ID, self.own_price)
+            self.replaces += 1
+        self.own_price = price
+        self.own_remaining = self.params.amount
+        self.own_active_from = ts + self.params.latency_ms / 1000.0
+        side = self.book[self.side]
+        self.own_ahead = side.amount_ahead(side.add(OWN_ORDER_ID, price, self.own_remaining))
+
+    def decide(self, ts):
+        """One bot iteration (same flow as BotInstance.step)"""
+        self.decisions += 1
+        own_order = self.own_order()
+        if own_order is None:
+            # Live: kein eigenes Order gefunden -> neues Order zum Min Preis
+            self.place(ts, self.params.min_price)
+            return self.params.order_interval
+
+        order_needed, new_price = decide_order_price(
+            ReplaySnapshot(self.book), own_order, self.params.min_price, self.params.max_price, self.logger
+        )
+        if not order_needed:
+            return self.params.check_interval
+        self.place(ts, new_price if new_price is not None else self.params.min_price)
+        return self.params.order_interval
+
+    def track_queue(self, ts):
+        """Time-weighted queue position of the own order"""
+        if self.last_ts is not None and self.own_price is not None:
+            elapsed = ts - self.last_ts
+            if elapsed > 0:
+                side = self.book[self.side]
+                index = side.position(OWN_ORDER_ID, self.own_price)
+                if index >= 0:
+                    self.queue_time += elapsed
+                    self.queue_orders_weighted += index * elapsed
+                    self.queue_amount_weighted += self.own_ahead * elapsed
+                    if index == 0:
+                        self.top_time += elapsed
+        self.last_ts = ts
+
+    def run_due(self, ts):
+        """Run the bot iterations that are due before ts"""
+        while not self.stopped and self.deadline is not None:
+            due = self.deadline if self.wake_at is None else min(self.deadline, self.wake_at)
+            if due > ts:
+                return
+            self.wake_at = None
+            self.track_queue(due)
+            self.deadline = due + self.decide(due)
+            self.last_top_of_book = self.book[self.side].best_other()
+
+    def run(self, events):
+        started = False
+        for event in events:
+            ts = event[0]
+            if started:
+                self.run_due(ts)
+            self.track_queue(ts)
+            self.apply(event)
+            if not started and event[1] != SNAPSHOT:
+                started = True
+                self.deadline = ts  # Bot startet mit dem ersten Ereignis nach dem Snapshot
+                continue
+            if started and self.wake_at is None:
+                top_of_book = self.book[self.side].best_other()
+                if top_of_book != self.last_top_of_book:
+                    self.last_top_of_book = top_of_book
+                    self.wake_at = ts + self.params.debounce_ms / 1000.0
+        return self.report(events)
+
+    def report(self, events):
+        best_ask = self.book['asks'].best_other()
+        best_bid = self.book['bids'].best_other()
+        mid = (best_ask + best_bid) / 2 if best_ask is not None and best_bid is not None else (best_ask or best_bid or 0.0)
+        filled = sum(amount for _, _, amount in self.fills)
+        return {
+            **self.params.to_dict(),
+            'events': len(events),
+            'duration_h': round((events[-1][0] - events[0][0]) / 3600, 2) if events else 0.0,
+            'decisions': self.decisions,
+            'replaces': self.replaces,
+            'fills': len(self.fills),
+            'filled_amount': round(filled, 8),
+            'avg_fill_price': round(sum(price * amount for _, price, amount in self.fills) / filled, 2) if filled else None,
+            'fees': round(self.fees, 2),
+            'position': round(self.position, 8),
+            'mark_price': round(mid, 2),
+            'pnl': round(self.cash + self.position * mid, 2),  # zum Mittelkurs am Ende bewertet
+            'avg_queue_orders': round(self.queue_orders_weighted / self.queue_time, 2) if self.queue_time else None,
+            'avg_queue_amount': round(self.queue_amount_weighted / self.queue_time, 8) if self.queue_time else None,
+            'top_share': round(self.top_time / self.queue_time, 3) if self.queue_time else None
+        }
+
+
+# Prozess-Pool: die Ereignisse werden pro Worker nur einmal übertragen
+_worker_events = None
+
+
+def _init_worker(events):
+    global _worker_events
+    _worker_events = events
+    logging.getLogger("Backtester").setLevel(logging.WARNING)
+
+
+def _run_worker(params_dict):
+    return Backtest(BacktestParams(**params_dict)).run(_worker_events)
+
+
+def run_grid(events, grid, workers=BacktestSettings.WORKERS):
+    """Run every parameter combination of grid (name -> list of values), best P&L first"""
+    names = list(grid)
+    combinations = [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+    if len(combinations) == 1 or workers <= 1:
+        _init_worker(events)
+        results = [_run_worker(combination) for combination in combinations]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(events,)) as executor:
+            results = list(executor.map(_run_worker, combinations))
+    return sorted(results, key=lambda result: result['pnl'], reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest der Trade-Bot-Strategie auf einem Orderbuch-Journal")
+    parser.add_argument('journal', nargs='+', help="Journal-Dateien (*.jsonl, Glob-Muster erlaubt)")
+    parser.add_argument('--pair', default='btceur')
+    parser.add_argument('--type', dest='trade_type', nargs='+', default=['buy'], choices=['buy', 'sell'])
+    parser.add_argument('--amount', nargs='+', type=float, required=True)
+    parser.add_argument('--min-price', nargs='+', type=float, required=True)
+    parser.add_argument('--max-price', nargs='+', type=float, required=True)
+    parser.add_argument('--check-interval', nargs='+', type=float, default=[30])
+    parser.add_argument('--order-interval', nargs='+', type=float, default=[15])
+    parser.add_argument('--debounce-ms', nargs='+', type=float, default=[TradeBotSettings.TOP_OF_BOOK_DEBOUNCE_MS])
+    parser.add_argument('--latency-ms', nargs='+', type=float, default=[BacktestSettings.LATENCY_MS])
+    parser.add_argument('--fee-rate', nargs='+', type=float, default=[BacktestSettings.FEE_RATE])
+    parser.add_argument('--stop-after-fill', action='store_true', help="wie der Live-Bot nach der ersten Ausführung stoppen")
+    parser.add_argument('--workers', type=int, default=BacktestSettings.WORKERS)
+    parser.add_argument('--csv', help="Ergebnisse zusätzlich als CSV speichern")
+    parser.add_argument('--top', type=int, default=10, help="Anzahl der angezeigten Ergebnisse")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    logger = logging.getLogger("Backtester")
+
+    paths = sorted(path for pattern in args.journal for path in (glob.glob(pattern) or [pattern]))
+    started = time.perf_counter()
+    events = load_journal(paths, args.pair)
+    logger.info(f"{len(events)} Ereignisse für {args.pair} aus {len(paths)} Dateien geladen ({time.perf_counter() - started:.1f}s)")
+    if not events:
+        return
+
+    grid = {
+        'trade_type': args.trade_type,
+        'amount': args.amount,
+        'min_price': args.min_price,
+        'max_price': args.max_price,
+        'check_interval': args.check_interval,
+        'order_interval': args.order_interval,
+        'debounce_ms': args.debounce_ms,
+        'latency_ms': args.latency_ms,
+        'fee_rate': args.fee_rate,
+        'restart_after_fill': [not args.stop_after_fill]
+    }
+    logger.setLevel(logging.WARNING)  # decide_order_price loggt jede Entscheidung
+    started = time.perf_counter()
+    results = run_grid(events, grid, args.workers)
+    logger.setLevel(logging.INFO)
+    logger.info(f"{len(results)} Parameter-Kombinationen in {time.perf_counter() - started:.1f}s getestet")
+
+    columns = ['trade_type', 'min_price', 'max_price', 'check_interval', 'order_interval', 'debounce_ms',
+               'fills', 'filled_amount', 'avg_fill_price', 'pnl', 'avg_queue_orders', 'top_share', 'replaces']
+    print(' | '.join(columns))
+    for result in results[:args.top]:
+        print(' | '.join(str(result[column]) for column in columns))
+
+    if args.csv:
+        with open(args.csv, 'w', newline='', encoding='utf-8') as csv_file:
+            writer = csv.DictWriter(csv_file, fieldnames=list(results[0]))
+            writer.writeheader()
+            writer.writerows(results)
+        logger.info(f"Ergebnisse gespeichert: {args.csv}")
+
+
+if __name__ == '__main__':
+    main()
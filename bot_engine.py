@@ -0,0 +1,797 @@
+import csv
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from constants import ApiBudgetSettings, TradingConstants, TradeBotSettings
+from own_orders import OrderState, OwnOrderRegistry
+
+
+def default_end_datetime():
+    """Standard-Enddatum einer Bot-Order (2 Tage in der Zukunft, 12:00) im RFC 3339-Format mit Zeitzone"""
+    future_date = (datetime.now() + timedelta(days=2)).replace(hour=12, minute=0, second=0, microsecond=0)
+    tz = timezone(timedelta(seconds=time.localtime().tm_gmtoff))
+    return future_date.replace(tzinfo=tz).isoformat()
+
+
+def decide_order_price(snapshot, own_order, min_price, max_price, logger, exclude=None):
+    """
+    Strategy of the trade bot: decide if the own order has to be replaced and at which price.
+    The own order stays 0.01 € in front of the best other order, within [min_price, max_price].
+    exclude: further order ids to ignore (e.g. orders of other bot instances).
+    Returns (order_needed, new_price).
+    """
+    own_price = float(own_order.get('price', 0))
+    own_order_id = own_order.get('order_id')  # ID des eigenen Orders
+    exclude = set(exclude or ()) | {own_order_id}
+    trade_type = own_order['type']
+
+    # Logik für Kauforders (buy)
+    if trade_type == "buy":
+        bids = snapshot.index('bids')
+        if not len(bids):
+            logger.warning("Keine Kauforders ('bids') im Orderbuch verfügbar.")
+            return False, None
+
+        # Höchstes Gebot (ohne eigenes Order)
+        highest_bid_price = bids.best_price(exclude)
+        if highest_bid_price is None:
+            logger.info("Kein anderes Gebot im Orderbuch. Keine Aktion erforderlich.")
+            return False, None
+
+        logger.info(f"Höchster Ankaufs-Preis im Orderbuch (ohne eigenes Order): {highest_bid_price}")
+
+        # Prüfen, ob das eigene Order das höchste ist
+        if own_price > highest_bid_price:
+            # Preis senken, falls möglich
+            new_price = max(highest_bid_price + 0.01, min_price)
+            if new_price != own_price:
+                logger.info(f"Preisänderung erforderlich: Aktueller Preis {own_price}, neuer Preis {new_price}.")
+                return True, new_price
+        elif own_price < highest_bid_price:
+            # Preis erhöhen, falls nötig
+            if highest_bid_price > max_price:
+                # Setze auf den nächsthöheren Preis innerhalb der Spanne
+                next_highest_bid = bids.best_below(max_price, exclude)
+                if next_highest_bid is not None:
+                    next_highest_price = next_highest_bid + 0.01
+                    if next_highest_price <= max_price:
+                        # Logge den nächstniedrigeren Preis, da er relevant ist
+                        logger.info(f"Nächstniedriger Preis im Orderbuch: {next_highest_bid}")
+                        logger.info(f"Preisänderung erforderlich: Aktueller Preis {own_price}, neuer Preis {next_highest_price}.")
+                        return True, next_highest_price
+                logger.info("Kein gültiger Preis innerhalb der Spanne verfügbar. Keine Aktion erforderlich.")
+                return False, None
+            else:
+                new_price = min(highest_bid_price + 0.01, max_price)
+                if new_price != own_price:
+                    logger.info(f"Preisänderung erforderlich: Aktueller Preis {own_price}, neuer Preis {new_price}.")
+                    return True, new_price
+
+        logger.info("Das eigene Order hat bereits die beste Position. Keine Aktion erforderlich.")
+        return False, None
+
+    # Logik für Verkaufsorders (sell)
+    elif trade_type == "sell":
+        asks = snapshot.index('asks')
+        if not len(asks):
+            logger.warning("Keine Verkaufsorders ('asks') im Orderbuch verfügbar.")
+            return False, None
+
+        # Niedrigstes Angebot (ohne eigenes Order)
+        lowest_ask_price = asks.best_price(exclude)
+        if lowest_ask_price is None:
+            logger.info("Kein anderes Angebot im Orderbuch. Keine Aktion erforderlich.")
+            return False, None
+
+        logger.info(f"Niedrigster Verkaufs-Preis im Orderbuch (ohne eigenes Order): {lowest_ask_price}")
+
+        # Prüfen, ob das eigene Order das niedrigste ist
+        if own_price < lowest_ask_price:
+            # Preis erhöhen, falls nötig
+            new_price = min(lowest_ask_price - 0.01, max_price)
+            if new_price != own_price:
+                logger.info(f"Preisänderung erforderlich: Aktueller Preis {own_price}, neuer Preis {new_price}.")
+                return True, new_price
+        elif own_price > lowest_ask_price:
+            # Preis senken, falls möglich
+            if lowest_ask_price < min_price:
+                # Setze auf den nächsthöheren Preis innerhalb der Spanne
+                next_lowest_ask = asks.best_above(min_price, exclude)
+                if next_lowest_ask is not None:
+                    next_lowest_price = next_lowest_ask - 0.01
+                    if next_lowest_price >= min_price:
+                        # Logge den nächsthöheren Preis, da er relevant ist
+                        logger.info(f"Nächsthöherer Preis im Orderbuch: {next_lowest_ask}")
+                        logger.info(f"Preisänderung erforderlich: Aktueller Preis {own_price}, neuer Preis {next_lowest_price}.")
+                        return True, next_lowest_price
+                logger.info("Kein gültiger Preis innerhalb der Spanne verfügbar. Keine Aktion erforderlich.")
+                return False, None
+            else:
+                new_price = max(lowest_ask_price - 0.01, min_price)
+                if new_price != own_price:
+                    logger.info(f"Preisänderung erforderlich: Aktueller Preis {own_price}, neuer Preis {new_price}.")
+                    return True, new_price
+
+        logger.info("Das eigene Order hat bereits die beste Position. Keine Aktion erforderlich.")
+        return False, None
+
+    logger.info("Keine Aktion erforderlich.")
+    return False, None
+
+
+class BotSettings:
+    """Settings of one bot instance"""
+
+    FIELDS = (
+        'trading_pair', 'trade_type', 'amount', 'min_price', 'max_price',
+        'min_trust_level', 'payment_option', 'sepa_option', 'seat_of_bank',
+        'check_interval', 'order_interval', 'debounce_ms'
+    )
+
+    def __init__(self, trading_pair, trade_type, amount, min_price, max_price,
+                 min_trust_level=TradingConstants.TrustLevel.BRONZE.value,
+                 payment_option=TradingConstants.ORDERBOOK_PAYMENT_OPTION_SEPA_ONLY,
+                 sepa_option=TradingConstants.SEPA_OPTION_NONE,
+                 seat_of_bank=TradingConstants.BankCountry.GERMANY.value,
+                 check_interval=30, order_interval=15,
+                 debounce_ms=TradeBotSettings.TOP_OF_BOOK_DEBOUNCE_MS):
+        self.trading_pair = trading_pair.lower()
+        self.trade_type = trade_type
+        self.amount = float(amount)
+        self.min_price = float(min_price)
+        self.max_price = float(max_price)
+        self.min_trust_level = min_trust_level
+        self.payment_option = int(payment_option)
+        self.sepa_option = int(sepa_option)
+        self.seat_of_bank = seat_of_bank.split()[0]  # "DE Germany" -> "DE"
+        self.check_interval = float(check_interval)
+        self.order_interval = float(order_interval)
+        self.debounce_ms = int(debounce_ms)
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{key: value for key, value in data.items() if key in cls.FIELDS})
+
+    def to_dict(self):
+        return {key: getattr(self, key) for key in self.FIELDS}
+
+    def validate(self):
+        """Raise ValueError for settings the bot can not trade with"""
+        if self.trade_type not in ('buy', 'sell'):
+            raise ValueError(f"Ungültiger Typ: {self.trade_type}")
+        if self.amount <= 0:
+            raise ValueError("Die Menge muss größer als 0 sein")
+        if self.min_price <= 0 or self.max_price < self.min_price:
+            raise ValueError("Ungültige Preisspanne (Min Preis / Max Preis)")
+
+    @property
+    def side(self):
+        """Orderbook side the bot competes on"""
+        return 'bids' if self.trade_type == 'buy' else 'asks'
+
+    def order_params(self, price):
+        """Parameters for BitcoinDeApiClient.create_order"""
+        order_params = {
+            "trading_pair": self.trading_pair,
+            "type": self.trade_type,
+            "max_amount_currency_to_trade": self.amount,
+            "price": price,
+            "end_datetime": default_end_datetime(),
+            "min_trust_level": self.min_trust_level,
+            "seat_of_bank": [self.seat_of_bank]
+        }
+
+        # Zusätzliche Parameter für `sell`-Orders
+        if self.trade_type == "sell" and self.payment_option > 0:
+            order_params["payment_option"] = self.payment_option
+            if self.payment_option in [2, 3]:  # SEPA-Only oder Express & SEPA
+                order_params["sepa_option"] = self.sepa_option
+        return order_params
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    index = min(int(round(q / 100.0 * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+class LatencyStats:
+    """
+    Latency record of every bot iteration (all values in ms):
+    - snapshot_age_ms: age of the orderbook snapshot the decision was based on
+    - decision_ms: time of the price decision
+    - delete_ms / create_ms: API latency of deleting and creating the order
+    - gap_ms: time without own order in the book (delete sent -> new order created)
+    - reaction_ms: first snapshot with the changed best price -> new order created
+    """
+
+    METRICS = ('snapshot_age_ms', 'decision_ms', 'delete_ms', 'create_ms', 'gap_ms', 'reaction_ms')
+    LABELS = {
+        'snapshot_age_ms': "Buch-Alter",
+        'decision_ms': "Entscheidung",
+        'delete_ms': "Löschen",
+        'create_ms': "Erstellen",
+        'gap_ms': "Lücke",
+        'reaction_ms': "Reaktion"
+    }
+
+    def __init__(self, window=TradeBotSettings.LATENCY_WINDOW, history=TradeBotSettings.LATENCY_HISTORY):
+        self.lock = threading.Lock()
+        self.windows = {metric: deque(maxlen=window) for metric in self.METRICS}
+        self.records = deque(maxlen=history)  # für den CSV-Export
+
+    def add(self, record):
+        with self.lock:
+            self.records.append(record)
+            for metric in self.METRICS:
+                value = record.get(metric)
+                if value is not None:
+                    self.windows[metric].append(value)
+
+    def summary(self):
+        """Rolling {metric: (count, p50, p95)}"""
+        with self.lock:
+            windows = {metric: sorted(values) for metric, values in self.windows.items()}
+        return {
+            metric: (len(values), percentile(values, 50), percentile(values, 95))
+            for metric, values in windows.items()
+        }
+
+    def format_summary(self):
+        parts = [
+            f"{self.LABELS[metric]} p50 {p50:.1f} / p95 {p95:.1f} ms"
+            for metric, (count, p50, p95) in self.summary().items()
+            if count
+        ]
+        return " | ".join(parts) if parts else "keine Messwerte"
+
+    def get_records(self):
+        with self.lock:
+            return list(self.records)
+
+
+class InstanceLogAdapter(logging.LoggerAdapter):
+    """Prefix all log messages with the name of the bot instance"""
+
+    def process(self, msg, kwargs):
+        return f"[{self.extra['name']}] {msg}", kwargs
+
+
+class BotInstance:
+    """State of one running bot: settings, own order, logs and metrics"""
+
+    def __init__(self, name, settings, engine):
+        self.name = name
+        self.settings = settings
+        self.engine = engine
+        self.logger = InstanceLogAdapter(engine.logger, {'name': name})
+        self.own_order = None
+        self.running = False
+        self.busy = False  # step() läuft gerade in einem Worker
+        self.delete_on_stop = False  # gestoppt während step() lief: der Worker löscht das Order am Ende
+        self.status = "gestoppt"
+
+        # Scheduling
+        self.deadline = 0.0  # spätester nächster Durchlauf (Intervalle als Obergrenze)
+        self.wake_at = None  # früherer Durchlauf nach Änderung am besten Preis (entprellt)
+        self.last_top_of_book = None
+
+        # Metriken
+        self.metrics = {
+            'iterations': 0,
+            'book_wakeups': 0,
+            'orders_created': 0,
+            'orders_deleted': 0,
+            'errors': 0,
+            'replaces': 0,
+            'last_gap_ms': None,
+            'last_run': None
+        }
+        self.latency = LatencyStats()
+        self.current = None  # Messwerte des laufenden Durchlaufs
+        self.book_changed_at = None  # erster Snapshot mit geändertem besten Preis seit dem letzten Durchlauf
+        self.last_latency_log = time.monotonic()
+
+    def on_book_snapshot(self, snapshot):
+        """Schedule an early run when the relevant top of book changed"""
+        if not self.running or snapshot.filters:
+            return
+        own_order_id = self.own_order.get('order_id') if self.own_order else None
+        top_of_book = (
+            snapshot.best_price(self.settings.side, exclude_order_id=own_order_id),
+            own_order_id is not None and snapshot.has_order(own_order_id)
+        )
+        # Läuft im Thread, der das Orderbuch geholt hat - der Scheduler liest und setzt wake_at unter dem Lock
+        with self.engine.lock:
+            if top_of_book == self.last_top_of_book:
+                return
+            self.last_top_of_book = top_of_book
+            if self.book_changed_at is None:
+                self.book_changed_at = snapshot.fetched_at
+            if self.wake_at is not None:
+                return
+            self.wake_at = time.monotonic() + self.settings.debounce_ms / 1000.0
+            self.metrics['book_wakeups'] += 1
+        self.engine.notify()
+
+    def is_due(self, now):
+        if not self.running or self.busy:
+            return False
+        return now >= self.deadline or (self.wake_at is not None and now >= self.wake_at)
+
+    def next_due(self):
+        if self.wake_at is not None:
+            return min(self.deadline, self.wake_at)
+        return self.deadline
+
+    def step(self):
+        """One iteration of the trade logic (with latency record), returns the maximum wait until the next one"""
+        self.current = {'time': datetime.now(), 'bot': self.name, 'action': 'none'}
+        with self.engine.lock:
+            changed_at, self.book_changed_at = self.book_changed_at, None
+        try:
+            return self.run_iteration()
+        finally:
+            record, self.current = self.current, None
+            created_at = record.pop('created_at', None)
+            if created_at is not None and changed_at is not None:
+                record['reaction_ms'] = (created_at - changed_at) * 1000
+            self.latency.add(record)
+            if time.monotonic() - self.last_latency_log >= TradeBotSettings.LATENCY_LOG_INTERVAL_SECONDS:
+                self.last_latency_log = time.monotonic()
+                self.logger.info(f"Latenz: {self.latency.format_summary()}")
+
+    def record_latency(self, **values):
+        if self.current is not None:
+            self.current.update(values)
+
+    def run_iteration(self):
+        """One iteration of the trade logic, returns the maximum wait until the next one"""
+        self.metrics['iterations'] += 1
+        self.metrics['last_run'] = datetime.now()
+        try:
+            # Noch kein eigenes Order: ggf. neues Order erstellen
+            if not self.own_order:
+                self.logger.info("Kein eigenes Order vorhanden. Neues Order wird erstellt.")
+                order_needed, dynamic_price = self.check_if_order_needed()
+                if order_needed:
+                    self.execute_trade(dynamic_price)
+                    return self.settings.order_interval
+                self.logger.info("Keine neue Order erforderlich. Warte...")
+                return self.settings.check_interval
+
+            # Überprüfen, ob das eigene Order noch existiert
+            if not self.check_own_order_exists():
+                self.logger.info("Das eigene Order wurde entfernt. Bot wird gestoppt.")
+                self.engine.stop_instance(self.name)
+                return self.settings.check_interval
+
+            # Überprüfen, ob eine neue Order erforderlich ist
+            order_needed, dynamic_price = self.check_if_order_needed()
+            if not order_needed:
+                self.logger.info("Keine neue Order erforderlich. Warte auf Änderung am besten Preis...")
+                return self.settings.check_interval
+
+            self.execute_trade(dynamic_price)
+        except Exception as e:
+            self.metrics['errors'] += 1
+            self.logger.error(f"Fehler in der Handelslogik: {str(e)}")
+        return self.settings.order_interval
+
+    def check_own_order_exists(self):
+        """Überprüft anhand der lokalen Order-Verwaltung, ob das eigene Order noch existiert."""
+        if not self.own_order:
+            return False
+
+        # Ein neuer Snapshot aktualisiert den Zustand über die Cache-Subscription der Order-Verwaltung
+        self.engine.orderbook_cache.get(self.own_order['trading_pair'])
+        if self.engine.own_orders.is_active(self.own_order):
+            return True
+
+        self.logger.info(f"Das eigene Order mit ID {self.own_order['order_id']} wurde entfernt.")
+        self.own_order = None
+        return False
+
+    def check_if_order_needed(self):
+        """Prüft, ob eine neue Order erforderlich ist."""
+        try:
+            snapshot = self.engine.orderbook_cache.get(self.settings.trading_pair)
+            if not snapshot:
+                self.logger.info("Orderbuch ist leer. Keine Aktion erforderlich.")
+                return False, None
+            self.record_latency(snapshot_age_ms=snapshot.age * 1000)
+
+            if not self.own_order:
+                self.logger.info("Kein eigenes Order lokal gespeichert. Suche offenes Order...")
+                if self.engine.own_orders.reconcile_due():
+                    self.engine.reconcile_orders(priority=ApiBudgetSettings.PRIORITY_ORDER)
+                order = self.engine.own_orders.claim(self.settings.trading_pair, self.settings.trade_type, self.name)
+                if order:
+                    self.own_order = order
+                    self.logger.info(f"Eigenes Order gefunden: {order['order_id']}")
+                    return False, None
+                self.logger.info("Kein eigenes Order vorhanden. Neues Order erforderlich.")
+                return True, self.settings.min_price  # Fallback auf `min_price`
+
+            exclude = self.engine.owned_order_ids(exclude_instance=self.name)
+            started = time.perf_counter()
+            decision = decide_order_price(
+                snapshot,
+                self.own_order,
+                self.settings.min_price,
+                self.settings.max_price,
+                self.logger,
+                exclude=exclude
+            )
+            self.record_latency(decision_ms=(time.perf_counter() - started) * 1000)
+            return decision
+        except Exception as e:
+            self.metrics['errors'] += 1
+            self.logger.error(f"Fehler bei der Überprüfung, ob eine Order erforderlich ist: {str(e)}")
+            return False, None
+
+    def delete_own_order(self):
+        """Delete the own order at the exchange, returns False if the deletion failed"""
+        if not self.own_order:
+            return True
+        order_id = self.own_order.get("order_id")
+        trading_pair = self.own_order.get("trading_pair")
+        if not order_id or not trading_pair:
+            self.logger.error("Ungültige Order-Daten. Order konnte nicht gelöscht werden.")
+            self.own_order = None
+            return True
+
+        self.logger.info(f"Lösche bestehendes Order: {order_id}")
+        started = time.perf_counter()
+        delete_response = self.engine.api_client.delete_order(trading_pair, order_id)
+        self.record_latency(delete_ms=(time.perf_counter() - started) * 1000)
+        if delete_response and not delete_response.get('errors'):
+            self.logger.info(f"Order erfolgreich gelöscht: {order_id}")
+            self.metrics['orders_deleted'] += 1
+            self.engine.own_orders.mark_removed(order_id)
+            self.own_order = None
+            return True
+
+        error_message = delete_response.get('errors', ['Unbekannter Fehler'])[0] if delete_response else 'Keine Antwort von der API'
+        self.logger.error(f"Fehler beim Löschen des bestehenden Orders: {error_message}")
+        return False
+
+    def execute_trade(self, dynamic_price):
+        """Replace the own order by a new one at dynamic_price"""
+        if not self.running:
+            return  # inzwischen gestoppt: kein neues Order mehr anlegen
+        if not self.engine.api_client:
+            self.logger.error("API-Client nicht konfiguriert.")
+            return
+
+        if dynamic_price is None:
+            self.logger.warning("`dynamic_price` ist None. Fallback auf `min_price`.")
+            dynamic_price = self.settings.min_price
+
+        order_params = self.settings.order_params(dynamic_price)
+        if self.own_order and self.own_order.get('order_id') and self.own_order.get('trading_pair'):
+            # Löschen und neues Order direkt nacheinander (vorab signiert, gleiche Verbindung)
+            self.record_latency(action='replace')
+            response = self.replace_own_order(order_params)
+            if response is None:
+                return  # Abbrechen, wenn das Löschen fehlschlägt
+        else:
+            self.record_latency(action='create')
+            if not self.delete_own_order():
+                return  # Abbrechen, wenn das Löschen fehlschlägt
+            self.logger.info(f"Creating order for {self.settings.trading_pair}: {order_params}")
+            started = time.perf_counter()
+            response = self.engine.api_client.create_order(**order_params)
+            self.record_latency(create_ms=(time.perf_counter() - started) * 1000)
+        self.logger.debug("API-Antwort beim Erstellen der Order: %s", response)
+        self.store_created_order(response, dynamic_price)
+
+    def replace_own_order(self, order_params):
+        """Replace the own order via the replace pipeline, returns the create response or None"""
+        order_id = self.own_order['order_id']
+        order_params = dict(order_params)
+        order_params.pop('trading_pair')
+        self.logger.info(f"Ersetze Order {order_id} durch neues Order zu {order_params['price']}")
+
+        delete_response, response, timings = self.engine.api_client.replace_order(
+            self.own_order['trading_pair'], order_id, **order_params
+        )
+        if response is None:
+            error_message = delete_response.get('errors', ['Unbekannter Fehler'])[0] if delete_response else 'Keine Antwort von der API'
+            self.logger.error(f"Fehler beim Löschen des bestehenden Orders: {error_message}")
+            return None
+
+        self.logger.info(f"Order erfolgreich gelöscht: {order_id}")
+        self.metrics['orders_deleted'] += 1
+        self.engine.own_orders.mark_removed(order_id)
+        self.own_order = None
+        self.record_replace(timings)
+        return response
+
+    def record_replace(self, timings):
+        """Remember the delete -> create gap of a replace"""
+        self.record_latency(**timings)
+        gap_ms = timings.get('gap_ms')
+        if gap_ms is None:
+            return
+        self.metrics['replaces'] += 1
+        self.metrics['last_gap_ms'] = gap_ms
+
+    def store_created_order(self, response, dynamic_price):
+        """Keep the new order as own order if the API accepted it"""
+        if response and 'order_id' in response and not response.get('errors'):
+            self.record_latency(created_at=time.monotonic())
+            self.logger.info(f"Order erfolgreich erstellt: {response['order_id']}")
+            self.metrics['orders_created'] += 1
+            self.own_order = self.engine.own_orders.register(
+                response['order_id'],
+                self.settings.trading_pair,
+                self.settings.trade_type,
+                dynamic_price,
+                amount=self.settings.amount,
+                owner=self.name
+            )
+        else:
+            error_message = response.get('errors', ['Unbekannter Fehler'])[0] if response else 'Keine Antwort von der API'
+            self.logger.error(f"Fehler beim Erstellen der Order: {error_message}")
+
+    def get_status(self):
+        """Status and metrics for the UI"""
+        return {
+            'name': self.name,
+            'trading_pair': self.settings.trading_pair,
+            'trade_type': self.settings.trade_type,
+            'status': self.status,
+            'own_price': self.own_order.get('price') if self.own_order else None,
+            'order_state': OrderState.LABELS[self.own_order['state']] if self.own_order else None,
+            'latency': self.latency.summary(),
+            **self.metrics
+        }
+
+
+class BotEngine:
+    """
+    Runs any number of bot instances on one scheduler thread and a small worker pool.
+
+    All instances share the OrderbookCache and the API client. The orderbook watermark is
+    checked once per trading pair (not per instance); new snapshots wake the instances
+    of that pair through the cache subscription.
+    """
+
+    def __init__(self, api_client, orderbook_cache, logger=None, workers=TradeBotSettings.ENGINE_WORKERS):
+        self.api_client = api_client
+        self.orderbook_cache = orderbook_cache
+        self.logger = logger or logging.getLogger("TradeBotLogger")
+        self.instances = {}  # name -> BotInstance
+        self.lock = threading.RLock()
+        self.wakeup = threading.Condition(self.lock)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bot")
+        self.pair_watermarks = {}  # trading_pair -> last watermark
+        self.last_watch = 0.0
+        # Eigene Orders: Zustand aus API-Antworten und Orderbuch, nur periodischer Abgleich mit der API
+        self.own_orders = OwnOrderRegistry(self.logger)
+        self.orderbook_cache.subscribe(self.own_orders.apply_snapshot)
+        self.reconcile_lock = threading.Lock()
+        self.reconciling = False
+        self.last_reconcile_attempt = 0.0
+        self.running = True
+        self.thread = threading.Thread(target=self.scheduler_loop, daemon=True)
+        self.thread.start()
+
+    def set_api_client(self, api_client):
+        self.api_client = api_client
+
+    def notify(self):
+        """Wake the scheduler (e.g. after a book change)"""
+        with self.wakeup:
+            self.wakeup.notify()
+
+    def add_instance(self, settings, name=None):
+        """Create (but do not start) a bot instance"""
+        settings.validate()
+        with self.lock:
+            if name is None:
+                number = 1
+                while f"{settings.trading_pair}-{settings.trade_type}-{number}" in self.instances:
+                    number += 1
+                name = f"{settings.trading_pair}-{settings.trade_type}-{number}"
+            if name in self.instances:
+                raise ValueError(f"Bot {name} existiert bereits")
+            instance = BotInstance(name, settings, self)
+            self.instances[name] = instance
+        return instance
+
+    def start_instance(self, name):
+        with self.lock:
+            instance = self.instances[name]
+            if instance.running:
+                return
+            instance.running = True
+            instance.delete_on_stop = False
+            instance.status = "läuft"
+            instance.deadline = 0.0  # sofort starten
+            instance.wake_at = None
+            instance.last_top_of_book = None
+        if not instance.own_order:
+            self.own_orders.request_reconcile()  # offene Orders vor dem ersten Durchlauf abgleichen
+        self.orderbook_cache.subscribe(instance.on_book_snapshot, instance.settings.trading_pair)
+        instance.logger.info("Trade-Bot gestartet.")
+        self.notify()
+
+    def stop_instance(self, name, delete_order=True):
+        """Stop an instance and delete its open order"""
+        with self.lock:
+            instance = self.instances.get(name)
+            if not instance or not instance.running:
+                return
+            instance.running = False
+            instance.status = "gestoppt"
+            # Ein laufender Durchlauf kann noch ein neues Order anlegen - dann löscht der Worker es am Ende
+            busy = instance.busy
+            instance.delete_on_stop = delete_order and busy
+        self.orderbook_cache.unsubscribe(instance.on_book_snapshot)
+        instance.logger.info("Trade-Bot wird gestoppt.")
+        if delete_order and not busy:
+            self.delete_instance_order(instance)
+
+    def delete_instance_order(self, instance):
+        """Delete the open order of a stopped instance"""
+        if not instance.own_order:
+            return
+        order_id = instance.own_order['order_id']
+        try:
+            deleted = instance.delete_own_order()
+        except Exception as e:
+            instance.logger.error(f"Fehler beim Löschen der Order: {str(e)}")
+            deleted = False
+        if not deleted:
+            # Zurücksetzen, auch wenn das Löschen fehlschlägt (ein anderer Bot kann das Order übernehmen)
+            self.own_orders.release(order_id)
+            instance.own_order = None
+
+    def remove_instance(self, name):
+        self.stop_instance(name)
+        with self.lock:
+            self.instances.pop(name, None)
+
+    def shutdown(self):
+        """Stop all instances and the scheduler, then delete the open orders"""
+        names = list(self.instances)
+        for name in names:
+            self.stop_instance(name, delete_order=False)
+        self.running = False
+        self.notify()
+        # Laufende Durchläufe abwarten, damit kein Order nach dem Löschen noch erstellt wird
+        self.executor.shutdown(wait=True)
+        for name in names:
+            instance = self.instances.get(name)
+            if instance and instance.own_order:
+                try:
+                    instance.delete_own_order()
+                except Exception as e:
+                    instance.logger.error(f"Fehler beim Löschen der Order: {str(e)}")
+
+    def owned_order_ids(self, exclude_instance=None):
+        """Order ids of all instances (except one)"""
+        return self.own_orders.owned_order_ids(exclude_owner=exclude_instance)
+
+    def reconcile_orders(self, priority=ApiBudgetSettings.PRIORITY_BACKGROUND):
+        """Compare the own orders with the open orders of the API, returns False if the request failed"""
+        with self.reconcile_lock:
+            if not self.own_orders.reconcile_due():
+                return True  # ein anderer Thread hat gerade abgeglichen
+            self.last_reconcile_attempt = time.monotonic()
+            requested_at = time.monotonic()
+            try:
+                response = self.api_client.make_api_request('orders', priority=priority)
+            except Exception as e:
+                self.logger.error(f"Abgleich der eigenen Orders fehlgeschlagen: {str(e)}")
+                return False
+            if not response or 'orders' not in response:
+                self.logger.warning("Abgleich der eigenen Orders: keine Orders in der Antwort")
+                return False
+            self.own_orders.reconcile(response['orders'], requested_at)
+            with self.lock:
+                running = {name for name, instance in self.instances.items() if instance.running}
+            self.own_orders.release_orphans(running)
+            return True
+
+    def run_reconcile(self):
+        try:
+            self.reconcile_orders()
+        finally:
+            self.reconciling = False
+
+    def get_status(self):
+        with self.lock:
+            return [instance.get_status() for instance in self.instances.values()]
+
+    def log_latency(self):
+        """Log the rolling latency percentiles of all instances"""
+        with self.lock:
+            instances = list(self.instances.values())
+        for instance in instances:
+            instance.logger.info(f"Latenz: {instance.latency.format_summary()}")
+
+    def export_latency_csv(self, path):
+        """Write the latency records of all instances to a CSV file, returns the number of rows"""
+        with self.lock:
+            records = [record for instance in self.instances.values() for record in instance.latency.get_records()]
+        records.sort(key=lambda record: record['time'])
+        with open(path, 'w', newline='', encoding='utf-8') as csv_file:
+            writer = csv.DictWriter(csv_file, fieldnames=['time', 'bot', 'action', *LatencyStats.METRICS])
+            writer.writeheader()
+            for record in records:
+                row = {key: record.get(key) for key in writer.fieldnames}
+                row['time'] = record['time'].isoformat(timespec='milliseconds')
+                for metric in LatencyStats.METRICS:
+                    if row[metric] is not None:
+                        row[metric] = f"{row[metric]:.3f}"
+                writer.writerow(row)
+        return len(records)
+
+    def scheduler_loop(self):
+        while self.running:
+            now = time.monotonic()
+            with self.lock:
+                running = [instance for instance in self.instances.values() if instance.running]
+                due = [instance for instance in running if instance.is_due(now)]
+                for instance in due:
+                    instance.busy = True
+                    instance.wake_at = None
+
+            for instance in due:
+                self.executor.submit(self.run_instance, instance)
+
+            if (running and not self.reconciling and self.own_orders.reconcile_due()
+                    and now - self.last_reconcile_attempt >= TradeBotSettings.RECONCILE_RETRY_SECONDS):
+                self.reconciling = True
+                self.executor.submit(self.run_reconcile)
+
+            if running and now - self.last_watch >= TradeBotSettings.WATCH_INTERVAL_SECONDS:
+                self.last_watch = now
+                self.watch_pairs({instance.settings.trading_pair for instance in running})
+
+            with self.wakeup:
+                next_due = min(
+                    [instance.next_due() for instance in self.instances.values() if instance.running and not instance.busy],
+                    default=now + TradeBotSettings.WATCH_INTERVAL_SECONDS
+                )
+                timeout = min(max(next_due - time.monotonic(), 0.01), TradeBotSettings.WATCH_INTERVAL_SECONDS)
+                self.wakeup.wait(timeout)
+
+    def watch_pairs(self, trading_pairs):
+        """One cheap watermark check per pair; a changed watermark loads the book and wakes its bots"""
+        for trading_pair in trading_pairs:
+            try:
+                watermark = self.orderbook_cache.get_watermark(trading_pair)
+                if watermark != self.pair_watermarks.get(trading_pair):
+                    self.pair_watermarks[trading_pair] = watermark
+                    self.orderbook_cache.get(trading_pair)
+            except Exception as e:
+                self.logger.error(f"Fehler bei der Orderbuch-Prüfung für {trading_pair}: {str(e)}")
+
+    def run_instance(self, instance):
+        """Run one step of an instance in a worker thread"""
+        max_wait = instance.settings.check_interval
+        try:
+            max_wait = instance.step()
+        except Exception as e:
+            instance.metrics['errors'] += 1
+            instance.logger.error(f"Fehler in der Handelslogik: {str(e)}")
+        finally:
+            with self.lock:
+                instance.deadline = time.monotonic() + max_wait
+                instance.busy = False
+                cleanup = not instance.running and instance.delete_on_stop
+                instance.delete_on_stop = False
+            if cleanup:
+                # Während des Durchlaufs gestoppt: ein eben erstelltes Order nicht verwaist stehen lassen
+                self.delete_instance_order(instance)
+            self.notify()
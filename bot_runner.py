@@ -0,0 +1,190 @@
+"""
+Headless trade bot runner (no GUI), e.g. as a service on the Orderbuch-server machine next to the database.
+
+Usage:
+    python bot_runner.py --config bot_runner.json
+    python bot_runner.py --config bot_runner.json --check     (only validate the configuration)
+
+Configuration (JSON):
+    {
+        "api": {"api_key": "...", "api_secret": "..."},
+        "database": {"host": "localhost", "port": 3306, "user": "...", "password": "...", "database": "..."},
+        "mirror": false,
+        "wire_debug": false,
+        "status_interval_seconds": 60,
+        "log_file": "bot_runner.log",
+        "latency_csv": "bot_latenz.csv",
+        "bots": [
+            {"name": "btc-kauf", "trading_pair": "btceur", "trade_type": "buy", "amount": 0.01,
+             "min_price": 60000, "max_price": 61000, "check_interval": 30, "order_interval": 15}
+        ]
+    }
+Without "api" or "database" the credentials saved by the desktop program are used. A bot entry
+takes every BotSettings field (as exported by the TradeBot tab with "Konfiguration speichern").
+
+SIGINT/SIGTERM stop all bots; open bot orders are deleted before the runner exits.
+"""
+import argparse
+import json
+import logging
+import signal
+import sys
+import threading
+
+from api_client import BitcoinDeApiClient
+from bot_engine import BotEngine, BotSettings
+from constants import TradeBotSettings
+from orderbook_cache import OrderbookCache
+
+
+def setup_logging(log_file=None):
+    """Log to the console and optionally to a file"""
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        handlers.append(logging.FileHandler(log_file, encoding='utf-8'))
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=handlers
+    )
+
+
+def load_config(path):
+    """Read the runner configuration and validate the bot settings"""
+    with open(path, encoding='utf-8') as config_file:
+        config = json.load(config_file)
+
+    bots = config.get('bots') or []
+    if not bots:
+        raise ValueError("Keine Bots in der Konfiguration ('bots')")
+    names = set()
+    for bot in bots:
+        BotSettings.from_dict(bot).validate()
+        name = bot.get('name')
+        if name is not None and name in names:
+            raise ValueError(f"Bot-Name doppelt: {name}")
+        names.add(name)
+    return config
+
+
+def load_credentials(config, logger):
+    """API credentials and database configuration from the config file or the desktop program"""
+    api = config.get('api') or {}
+    db_config = config.get('database')
+    if api.get('api_key') and api.get('api_secret') and db_config:
+        return api['api_key'], api['api_secret'], api.get('api_basic', ''), db_config
+
+    # Gespeicherte Zugangsdaten des Desktop-Programms (nur bei Bedarf laden)
+    from credentials_manager import CredentialsManager
+    api_key, api_secret, api_basic, saved_db_config = CredentialsManager(logger).load_credentials()
+    return (
+        api.get('api_key') or api_key,
+        api.get('api_secret') or api_secret,
+        api.get('api_basic') or api_basic,
+        db_config or saved_db_config
+    )
+
+
+class BotRunner:
+    """Runs the bots of a configuration on a BotEngine until it is stopped"""
+
+    def __init__(self, config, logger):
+        self.config = config
+        self.logger = logger
+        self.stop_event = threading.Event()
+        self.mirror = None
+
+        api_key, api_secret, api_basic, db_config = load_credentials(config, logger)
+        if not api_key or not api_secret:
+            raise ValueError("Keine API-Zugangsdaten (Konfiguration 'api' oder gespeicherte Zugangsdaten)")
+        if not db_config:
+            raise ValueError("Keine Datenbank-Konfiguration (Konfiguration 'database' oder gespeicherte Zugangsdaten)")
+
+        # Erst hier importieren: der Datenbanktreiber wird für --check nicht benötigt
+        from database_manager import DatabaseManager
+
+        self.api_client = BitcoinDeApiClient(
+            api_key=api_key, api_secret=api_secret, api_basic=api_basic, logger=logger,
+            wire_debug=config.get('wire_debug', False)
+        )
+        self.db_manager = DatabaseManager(db_config, logger)
+        if config.get('mirror', False):
+            from orderbook_mirror import OrderbookMirror
+            self.mirror = OrderbookMirror(self.db_manager, logger)
+            self.mirror.start()
+        self.orderbook_cache = OrderbookCache(self.db_manager, logger, mirror=self.mirror)
+        self.engine = BotEngine(self.api_client, self.orderbook_cache, logging.getLogger("TradeBotLogger"))
+
+    def start(self):
+        for bot in self.config['bots']:
+            instance = self.engine.add_instance(BotSettings.from_dict(bot), name=bot.get('name'))
+            self.engine.start_instance(instance.name)
+        self.logger.info(f"{len(self.config['bots'])} Bot(s) gestartet")
+
+    def stop(self, *args):
+        """Signal handler: stop the main loop"""
+        self.stop_event.set()
+
+    def log_status(self):
+        for status in self.engine.get_status():
+            own_price = f"{status['own_price']:.2f}" if status['own_price'] is not None else "-"
+            self.logger.info(
+                f"[{status['name']}] {status['status']}, Preis {own_price}, "
+                f"{status['iterations']} Durchläufe, {status['orders_created']} Orders, {status['errors']} Fehler"
+            )
+        self.engine.log_latency()
+
+    def run(self):
+        """Block until SIGINT/SIGTERM or until all bots have stopped"""
+        interval = self.config.get('status_interval_seconds', TradeBotSettings.LATENCY_LOG_INTERVAL_SECONDS)
+        self.start()
+        while not self.stop_event.wait(interval):
+            self.log_status()
+            if not any(status['status'] == "läuft" for status in self.engine.get_status()):
+                self.logger.info("Alle Bots sind gestoppt.")
+                break
+        self.shutdown()
+
+    def shutdown(self):
+        self.logger.info("Bots werden gestoppt...")
+        self.engine.shutdown()  # löscht die offenen Orders der Bots
+        latency_csv = self.config.get('latency_csv')
+        if latency_csv:
+            rows = self.engine.export_latency_csv(latency_csv)
+            self.logger.info(f"{rows} Latenz-Messwerte exportiert: {latency_csv}")
+        if self.mirror:
+            self.mirror.stop()
+        self.logger.info("Bot-Runner beendet")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Trade-Bot ohne GUI")
+    parser.add_argument('--config', required=True, help="JSON-Konfiguration")
+    parser.add_argument('--check', action='store_true', help="nur die Konfiguration prüfen")
+    args = parser.parse_args()
+
+    try:
+        config = load_config(args.config)
+    except (OSError, ValueError, TypeError) as e:
+        print(f"Ungültige Konfiguration: {str(e)}")
+        sys.exit(1)
+
+    setup_logging(config.get('log_file'))
+    logger = logging.getLogger("BotRunner")
+    if args.check:
+        logger.info(f"Konfiguration gültig: {len(config['bots'])} Bot(s)")
+        return
+
+    try:
+        runner = BotRunner(config, logger)
+    except Exception as e:
+        logger.error(f"Bot-Runner konnte nicht gestartet werden: {str(e)}")
+        sys.exit(1)
+
+    signal.signal(signal.SIGINT, runner.stop)
+    signal.signal(signal.SIGTERM, runner.stop)
+    runner.run()
+
+
+if __name__ == '__main__':
+    main()
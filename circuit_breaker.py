@@ -0,0 +1,97 @@
+import threading
+import time
+
+import requests
+
+from constants import HttpSettings
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised instead of sending a request while the API is considered down (fails fast)"""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker of an API client.
+
+    - closed: requests go out; connection errors, timeouts and 5xx responses are counted
+    - open: after failure_threshold consecutive failures every request fails immediately
+      with CircuitOpenError instead of blocking its thread until the timeout
+    - half open: after reset_seconds one probe request goes out; success closes the circuit,
+      a failure opens it again
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    LABELS = {
+        CLOSED: "OK",
+        OPEN: "gestört",
+        HALF_OPEN: "Test"
+    }
+
+    def __init__(self, name, failure_threshold=HttpSettings.BREAKER_FAILURE_THRESHOLD,
+                 reset_seconds=HttpSettings.BREAKER_RESET_SECONDS, logger=None):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.logger = logger
+        self.lock = threading.Lock()
+        self.state = self.CLOSED
+        self.failures = 0  # aufeinanderfolgende Fehler
+        self.opened_at = None  # monotonic
+        self.probe_running = False
+
+        # Statistiken
+        self.rejected = 0
+        self.opened = 0
+
+    def _log(self, message):
+        if self.logger:
+            self.logger.warning(f"{self.name}: {message}")
+
+    def before_call(self):
+        """Raises CircuitOpenError if the request must not go out"""
+        with self.lock:
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self.state = self.HALF_OPEN
+                self.probe_running = False
+            if self.state == self.HALF_OPEN and not self.probe_running:
+                self.probe_running = True  # genau eine Testanfrage
+                return
+            self.rejected += 1
+            remaining = max(self.reset_seconds - (time.monotonic() - self.opened_at), 0)
+        raise CircuitOpenError(f"{self.name} nicht erreichbar - nächster Versuch in {remaining:.0f} s")
+
+    def record_success(self):
+        with self.lock:
+            if self.state != self.CLOSED:
+                self._log("API wieder erreichbar")
+            self.state = self.CLOSED
+            self.failures = 0
+            self.probe_running = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or (
+                    self.state == self.CLOSED and self.failures >= self.failure_threshold):
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self.probe_running = False
+                self.opened += 1
+                self._log(
+                    f"{self.failures} Fehler in Folge - Anfragen werden {self.reset_seconds:.0f} s lang sofort abgewiesen"
+                )
+
+    def get_status(self):
+        with self.lock:
+            return {
+                'name': self.name,
+                'state': self.state,
+                'failures': self.failures,
+                'rejected': self.rejected,
+                'opened': self.opened
+            }
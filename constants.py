@@ -169,6 +169,147 @@ class TradingConstants:
         'SK': 'Slovakia'
     }
 
+class OrderbookSettings:
+    """Orderbook display settings"""
+    # Aggregation der Orders in Preisstufen: Anzeige-Name -> (Tick, relativ)
+    AGGREGATION_NONE = "Einzelorders"
+    AGGREGATION_MODES = {
+        AGGREGATION_NONE: None,
+        "0,01 €": (0.01, False),
+        "1 €": (1.0, False),
+        "10 €": (10.0, False),
+        "0,1 %": (0.001, True)
+    }
+
+    # Markttiefe-Chart
+    DEPTH_REDRAW_INTERVAL_MS = 250  # max. 4 Neuzeichnungen pro Sekunde
+    DEPTH_MAX_LEVELS = 200  # Preisstufen pro Seite
+    DEPTH_PRICE_RANGE = 0.05  # nur Stufen innerhalb von 5% um den besten Preis
+
+    # Filter: nur Orders anzeigen, die man selbst bedienen kann
+    FILTER_ALL = "Alle"
+    # Eigenes Trust-Level -> Orders mit diesem oder niedrigerem min_trust_level
+    TRUST_LEVEL_ORDER = [level.value for level in TradingConstants.TrustLevel]
+    # Akzeptierte Zahlungsart -> passende payment_option Werte der Orders
+    FILTER_PAYMENT_OPTIONS = {
+        "Express": [
+            TradingConstants.ORDERBOOK_PAYMENT_OPTION_EXPRESS_ONLY,
+            TradingConstants.ORDERBOOK_PAYMENT_OPTION_EXPRESS_OR_SEPA
+        ],
+        "SEPA": [
+            TradingConstants.ORDERBOOK_PAYMENT_OPTION_SEPA_ONLY,
+            TradingConstants.ORDERBOOK_PAYMENT_OPTION_EXPRESS_OR_SEPA
+        ]
+    }
+
+    # Gemeinsamer Orderbuch-Cache (GUI und Trade-Bot)
+    CACHE_TTL_SECONDS = 0.2  # kürzer als das schnellste Poll-Intervall
+    CACHE_FETCH_TIMEOUT_SECONDS = 10
+
+    # Lokaler Lese-Spiegel des Orderbuchs (für langsame Verbindungen zur MariaDB)
+    MIRROR_ENABLED = False
+    MIRROR_PATH = ':memory:'  # oder Dateipfad für SQLite im WAL-Modus
+    MIRROR_SYNC_INTERVAL_SECONDS = 0.5
+    MIRROR_STALE_SECONDS = 5
+    MIRROR_FULL_RESYNC_SECONDS = 300
+    MIRROR_ACTIVE_PAIR_SECONDS = 60  # Paare ohne Zugriff werden nicht mehr synchronisiert
+    MIRROR_CHECKSUM_MISMATCH_LIMIT = 3  # Prüfsummen-Abweichungen in Folge bis zum vollen Resync
+    MIRROR_CHANGE_LOG_SIZE = 50  # gemerkte Deltas pro Paar für den Markttiefe-Chart
+
+class TradeBotSettings:
+    """Trade bot timing"""
+    TOP_OF_BOOK_DEBOUNCE_MS = 500  # Änderungen am besten Preis sammeln, bevor der Bot reagiert
+    WATCH_INTERVAL_SECONDS = 1.0  # Watermark-Prüfung, wenn niemand sonst das Orderbuch abfragt
+    ENGINE_WORKERS = 4  # Worker-Threads der BotEngine (unabhängig von der Anzahl der Bots)
+    STATUS_REFRESH_MS = 1000  # Aktualisierung der Bot-Liste im Trade-Bot-Tab
+    NEW_ORDER_GRACE_SECONDS = 5  # so lange gilt ein neues Order als vorhanden, auch wenn es noch nicht im Orderbuch steht
+    RECONCILE_INTERVAL_SECONDS = 300  # Abgleich der eigenen Orders mit der API (sonst nur über das Orderbuch)
+    RECONCILE_RETRY_SECONDS = 30  # erneuter Versuch nach einem fehlgeschlagenen Abgleich
+    MISSING_SNAPSHOTS_LIMIT = 3  # fehlt ein Order in so vielen Snapshots in Folge, wird es per API geprüft
+    LATENCY_WINDOW = 200  # Durchläufe für die gleitenden p50/p95-Werte
+    LATENCY_HISTORY = 5000  # Durchläufe pro Bot für den CSV-Export
+    LATENCY_LOG_INTERVAL_SECONDS = 60  # Latenz-Zusammenfassung in der Konsole
+
+class ConsoleSettings:
+    """Log consoles in the GUI (TradeBot and Settings tab)"""
+    DRAIN_MS = 100  # neue Log-Zeilen gesammelt einfügen
+    MAX_LINES = 2000  # ältere Zeilen werden entfernt
+
+class BacktestSettings:
+    """Defaults of the offline backtest (backtester.py)"""
+    FEE_RATE = 0.0025  # Handelsgebühr je Ausführung als Anteil (an das eigene Gebührenmodell anpassen)
+    LATENCY_MS = 300  # Zeit, bis ein neues Order im Buch steht
+    WORKERS = 4  # Prozesse für Parameter-Raster
+
+class ApiBudgetSettings:
+    """API credit budget shared by all callers of one API client (api_budget.py)"""
+    CAPACITY = 20  # Credits laut bitcoin.de API (an das eigene Konto anpassen)
+    REFILL_PER_SECOND = 1.0
+
+    PRIORITY_ORDER = 0  # Orders des Trade-Bots und Trades
+    PRIORITY_INTERACTIVE = 1  # Aktionen aus der Oberfläche
+    PRIORITY_BACKGROUND = 2  # Kontoauszüge, Kurse
+
+    # Credits, die eine Priorität für die höheren übrig lassen muss
+    RESERVE = {
+        PRIORITY_ORDER: 0,
+        PRIORITY_INTERACTIVE: 3,
+        PRIORITY_BACKGROUND: 8
+    }
+    MAX_WAIT_SECONDS = {
+        PRIORITY_ORDER: 10,
+        PRIORITY_INTERACTIVE: 15,
+        PRIORITY_BACKGROUND: 120
+    }
+
+    # Credits je Methode
+    COSTS = {
+        'createOrder': 1,
+        'deleteOrder': 2,
+        'showMyOrders': 2,
+        'showAccountInfo': 2,
+        'showAccountLedger': 3,
+        'executeTrade': 1,
+        'showRates': 1
+    }
+    DEFAULT_COST = 2
+
+    STATUS_REFRESH_MS = 1000  # Anzeige der Credits im Hauptfenster
+
+class PollSettings:
+    """Adaptive polling intervals of the database-backed views (milliseconds)"""
+    ORDERBOOK_BASE_MS = 500
+    ORDERBOOK_MIN_MS = 250
+    ORDERBOOK_MAX_MS = 5000
+
+    RATES_BASE_MS = 5 * 60 * 1000
+    RATES_MIN_MS = 60 * 1000
+    RATES_MAX_MS = 30 * 60 * 1000
+
+    RATES_CACHE_TTL_SECONDS = 60  # Kurse so lange gemeinsam nutzen (Kontostände, Kurse-Tab, Aktualisieren-Klicks)
+    RATES_CACHE_FETCH_TIMEOUT_SECONDS = 30
+
+class HttpSettings:
+    """Connection pool and timeouts of the API clients"""
+    POOL_CONNECTIONS = 2  # Hosts im Pool (api.bitcoin.de)
+    POOL_MAXSIZE = 10  # gleichzeitige Verbindungen pro Host (Bots, Tabs, Kurse)
+    CONNECT_TIMEOUT_SECONDS = 5
+    READ_TIMEOUT_SECONDS = 15
+    WIRE_DEBUG = False  # Kopfzeilen und Inhalt jeder Anfrage ins Log (enthält den API-Key)
+    # Wiederholungen bei 429, 5xx und Verbindungsfehlern (POST nur bei 429 und Verbindungsaufbau)
+    MAX_RETRIES = 2
+    BACKOFF_BASE_SECONDS = 0.5  # Obergrenze der Wartezeit verdoppelt sich je Versuch (volles Jitter)
+    BACKOFF_MAX_SECONDS = 8
+    # Circuit Breaker: nach so vielen Fehlern in Folge sofort abweisen, nach der Pause eine Testanfrage
+    BREAKER_FAILURE_THRESHOLD = 5
+    BREAKER_RESET_SECONDS = 30
+    INVALID_NONCE_ERROR_CODE = 4  # Fehlercode der API für eine zu alte Nonce
+
+class ResponseLogSettings:
+    """Logging of the API responses (see response_log.py)"""
+    SAMPLE_EVERY = 20  # jede n-te Antwort (gekürzt) bei DEBUG, 0 = nie
+    MAX_CHARS = 500  # Länge der geloggten Antworten und Fehler
+
 class ApiEndpoints:
     """API endpoint constants"""
     BASE_URL = "https://api.bitcoin.de/v4"
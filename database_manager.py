@@ -7,6 +7,7 @@ class DatabaseManager:
         self.db_config = db_config
         self.logger = logger
         self.lock = Lock()
+        self.checksums_available = True  # orderbook_checksums is maintained by the Orderbuch-server
         self.init_database()
         
     def get_connection(self):
@@ -53,6 +54,19 @@ class DatabaseManager:
                     cursor.execute("ALTER TABLE orders ADD COLUMN order_id VARCHAR(255) NOT NULL")
                     self.logger.info("Added 'order_id' column to 'orders' table")
                 
+                # Columns written by the Orderbuch-server, used for the orderbook filters
+                for column, definition in (
+                    ('seat_of_bank', 'VARCHAR(255)'),
+                    ('min_trust_level', 'VARCHAR(255)'),
+                    ('is_kyc_full', 'BOOLEAN'),
+                    ('payment_option', 'INTEGER')
+                ):
+                    cursor.execute(f"SHOW COLUMNS FROM orders LIKE '{column}'")
+                    result = cursor.fetchone()
+                    if not result:
+                        cursor.execute(f"ALTER TABLE orders ADD COLUMN {column} {definition}")
+                        self.logger.info(f"Added '{column}' column to 'orders' table")
+                
                 # Create analysis_data table
                 cursor.execute("""
                     CREATE TABLE IF NOT EXISTS analysis_data (
@@ -72,6 +86,10 @@ class DatabaseManager:
                     CREATE INDEX IF NOT EXISTS idx_orders_pair_time 
                     ON orders(trading_pair, timestamp)
                 """)
+                cursor.execute("""
+                    CREATE INDEX IF NOT EXISTS idx_orders_pair_filters
+                    ON orders(trading_pair, payment_option, is_kyc_full, min_trust_level)
+                """)
                 
                 conn.commit()
                 cursor.close()
@@ -82,19 +100,55 @@ class DatabaseManager:
             self.logger.error(f"Failed to initialize database schema: {str(e)}")
             raise
 
-    def get_orderbook(self, trading_pair: str) -> dict:
-        """Get current orderbook data for the specified trading pair"""
+    def build_orderbook_filter(self, filters):
+        """
+        Build the SQL predicates for the orderbook filters.
+        filters: dict with the optional keys
+            'trust_levels'    - allowed min_trust_level values
+            'payment_options' - allowed payment_option values
+            'kyc_full'        - True: only orders of fully identified users
+            'seat_of_bank'    - allowed bank countries
+        """
+        clauses = []
+        params = []
+        if not filters:
+            return clauses, params
+
+        if filters.get('trust_levels'):
+            placeholders = ", ".join("?" for _ in filters['trust_levels'])
+            clauses.append(f"(min_trust_level IS NULL OR min_trust_level IN ({placeholders}))")
+            params.extend(filters['trust_levels'])
+        if filters.get('payment_options'):
+            placeholders = ", ".join("?" for _ in filters['payment_options'])
+            clauses.append(f"payment_option IN ({placeholders})")
+            params.extend(filters['payment_options'])
+        if filters.get('kyc_full'):
+            clauses.append("is_kyc_full = 1")
+        if filters.get('seat_of_bank'):
+            placeholders = ", ".join("?" for _ in filters['seat_of_bank'])
+            clauses.append(f"seat_of_bank IN ({placeholders})")
+            params.extend(filters['seat_of_bank'])
+        return clauses, params
+
+    def get_orderbook(self, trading_pair: str, filters: dict = None) -> dict:
+        """
+        Get current orderbook data for the specified trading pair, optionally filtered (see build_orderbook_filter).
+        Returns None on errors - an empty book would look like a book without orders.
+        """
         try:
+            filter_clauses, filter_params = self.build_orderbook_filter(filters)
+            where = " AND ".join(["trading_pair = ?"] + filter_clauses)
+
             with self.lock:
                 conn = self.get_connection()
                 cursor = conn.cursor()
                 
                 # Get all active orders for the trading pair
-                cursor.execute("""
+                cursor.execute(f"""
                     SELECT order_type, price, amount, min_amount, timestamp, order_id
                     FROM orders 
-                    WHERE trading_pair = ?
-                """, (trading_pair,))
+                    WHERE {where}
+                """, (trading_pair, *filter_params))
                 
                 rows = cursor.fetchall()
                 
@@ -120,89 +174,197 @@ class DatabaseManager:
                 
         except mariadb.Error as e:
             self.logger.error(f"Database error: {str(e)}")
-            return {'orders': {'asks': [], 'bids': []}}
+            return None
         except Exception as e:
             self.logger.error(f"Error fetching orderbook data: {str(e)}")
-            return {'orders': {'asks': [], 'bids': []}}
+            return None
 
-    def check_orders(self, trading_pair: str):
-        """Check orders in database"""
+    def get_order_keys(self, trading_pair: str):
+        """Get order_id -> amount of all orders of the trading pair (small delta check), None on errors"""
         try:
             with self.lock:
                 conn = self.get_connection()
                 cursor = conn.cursor()
                 cursor.execute("""
-                    SELECT order_type, price, amount, timestamp
-                    FROM orders 
+                    SELECT order_id, amount
+                    FROM orders
                     WHERE trading_pair = ?
-                    ORDER BY timestamp DESC
                 """, (trading_pair,))
-                
                 rows = cursor.fetchall()
                 cursor.close()
                 conn.close()
-                return len(rows)
+                return {order_id: str(amount) for order_id, amount in rows}
         except Exception as e:
-            self.logger.error(f"Error checking orders: {str(e)}")
-            return 0
+            self.logger.error(f"Error fetching order keys: {str(e)}")
+            return None
 
-    def get_analysis_data(self, trading_pair: str, interval: str) -> dict:
-        """Get analysis data for the specified trading pair and interval"""
+    def get_orders_by_ids(self, trading_pair: str, order_ids=None):
+        """
+        Get full order rows of the trading pair (all orders if order_ids is None), None on errors.
+        Rows: (order_id, order_type, price, amount, min_amount, seat_of_bank, min_trust_level, is_kyc_full, payment_option)
+        """
+        query = """
+            SELECT order_id, order_type, price, amount, min_amount,
+                   seat_of_bank, min_trust_level, is_kyc_full, payment_option
+            FROM orders
+            WHERE trading_pair = ?
+        """
         try:
             with self.lock:
                 conn = self.get_connection()
                 cursor = conn.cursor()
-                
-                # Fetch RSI value
-                cursor.execute("""
-                    SELECT rsi_value
-                    FROM rsi_values
-                    WHERE trading_pair = ? AND `interval` = ?
-                """, (trading_pair, interval))
-                rsi_row = cursor.fetchone()
-                rsi_value = rsi_row[0] if rsi_row else None
+                if order_ids is None:
+                    cursor.execute(query, (trading_pair,))
+                    rows = cursor.fetchall()
+                else:
+                    order_ids = list(order_ids)
+                    rows = []
+                    # Keep the IN list short
+                    for start in range(0, len(order_ids), 500):
+                        chunk = order_ids[start:start + 500]
+                        placeholders = ", ".join("?" for _ in chunk)
+                        cursor.execute(f"{query} AND order_id IN ({placeholders})", (trading_pair, *chunk))
+                        rows.extend(cursor.fetchall())
+                cursor.close()
+                conn.close()
+                return rows
+        except Exception as e:
+            self.logger.error(f"Error fetching orders: {str(e)}")
+            return None
 
-                # Fetch BB SMA value
+    def get_orderbook_checksum(self, trading_pair: str):
+        """
+        Get (checksum, order_count) of the orderbook as maintained by the Orderbuch-server.
+        Returns None if the server does not provide checksums (older versions).
+        """
+        if not self.checksums_available:
+            return None
+        try:
+            with self.lock:
+                conn = self.get_connection()
+                cursor = conn.cursor()
                 cursor.execute("""
-                    SELECT bb_sma
-                    FROM bollinger_bands
-                    WHERE trading_pair = ? AND `interval` = ?
-                """, (trading_pair, interval))
-                bb_sma_row = cursor.fetchone()
-                bb_sma_value = bb_sma_row[0] if bb_sma_row else None
+                    SELECT checksum, order_count
+                    FROM orderbook_checksums
+                    WHERE trading_pair = ?
+                """, (trading_pair,))
+                row = cursor.fetchone()
+                cursor.close()
+                conn.close()
+                return (int(row[0]), int(row[1])) if row else (0, 0)
+        except mariadb.Error as e:
+            if getattr(e, 'errno', None) == 1146:  # Table doesn't exist
+                self.checksums_available = False
+                self.logger.info("Orderbook checksums not available, falling back to full comparisons")
+            else:
+                self.logger.error(f"Error fetching orderbook checksum: {str(e)}")
+            return None
+        except Exception as e:
+            self.logger.error(f"Error fetching orderbook checksum: {str(e)}")
+            return None
 
-                # Fetch Stochastic value
+    def get_orderbook_watermark(self, trading_pair: str):
+        """Get a cheap change marker for the orderbook (the server checksum or count, newest timestamp, total amount)"""
+        checksum = self.get_orderbook_checksum(trading_pair)
+        if checksum is not None:
+            return checksum
+        try:
+            with self.lock:
+                conn = self.get_connection()
+                cursor = conn.cursor()
                 cursor.execute("""
-                    SELECT stochastic_value
-                    FROM stochastic_values
-                    WHERE trading_pair = ? AND `interval` = ?
-                """, (trading_pair, interval))
-                stochastic_row = cursor.fetchone()
-                stochastic_value = stochastic_row[0] if stochastic_row else None
+                    SELECT COUNT(*), MAX(timestamp), SUM(amount)
+                    FROM orders
+                    WHERE trading_pair = ?
+                """, (trading_pair,))
+                row = cursor.fetchone()
+                cursor.close()
+                conn.close()
+                return tuple(row) if row else None
+        except Exception as e:
+            self.logger.error(f"Error fetching orderbook watermark: {str(e)}")
+            return None
 
-                # Fetch Score value
+    def get_analysis_watermark(self, interval: str):
+        """Get the newest timestamps of the analysis tables for the specified interval"""
+        try:
+            with self.lock:
+                conn = self.get_connection()
+                cursor = conn.cursor()
                 cursor.execute("""
-                    SELECT score
-                    FROM weighted_scores
-                    WHERE trading_pair = ? AND `interval` = ?
-                """, (trading_pair, interval))
-                score_row = cursor.fetchone()
-                score_value = score_row[0] if score_row else None
+                    SELECT
+                        (SELECT MAX(timestamp) FROM rsi_values WHERE `interval` = ?),
+                        (SELECT MAX(timestamp) FROM bollinger_bands WHERE `interval` = ?),
+                        (SELECT MAX(timestamp) FROM stochastic_values WHERE `interval` = ?),
+                        (SELECT MAX(timestamp) FROM weighted_scores WHERE `interval` = ?)
+                """, (interval, interval, interval, interval))
+                row = cursor.fetchone()
+                cursor.close()
+                conn.close()
+                return tuple(row) if row else None
+        except Exception as e:
+            self.logger.error(f"Error fetching analysis watermark: {str(e)}")
+            return None
 
+    def get_analysis_data_bulk(self, interval: str):
+        """
+        Get the analysis data of all trading pairs for the specified interval in one query.
+        Returns (data, watermark): data maps trading_pair -> indicator dict,
+        the watermark has the same format as get_analysis_watermark().
+        """
+        indicators = (
+            ('rsi_values', 'rsi_value', 'rsi_value'),
+            ('bollinger_bands', 'bb_sma', 'bb_sma'),
+            ('stochastic_values', 'stochastic_value', 'stochastic_value'),
+            ('weighted_scores', 'score', 'score')
+        )
+        try:
+            with self.lock:
+                conn = self.get_connection()
+                cursor = conn.cursor()
+                cursor.execute(" UNION ALL ".join(
+                    f"SELECT '{key}', trading_pair, {column}, timestamp FROM {table} WHERE `interval` = ?"
+                    for table, column, key in indicators
+                ), tuple(interval for _ in indicators))
+                rows = cursor.fetchall()
                 cursor.close()
                 conn.close()
-                
-                return {
-                    'rsi_value': rsi_value,
-                    'bb_sma': bb_sma_value,
-                    'stochastic_value': stochastic_value,
-                    'score': score_value
-                }
-                
+
+            data = {}
+            newest = {key: None for _, _, key in indicators}
+            for key, trading_pair, value, timestamp in rows:
+                pair_data = data.setdefault(trading_pair, {k: None for _, _, k in indicators})
+                pair_data[key] = value
+                if timestamp is not None and (newest[key] is None or timestamp > newest[key]):
+                    newest[key] = timestamp
+            watermark = tuple(newest[key] for _, _, key in indicators)
+            return data, watermark
+
         except mariadb.Error as e:
             self.logger.error(f"Database error: {str(e)}")
-            return {}
+            return {}, None
         except Exception as e:
             self.logger.error(f"Error fetching analysis data: {str(e)}")
-            return {}
+            return {}, None
+
+    def check_orders(self, trading_pair: str):
+        """Check orders in database"""
+        try:
+            with self.lock:
+                conn = self.get_connection()
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT order_type, price, amount, timestamp
+                    FROM orders 
+                    WHERE trading_pair = ?
+                    ORDER BY timestamp DESC
+                """, (trading_pair,))
+                
+                rows = cursor.fetchall()
+                cursor.close()
+                conn.close()
+                return len(rows)
+        except Exception as e:
+            self.logger.error(f"Error checking orders: {str(e)}")
+            return 0
        
\ No newline at end of file
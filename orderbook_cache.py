@@ -0,0 +1,231 @@
+import threading
+import time
+
+import numpy as np
+
+from constants import OrderbookSettings
+from orderbook_data import book_side_to_arrays, BookIndex
+
+
+class OrderbookSnapshot:
+    """Immutable orderbook snapshot shared by all consumers of the OrderbookCache"""
+
+    def __init__(self, trading_pair, orderbook, version, filters=None):
+        self.trading_pair = trading_pair
+        self.filters = filters
+        self.orderbook = orderbook  # {'orders': {'asks': [...], 'bids': [...]}} wie von get_orderbook()
+        self.version = version
+        self.fetched_at = time.monotonic()
+
+        orders = orderbook.get('orders', {})
+        self.asks = orders.get('asks', [])
+        self.bids = orders.get('bids', [])
+        # Numerische Arrays (asks aufsteigend, bids absteigend nach Preis)
+        self.ask_prices, self.ask_amounts, self.ask_ids = book_side_to_arrays(self.asks)
+        self.bid_prices, self.bid_amounts, self.bid_ids = book_side_to_arrays(self.bids)
+        self.order_ids = set(self.ask_ids.tolist()) | set(self.bid_ids.tolist())
+        self.indexes = {}  # side -> BookIndex, built on first use
+
+    @property
+    def age(self):
+        """Seconds since the snapshot was fetched"""
+        return time.monotonic() - self.fetched_at
+
+    def is_empty(self):
+        return not self.asks and not self.bids
+
+    def has_order(self, order_id):
+        """Check if an order id is in the book"""
+        return order_id in self.order_ids
+
+    def order_amount(self, order_id):
+        """Amount of an order in the book, None if it is not in the book"""
+        if order_id not in self.order_ids:
+            return None
+        for ids, amounts in ((self.ask_ids, self.ask_amounts), (self.bid_ids, self.bid_amounts)):
+            positions = np.flatnonzero(ids == order_id)
+            if positions.size:
+                return float(amounts[positions[0]])
+        return None
+
+    def side(self, side):
+        """Return (prices, amounts, order_ids) for 'asks' or 'bids'"""
+        if side == 'asks':
+            return self.ask_prices, self.ask_amounts, self.ask_ids
+        return self.bid_prices, self.bid_amounts, self.bid_ids
+
+    def index(self, side):
+        """BookIndex for 'asks' or 'bids'"""
+        index = self.indexes.get(side)
+        if index is None:
+            index = BookIndex(*self.side(side), side)
+            self.indexes[side] = index
+        return index
+
+    def best_price(self, side, exclude_order_id=None):
+        """Best price of a side, optionally ignoring one order (e.g. the own order)"""
+        exclude = {exclude_order_id} if exclude_order_id is not None else None
+        return self.index(side).best_price(exclude)
+
+
+def filters_key(filters):
+    """Hashable, order-independent key for an orderbook filter dict"""
+    if not filters:
+        return None
+    return tuple(sorted(
+        (name, tuple(sorted(value)) if isinstance(value, (list, tuple, set)) else value)
+        for name, value in filters.items()
+        if value
+    )) or None
+
+
+class OrderbookCache:
+    """
+    Process-wide orderbook cache keyed by trading pair (and filter).
+
+    - snapshots younger than the TTL are served without a database query
+    - concurrent callers for the same pair share one query (single-flight)
+    - subscribers are notified with every new snapshot (in the fetching thread)
+    - a failed query is neither cached nor published, callers keep the previous snapshot
+    - an optional OrderbookMirror is used as source instead of the database
+    """
+
+    def __init__(self, db_manager, logger, ttl=OrderbookSettings.CACHE_TTL_SECONDS, mirror=None):
+        self.db_manager = db_manager
+        self.mirror = mirror
+        self.logger = logger
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.snapshots = {}  # (trading_pair, filters_key) -> OrderbookSnapshot
+        self.in_flight = {}  # (trading_pair, filters_key) -> threading.Event
+        self.subscribers = []  # (trading_pair oder None für alle, callback)
+        self.version = 0
+
+        # Statistiken
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+        self.fetch_errors = 0
+
+    def set_db_manager(self, db_manager):
+        """Use a new database manager and drop all cached snapshots"""
+        with self.lock:
+            self.db_manager = db_manager
+            self.snapshots.clear()
+        if self.mirror:
+            self.mirror.set_db_manager(db_manager)
+
+    @property
+    def source(self):
+        """Where snapshots are read from: the local mirror or the database"""
+        return self.mirror or self.db_manager
+
+    def get_watermark(self, trading_pair):
+        """Cheap change marker of the source for the trading pair"""
+        source = self.source
+        return source.get_orderbook_watermark(trading_pair) if source else None
+
+    def get_changes(self, trading_pair, since_version):
+        """Order deltas of the local mirror since a version, None without mirror or if a full reload is needed"""
+        return self.mirror.get_changes(trading_pair, since_version) if self.mirror else None
+
+    def get_source_status(self, trading_pair):
+        """Staleness of the local mirror or None when reading from the database directly"""
+        return self.mirror.get_status(trading_pair) if self.mirror else None
+
+    def get(self, trading_pair, max_age=None, filters=None):
+        """Get a snapshot for the trading pair, fetching it if the cached one is too old"""
+        max_age = self.ttl if max_age is None else max_age
+        key = (trading_pair, filters_key(filters))
+
+        with self.lock:
+            snapshot = self.snapshots.get(key)
+            if snapshot and snapshot.age <= max_age:
+                self.hits += 1
+                return snapshot
+
+            event = self.in_flight.get(key)
+            leader = event is None
+            if leader:
+                event = threading.Event()
+                self.in_flight[key] = event
+                self.misses += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            # Ein anderer Thread holt das Orderbuch bereits - auf dessen Ergebnis warten
+            event.wait(OrderbookSettings.CACHE_FETCH_TIMEOUT_SECONDS)
+            with self.lock:
+                return self.snapshots.get(key) or snapshot
+
+        try:
+            snapshot = self.fetch(trading_pair, filters) or snapshot
+        finally:
+            with self.lock:
+                self.in_flight.pop(key, None)
+            event.set()
+
+        return snapshot
+
+    def get_orderbook(self, trading_pair, max_age=None, filters=None):
+        """Get the orderbook in the format of DatabaseManager.get_orderbook()"""
+        snapshot = self.get(trading_pair, max_age, filters)
+        return snapshot.orderbook if snapshot else {'orders': {'asks': [], 'bids': []}}
+
+    def fetch(self, trading_pair, filters=None):
+        """Query the database and store the new snapshot, None if the query failed"""
+        source = self.source
+        if not source:
+            return None
+
+        orderbook = source.get_orderbook(trading_pair, filters) if filters else source.get_orderbook(trading_pair)
+        if orderbook is None:
+            # Fehler der Quelle: kein leeres Buch cachen oder verteilen, der letzte Snapshot bleibt gültig
+            self.fetch_errors += 1
+            self.logger.warning(f"Orderbook {trading_pair} could not be read - keeping the previous snapshot")
+            return None
+        with self.lock:
+            self.version += 1
+            version = self.version
+        snapshot = OrderbookSnapshot(trading_pair, orderbook, version, filters)
+        with self.lock:
+            self.snapshots[(trading_pair, filters_key(filters))] = snapshot
+            subscribers = [callback for pair, callback in self.subscribers if pair in (None, trading_pair)]
+
+        for callback in subscribers:
+            try:
+                callback(snapshot)
+            except Exception as e:
+                self.logger.error(f"Error in orderbook subscriber: {str(e)}")
+        return snapshot
+
+    def invalidate(self, trading_pair=None):
+        """Drop the cached snapshots of one pair (or all pairs)"""
+        with self.lock:
+            if trading_pair is None:
+                self.snapshots.clear()
+            else:
+                for key in [key for key in self.snapshots if key[0] == trading_pair]:
+                    del self.snapshots[key]
+
+    def subscribe(self, callback, trading_pair=None):
+        """Call callback(snapshot) for every new snapshot of the pair (or of all pairs)"""
+        with self.lock:
+            self.subscribers.append((trading_pair, callback))
+
+    def unsubscribe(self, callback):
+        """Remove a subscriber"""
+        with self.lock:
+            self.subscribers = [(pair, cb) for pair, cb in self.subscribers if cb != callback]
+
+    def get_stats(self):
+        """Get cache statistics"""
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'shared': self.shared,
+                'fetch_errors': self.fetch_errors,
+                'pairs': len(self.snapshots)
+            }
@@ -0,0 +1,282 @@
+import hashlib
+from decimal import Decimal, ROUND_HALF_UP
+
+import numpy as np
+
+# Kleine Toleranz, damit z.B. 100.07 / 0.01 nicht durch Rundungsfehler in die nächste Stufe fällt
+TICK_EPSILON = 1e-9
+
+# Startgröße der Preisstufen-Arrays des Markttiefe-Charts (wächst bei Bedarf durch Verdoppeln)
+DEPTH_INITIAL_CAPACITY = 256
+
+
+# Preise und Mengen werden vor dem Hashen auf DECIMAL(20,8) gerundet
+CHECKSUM_QUANT = Decimal('0.00000001')
+
+
+def order_checksum(order_id, price, amount):
+    """
+    64-bit hash of one order for the rolling orderbook checksum of the Orderbuch-server.
+    Must produce the same values as order_checksum in Orderbuch-server/database_handler.py.
+    """
+    # NULL (die Spalten sind nullable) zählt wie 0
+    price = Decimal(str(price or 0)).quantize(CHECKSUM_QUANT, rounding=ROUND_HALF_UP)
+    amount = Decimal(str(amount or 0)).quantize(CHECKSUM_QUANT, rounding=ROUND_HALF_UP)
+    digest = hashlib.blake2b(f"{order_id}|{price:f}|{amount:f}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def book_side_to_arrays(orders):
+    """Convert orderbook rows [price, amount, min_amount, order_id] into numeric arrays"""
+    if not orders:
+        return np.empty(0), np.empty(0), np.empty(0, dtype=object)
+
+    prices = np.fromiter((float(order[0]) for order in orders), dtype=float, count=len(orders))
+    amounts = np.fromiter((float(order[1]) for order in orders), dtype=float, count=len(orders))
+    order_ids = np.array([order[3] if len(order) > 3 else None for order in orders], dtype=object)
+    return prices, amounts, order_ids
+
+
+def price_level_keys(prices, tick, relative=False, side='asks'):
+    """
+    Map prices to integer bucket keys.
+    Asks are rounded up and bids rounded down, so a level never looks better than its orders.
+    For relative ticks (e.g. 0.001 = 0.1%) the buckets are logarithmic.
+    """
+    if relative:
+        scaled = np.log(prices) / np.log1p(tick)
+    else:
+        scaled = prices / tick
+
+    if side == 'asks':
+        return np.ceil(scaled - TICK_EPSILON).astype(np.int64)
+    return np.floor(scaled + TICK_EPSILON).astype(np.int64)
+
+
+def level_price_from_key(keys, tick, relative=False):
+    """Convert bucket keys back into the displayed level price"""
+    if relative:
+        return np.power(1.0 + tick, keys.astype(float))
+    return keys.astype(float) * tick
+
+
+def aggregate_price_levels(prices, amounts, tick, relative=False, side='asks'):
+    """
+    Aggregate single orders into price levels.
+
+    Returns a dict with the level prices (best first), amount and order count per level,
+    the cumulative amount and the index of the level for every input order (for drill-down).
+    """
+    if len(prices) == 0:
+        empty = np.empty(0)
+        return {
+            'prices': empty,
+            'amounts': empty,
+            'counts': np.empty(0, dtype=np.int64),
+            'cumulative': empty,
+            'order_levels': np.empty(0, dtype=np.int64)
+        }
+
+    keys = price_level_keys(prices, tick, relative, side)
+    unique_keys, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+    level_amounts = np.bincount(inverse, weights=amounts, minlength=len(unique_keys))
+
+    # np.unique sortiert aufsteigend - für Bids ist der beste Preis der höchste
+    if side == 'bids':
+        unique_keys = unique_keys[::-1]
+        level_amounts = level_amounts[::-1]
+        counts = counts[::-1]
+        inverse = len(counts) - 1 - inverse
+
+    return {
+        'prices': level_price_from_key(unique_keys, tick, relative),
+        'amounts': level_amounts,
+        'counts': counts,
+        'cumulative': np.cumsum(level_amounts),
+        'order_levels': inverse
+    }
+
+
+class DepthSide:
+    """
+    One side of the depth book: price levels in preallocated numpy arrays.
+    Levels are kept ascending by key (price for bids, -price for asks), so the best price is the
+    last level and the frequent changes near the top of the book only shift a few entries.
+    """
+
+    def __init__(self, side, capacity=DEPTH_INITIAL_CAPACITY):
+        self.side = side
+        self.sign = 1.0 if side == 'bids' else -1.0
+        self.keys = np.empty(capacity)
+        self.amounts = np.empty(capacity)
+        self.count = 0
+
+    def reserve(self, capacity):
+        """Grow the arrays (doubling) so they hold at least capacity levels"""
+        if capacity <= len(self.keys):
+            return
+        size = max(len(self.keys), 1)
+        while size < capacity:
+            size *= 2
+        keys, amounts = np.empty(size), np.empty(size)
+        keys[:self.count] = self.keys[:self.count]
+        amounts[:self.count] = self.amounts[:self.count]
+        self.keys, self.amounts = keys, amounts
+
+    def load(self, prices, amounts):
+        """Replace all levels with the aggregated orders (prices, amounts arrays)"""
+        keys, inverse = np.unique(np.asarray(prices, dtype=float) * self.sign, return_inverse=True)
+        level_amounts = np.bincount(inverse, weights=amounts, minlength=len(keys))
+        self.count = 0
+        self.reserve(len(keys))
+        self.keys[:len(keys)] = keys
+        self.amounts[:len(keys)] = level_amounts
+        self.count = len(keys)
+
+    def add(self, price, amount):
+        """Add amount at a price level, creating the level if needed"""
+        key = price * self.sign
+        count = self.count
+        index = int(np.searchsorted(self.keys[:count], key))
+        if index < count and self.keys[index] == key:
+            self.amounts[index] += amount
+            return
+        self.reserve(count + 1)
+        # In-place verschieben statt neu allokieren
+        self.keys[index + 1:count + 1] = self.keys[index:count]
+        self.amounts[index + 1:count + 1] = self.amounts[index:count]
+        self.keys[index] = key
+        self.amounts[index] = amount
+        self.count = count + 1
+
+    def remove(self, price, amount):
+        """Remove amount from a price level, dropping the level when it is empty"""
+        key = price * self.sign
+        count = self.count
+        index = int(np.searchsorted(self.keys[:count], key))
+        if index >= count or self.keys[index] != key:
+            return
+        self.amounts[index] -= amount
+        if self.amounts[index] <= TICK_EPSILON:
+            self.keys[index:count - 1] = self.keys[index + 1:count]
+            self.amounts[index:count - 1] = self.amounts[index + 1:count]
+            self.count = count - 1
+
+    def curve(self, max_levels=None):
+        """Return (prices, cumulative amounts) starting at the best price"""
+        start = max(self.count - max_levels, 0) if max_levels else 0
+        # Nur die gezeigten Stufen kopieren und kumulieren
+        keys = self.keys[start:self.count][::-1]
+        amounts = self.amounts[start:self.count][::-1]
+        return keys * self.sign, np.cumsum(amounts)
+
+
+class DepthBook:
+    """
+    Orderbook price levels for the depth chart.
+    Order deltas (e.g. from the OrderbookMirror) only touch the changed levels; a full snapshot
+    is loaded in one vectorized pass when no deltas are available.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.sides = {'asks': DepthSide('asks'), 'bids': DepthSide('bids')}
+        self.orders = {}  # order_id -> (side, price, amount), only kept while deltas are applied
+        self.source_version = None  # version of the delta source the book is at
+        self.version = 0
+
+    def apply_delta(self, added, removed):
+        """Apply added orders (order_id, side, price, amount) and removed order ids (applying a delta twice is harmless)"""
+        for order_id in removed:
+            known = self.orders.pop(order_id, None)
+            if known:
+                side, price, amount = known
+                self.sides[side].remove(price, amount)
+        for order_id, side, price, amount in added:
+            if order_id in self.orders:
+                old_side, old_price, old_amount = self.orders[order_id]
+                self.sides[old_side].remove(old_price, old_amount)
+            self.orders[order_id] = (side, price, amount)
+            self.sides[side].add(price, amount)
+        if added or removed:
+            self.version += 1
+        return len(added) + len(removed)
+
+    def load(self, orderbook, source_version=None):
+        """
+        Replace the book with a snapshot ({'asks': [...], 'bids': [...]}).
+        With a source_version the orders are remembered, so deltas of that source can follow.
+        """
+        self.orders = {}
+        for side in ('asks', 'bids'):
+            prices, amounts, order_ids = book_side_to_arrays(orderbook.get(side, []))
+            self.sides[side].load(prices, amounts)
+            if source_version is not None:
+                self.orders.update(
+                    (order_id, (side, price, amount))
+                    for order_id, price, amount in zip(order_ids.tolist(), prices.tolist(), amounts.tolist())
+                    if order_id is not None
+                )
+        self.source_version = source_version
+        self.version += 1
+
+    def curve(self, side, max_levels=None):
+        """Cumulative depth curve for 'asks' or 'bids'"""
+        return self.sides[side].curve(max_levels)
+
+
+class BookIndex:
+    """
+    Query index over one sorted side of an orderbook snapshot.
+
+    - best price excluding a set of order ids (skips only the excluded orders at the top)
+    - nearest price strictly below / above a price (binary search)
+    - price at which the cumulative amount reaches a target (binary search on the cumsum)
+    """
+
+    def __init__(self, prices, amounts, order_ids, side):
+        # Eingabe ist nach bestem Preis sortiert (asks aufsteigend, bids absteigend)
+        self.side = side
+        self.prices = prices
+        self.order_ids = order_ids
+        self.cumulative = np.cumsum(amounts)
+        if side == 'bids':
+            self.ascending_prices = prices[::-1]
+            self.ascending_ids = order_ids[::-1]
+        else:
+            self.ascending_prices = prices
+            self.ascending_ids = order_ids
+
+    def __len__(self):
+        return len(self.prices)
+
+    @staticmethod
+    def walk(prices, order_ids, start, step, exclude):
+        """First price from start in direction step whose order id is not excluded"""
+        index = start
+        while 0 <= index < len(prices):
+            if not exclude or order_ids[index] not in exclude:
+                return float(prices[index])
+            index += step
+        return None
+
+    def best_price(self, exclude=None):
+        """Best price of the side, ignoring the given order ids"""
+        return self.walk(self.prices, self.order_ids, 0, 1, exclude)
+
+    def best_below(self, price, exclude=None):
+        """Highest price strictly below price, ignoring the given order ids"""
+        start = int(np.searchsorted(self.ascending_prices, price, side='left')) - 1
+        return self.walk(self.ascending_prices, self.ascending_ids, start, -1, exclude)
+
+    def best_above(self, price, exclude=None):
+        """Lowest price strictly above price, ignoring the given order ids"""
+        start = int(np.searchsorted(self.ascending_prices, price, side='right'))
+        return self.walk(self.ascending_prices, self.ascending_ids, start, 1, exclude)
+
+    def depth_price(self, amount):
+        """Price (from the best price on) at which the cumulative amount reaches amount, None if the side is too thin"""
+        index = int(np.searchsorted(self.cumulative, amount - TICK_EPSILON, side='left'))
+        return float(self.prices[index]) if index < len(self.prices) else None
@@ -0,0 +1,356 @@
+import sqlite3
+import threading
+import time
+from collections import deque
+
+from constants import OrderbookSettings
+from orderbook_data import order_checksum
+
+
+class OrderbookMirror:
+    """
+    Local SQLite read-mirror of the orders table of the Orderbuch-server database.
+
+    A background thread first compares the rolling checksum of the Orderbuch-server with the
+    local one; only on a mismatch it pulls (order_id, amount) per pair and fetches full rows
+    just for new or changed orders. get_orderbook() reads the local copy (the database until
+    the sync thread has loaded a pair for the first time) and has the same interface as
+    DatabaseManager.get_orderbook(), so it can be used as source of the OrderbookCache. Pairs are synced while they are in use; a full resync runs
+    when the delta sync fails, the order counts or checksums keep disagreeing, or
+    periodically if the server provides no checksums. get_changes() hands out the order
+    deltas of the last syncs, so consumers like the depth chart do not have to diff snapshots.
+    """
+
+    def __init__(self, db_manager, logger, db_path=None):
+        self.db_manager = db_manager
+        self.logger = logger
+        self.db_path = db_path or OrderbookSettings.MIRROR_PATH
+
+        # One connection for sync thread and readers, guarded by the lock
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.init_mirror_database()
+
+        self.sync_lock = threading.Lock()  # one sync per pair at a time
+        self.known = {}  # trading_pair -> {order_id: (amount, order_checksum)}
+        self.checksums = {}  # trading_pair -> XOR of the order checksums
+        self.checksum_mismatches = {}  # trading_pair -> consecutive mismatches after a delta sync
+        self.versions = {}  # trading_pair -> local change counter
+        self.change_log = {}  # trading_pair -> deque of (version, added, removed), see get_changes()
+        self.last_sync = {}  # trading_pair -> monotonic time of the last successful sync
+        self.last_full_sync = {}  # trading_pair -> monotonic time of the last full resync
+        self.needs_full_sync = set()
+        self.active_pairs = {}  # trading_pair -> monotonic time of the last read
+        self.stale_warned = set()
+
+        # Statistiken
+        self.delta_syncs = 0
+        self.checksum_skips = 0
+        self.full_syncs = 0
+        self.sync_errors = 0
+
+        self.running = False
+        self.thread = None
+
+    def init_mirror_database(self):
+        """Create the local schema"""
+        with self.lock:
+            cursor = self.conn.cursor()
+            if self.db_path != ':memory:':
+                cursor.execute("PRAGMA journal_mode=WAL")
+                cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute("DROP TABLE IF EXISTS orders")  # The mirror is rebuilt on every start
+            cursor.execute("""
+                CREATE TABLE orders (
+                    trading_pair TEXT NOT NULL,
+                    order_id TEXT NOT NULL,
+                    order_type TEXT NOT NULL,
+                    price TEXT NOT NULL,
+                    price_value REAL NOT NULL,
+                    amount TEXT NOT NULL,
+                    min_amount TEXT,
+                    seat_of_bank TEXT,
+                    min_trust_level TEXT,
+                    is_kyc_full INTEGER,
+                    payment_option INTEGER,
+                    PRIMARY KEY (trading_pair, order_id)
+                )
+            """)
+            cursor.execute("CREATE INDEX idx_mirror_pair_price ON orders(trading_pair, order_type, price_value)")
+            self.conn.commit()
+            cursor.close()
+
+    def set_db_manager(self, db_manager):
+        """Use a new source database and resync all pairs"""
+        with self.sync_lock:
+            self.db_manager = db_manager
+            self.needs_full_sync.update(self.known.keys())
+
+    def start(self):
+        """Start the background sync thread"""
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self.sync_loop, daemon=True)
+        self.thread.start()
+        self.logger.info(f"Orderbook mirror started ({self.db_path})")
+
+    def stop(self):
+        """Stop the sync thread and close the local database"""
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=2)
+            self.thread = None
+        with self.lock:
+            self.conn.close()
+        self.logger.info(
+            f"Orderbook mirror stopped: {self.checksum_skips} checksum matches, {self.delta_syncs} delta syncs, "
+            f"{self.full_syncs} full resyncs, {self.sync_errors} errors"
+        )
+
+    def sync_loop(self):
+        """Sync all pairs that were read recently"""
+        while self.running:
+            now = time.monotonic()
+            for trading_pair, last_read in list(self.active_pairs.items()):
+                if now - last_read > OrderbookSettings.MIRROR_ACTIVE_PAIR_SECONDS:
+                    continue
+                # With server checksums a full resync is only needed on mismatch
+                periodic_full = (
+                    not getattr(self.db_manager, 'checksums_available', False)
+                    and now - self.last_full_sync.get(trading_pair, 0) > OrderbookSettings.MIRROR_FULL_RESYNC_SECONDS
+                )
+                full = trading_pair in self.needs_full_sync or periodic_full
+                self.sync_pair(trading_pair, full)
+            time.sleep(OrderbookSettings.MIRROR_SYNC_INTERVAL_SECONDS)
+
+    def sync_pair(self, trading_pair, full=False):
+        """Bring the local copy of one pair up to date, returns True on success"""
+        with self.sync_lock:
+            db_manager = self.db_manager
+            if not db_manager:
+                return False
+            try:
+                if full or trading_pair not in self.known:
+                    ok = self.full_sync(db_manager, trading_pair)
+                else:
+                    ok = self.delta_sync(db_manager, trading_pair)
+            except Exception as e:
+                self.logger.error(f"Orderbook mirror sync failed for {trading_pair}: {str(e)}")
+                ok = False
+
+            if ok:
+                self.last_sync[trading_pair] = time.monotonic()
+                self.stale_warned.discard(trading_pair)
+            else:
+                self.sync_errors += 1
+                self.needs_full_sync.add(trading_pair)
+            return ok
+
+    def full_sync(self, db_manager, trading_pair):
+        """Replace the local copy of the pair with all remote orders"""
+        rows = db_manager.get_orders_by_ids(trading_pair)
+        if rows is None:
+            return False
+
+        with self.lock:
+            cursor = self.conn.cursor()
+            cursor.execute("DELETE FROM orders WHERE trading_pair = ?", (trading_pair,))
+            cursor.executemany(
+                "INSERT OR REPLACE INTO orders VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [self.to_local_row(trading_pair, row) for row in rows]
+            )
+            self.conn.commit()
+            cursor.close()
+
+        known = {row[0]: (str(row[3]), order_checksum(row[0], row[2], row[3])) for row in rows}
+        self.known[trading_pair] = known
+        self.checksums[trading_pair] = self.xor_all(known)
+        self.checksum_mismatches[trading_pair] = 0
+        with self.lock:
+            # Deltas über einen vollen Resync hinweg gibt es nicht - Leser laden das Buch neu
+            self.versions[trading_pair] = self.versions.get(trading_pair, 0) + 1
+            self.change_log[trading_pair] = deque(maxlen=OrderbookSettings.MIRROR_CHANGE_LOG_SIZE)
+        self.last_full_sync[trading_pair] = time.monotonic()
+        self.needs_full_sync.discard(trading_pair)
+        self.full_syncs += 1
+        self.logger.debug(f"Orderbook mirror full resync {trading_pair}: {len(rows)} orders")
+        return True
+
+    @staticmethod
+    def xor_all(known):
+        checksum = 0
+        for _, order_hash in known.values():
+            checksum ^= order_hash
+        return checksum
+
+    def delta_sync(self, db_manager, trading_pair):
+        """Compare the checksum, then (order_id, amount) with the remote table and apply only the differences"""
+        local = self.known[trading_pair]
+
+        # Checksum check costs a few bytes - the order keys are only pulled on a mismatch
+        remote_checksum = db_manager.get_orderbook_checksum(trading_pair)
+        if remote_checksum is not None and remote_checksum == (self.checksums[trading_pair], len(local)):
+            self.checksum_mismatches[trading_pair] = 0
+            self.checksum_skips += 1
+            return True
+
+        remote = db_manager.get_order_keys(trading_pair)
+        if remote is None:
+            return False
+
+        removed = [order_id for order_id in local if order_id not in remote]
+        changed = [order_id for order_id, amount in remote.items() if local.get(order_id, (None,))[0] != amount]
+
+        rows = []
+        if changed:
+            rows = db_manager.get_orders_by_ids(trading_pair, changed)
+            if rows is None:
+                return False
+
+        if removed or rows:
+            with self.lock:
+                cursor = self.conn.cursor()
+                cursor.executemany(
+                    "DELETE FROM orders WHERE trading_pair = ? AND order_id = ?",
+                    [(trading_pair, order_id) for order_id in removed]
+                )
+                cursor.executemany(
+                    "INSERT OR REPLACE INTO orders VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [self.to_local_row(trading_pair, row) for row in rows]
+                )
+                self.conn.commit()
+                cursor.close()
+            checksum = self.checksums[trading_pair]
+            for order_id in removed:
+                checksum ^= local.pop(order_id)[1]
+            for row in rows:
+                if row[0] in local:
+                    checksum ^= local[row[0]][1]
+                order_hash = order_checksum(row[0], row[2], row[3])
+                local[row[0]] = (str(row[3]), order_hash)
+                checksum ^= order_hash
+            self.checksums[trading_pair] = checksum
+            self.record_changes(trading_pair, rows, removed)
+
+        self.delta_syncs += 1
+        # Orders removed between the two queries: the next full resync repairs the copy
+        if len(local) != len(remote):
+            self.needs_full_sync.add(trading_pair)
+        elif remote_checksum is not None and remote_checksum[0] != self.checksums[trading_pair]:
+            # The book may have moved since the checksum was read - only resync if it keeps disagreeing
+            mismatches = self.checksum_mismatches.get(trading_pair, 0) + 1
+            self.checksum_mismatches[trading_pair] = mismatches
+            if mismatches >= OrderbookSettings.MIRROR_CHECKSUM_MISMATCH_LIMIT:
+                self.logger.warning(f"Orderbook mirror checksum mismatch for {trading_pair}, full resync")
+                self.needs_full_sync.add(trading_pair)
+        else:
+            self.checksum_mismatches[trading_pair] = 0
+        return True
+
+    def record_changes(self, trading_pair, rows, removed):
+        """Count a new version of the pair and remember its order changes for get_changes()"""
+        added = []
+        removed = list(removed)
+        for order_id, order_type, price, amount, *_ in rows:
+            side = {'sell': 'asks', 'buy': 'bids'}.get((order_type or '').lower())
+            if side and price and amount and float(price) and float(amount):
+                added.append((order_id, side, float(price), float(amount)))
+            else:
+                removed.append(order_id)  # wird im Buch nicht angezeigt
+        with self.lock:
+            version = self.versions.get(trading_pair, 0) + 1
+            self.versions[trading_pair] = version
+            log = self.change_log.setdefault(trading_pair, deque(maxlen=OrderbookSettings.MIRROR_CHANGE_LOG_SIZE))
+            log.append((version, added, removed))
+
+    def get_changes(self, trading_pair, since_version):
+        """
+        Order changes of the pair after since_version as (version, [(added, removed), ...]) in sync
+        order, with added as (order_id, side, price, amount) tuples. None if they are not complete
+        any more (full resync or too old) - the caller then has to load a full snapshot.
+        """
+        with self.lock:
+            version = self.versions.get(trading_pair)
+            if version is None or since_version is None or since_version > version:
+                return None
+            entries = [entry for entry in self.change_log.get(trading_pair, ()) if entry[0] > since_version]
+        if since_version == version:
+            return version, []
+        if not entries or entries[0][0] != since_version + 1:
+            return None
+        return version, [(added, removed) for _, added, removed in entries]
+
+    @staticmethod
+    def to_local_row(trading_pair, row):
+        order_id, order_type, price, amount, min_amount, seat_of_bank, min_trust_level, is_kyc_full, payment_option = row
+        return (
+            trading_pair,
+            order_id,
+            (order_type or '').lower(),
+            '' if price is None else str(price),
+            float(price or 0),
+            '' if amount is None else str(amount),
+            str(min_amount),
+            seat_of_bank,
+            min_trust_level,
+            None if is_kyc_full is None else int(is_kyc_full),
+            payment_option
+        )
+
+    def get_orderbook(self, trading_pair: str, filters: dict = None) -> dict:
+        """Read the orderbook from the local copy (same format as DatabaseManager.get_orderbook(), None on errors)"""
+        self.active_pairs[trading_pair] = time.monotonic()
+        if trading_pair not in self.known:
+            # Noch nicht gespiegelt: der Sync-Thread lädt das Paar, bis dahin direkt aus der Datenbank lesen
+            if not self.db_manager:
+                return None
+            return self.db_manager.get_orderbook(trading_pair, filters) if filters else self.db_manager.get_orderbook(trading_pair)
+
+        status = self.get_status(trading_pair)
+        if status['stale'] and trading_pair not in self.stale_warned:
+            self.stale_warned.add(trading_pair)
+            self.logger.warning(f"Orderbook mirror for {trading_pair} is stale (last sync {status['age']} s ago)")
+
+        filter_clauses, filter_params = self.db_manager.build_orderbook_filter(filters) if self.db_manager else ([], [])
+        # Wie DatabaseManager.get_orderbook(): Orders ohne Preis oder Menge auslassen
+        valid_clauses = ["price_value != 0", "CAST(amount AS REAL) != 0"]
+        where = " AND ".join(["trading_pair = ?", "order_type = ?"] + valid_clauses + filter_clauses)
+        try:
+            with self.lock:
+                # Stand der Kopie für get_changes() - wird erst nach dem Schreiben erhöht, kann also höchstens nachhinken
+                version = self.versions.get(trading_pair)
+                cursor = self.conn.cursor()
+                cursor.execute(
+                    f"SELECT price, amount, min_amount, order_id FROM orders WHERE {where} ORDER BY price_value ASC",
+                    (trading_pair, 'sell', *filter_params)
+                )
+                asks = [list(row) for row in cursor.fetchall()]
+                cursor.execute(
+                    f"SELECT price, amount, min_amount, order_id FROM orders WHERE {where} ORDER BY price_value DESC",
+                    (trading_pair, 'buy', *filter_params)
+                )
+                bids = [list(row) for row in cursor.fetchall()]
+                cursor.close()
+            return {'orders': {'asks': asks, 'bids': bids}, 'version': version}
+        except Exception as e:
+            self.logger.error(f"Error reading orderbook mirror: {str(e)}")
+            return None
+
+    def get_orderbook_watermark(self, trading_pair: str):
+        """Local change counter of the pair - costs no remote query"""
+        self.active_pairs[trading_pair] = time.monotonic()
+        return self.versions.get(trading_pair)
+
+    def get_status(self, trading_pair):
+        """Staleness of the local copy of a pair"""
+        last_sync = self.last_sync.get(trading_pair)
+        age = None if last_sync is None else round(time.monotonic() - last_sync, 1)
+        return {
+            'age': age,
+            'stale': age is None or age > OrderbookSettings.MIRROR_STALE_SECONDS,
+            'orders': len(self.known.get(trading_pair, {})),
+            'checksum': self.checksums.get(trading_pair),
+            'full_syncs': self.full_syncs,
+            'errors': self.sync_errors
+        }
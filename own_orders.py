@@ -0,0 +1,204 @@
+import threading
+import time
+
+from constants import TradeBotSettings
+
+
+class OrderState:
+    """Lifecycle of an own order"""
+    CREATED = 'created'  # von der API bestätigt, noch nicht im Orderbuch gesehen
+    VISIBLE = 'visible'  # im Orderbuch
+    PARTIAL = 'partial'  # im Orderbuch mit kleinerer Menge
+    MISSING = 'missing'  # fehlt im Orderbuch, Bestätigung durch den API-Abgleich steht aus
+    REMOVED = 'removed'  # gelöscht, ausgeführt oder abgelaufen
+
+    LABELS = {
+        CREATED: "erstellt",
+        VISIBLE: "im Buch",
+        PARTIAL: "teilweise ausgeführt",
+        MISSING: "fehlt im Buch",
+        REMOVED: "entfernt"
+    }
+
+
+class OwnOrderRegistry:
+    """
+    Local state of the own orders, shared by all bot instances of a BotEngine.
+
+    Orders are registered from create responses and marked removed from delete responses.
+    Orderbook snapshots (OrderbookCache subscription) move them through the states
+    created -> visible -> partial without any API call. An order that is missing from several
+    snapshots in a row is only flagged as missing: the orderbook database can lag or fail, so
+    only the API reconciliation removes it. The reconciliation is authoritative - it also revives
+    orders that were marked removed but are still open, and finds orders not created by this
+    program (they can be claimed by a bot instance).
+
+    The order dicts are shared with the bot instances (BotInstance.own_order) and updated in place.
+    """
+
+    def __init__(self, logger, grace_seconds=TradeBotSettings.NEW_ORDER_GRACE_SECONDS,
+                 reconcile_interval=TradeBotSettings.RECONCILE_INTERVAL_SECONDS,
+                 missing_limit=TradeBotSettings.MISSING_SNAPSHOTS_LIMIT):
+        self.logger = logger
+        self.grace_seconds = grace_seconds
+        self.reconcile_interval = reconcile_interval
+        self.missing_limit = missing_limit
+        self.lock = threading.Lock()
+        self.orders = {}  # order_id -> order dict (nur nicht entfernte Orders)
+        self.removed = {}  # order_id -> (monotonic time of the removal, order dict)
+        self.last_reconcile = None  # monotonic, None = noch nie abgeglichen
+
+    def _new_order(self, order_id, trading_pair, type, price, amount, owner, state):
+        now = time.monotonic()
+        return {
+            'order_id': order_id,
+            'trading_pair': trading_pair,
+            'type': type,
+            'price': price,
+            'amount': amount,
+            'remaining': amount,
+            'owner': owner,
+            'state': state,
+            'misses': 0,  # Snapshots in Folge ohne das Order
+            'created_at': now,
+            'updated_at': now
+        }
+
+    def _set_state(self, order, state, reason=None):
+        if order['state'] == state:
+            return
+        self.logger.info(
+            f"Order {order['order_id']}: {OrderState.LABELS[order['state']]} -> {OrderState.LABELS[state]}"
+            + (f" ({reason})" if reason else "")
+        )
+        order['state'] = state
+        order['updated_at'] = time.monotonic()
+        if state == OrderState.REMOVED:
+            self.orders.pop(order['order_id'], None)
+            self.removed[order['order_id']] = (order['updated_at'], order)
+
+    def register(self, order_id, trading_pair, type, price, amount=None, owner=None):
+        """Track an order confirmed by a create response, returns its order dict"""
+        with self.lock:
+            order = self._new_order(order_id, trading_pair, type, price, amount, owner, OrderState.CREATED)
+            self.orders[order_id] = order
+            return order
+
+    def mark_removed(self, order_id, reason="gelöscht"):
+        """The order was deleted (delete response) or is gone"""
+        with self.lock:
+            order = self.orders.get(order_id)
+            if order:
+                self._set_state(order, OrderState.REMOVED, reason)
+
+    def release(self, order_id):
+        """Keep tracking the order without an owner (e.g. a stopped bot could not delete it)"""
+        with self.lock:
+            order = self.orders.get(order_id)
+            if order:
+                order['owner'] = None
+
+    def claim(self, trading_pair, type, owner):
+        """Hand an open order without owner (found by the reconciliation) or its own revived order to a bot instance"""
+        with self.lock:
+            for order in self.orders.values():
+                if (order['owner'] in (None, owner)
+                        and order['trading_pair'] == trading_pair and order['type'] == type):
+                    order['owner'] = owner
+                    return order
+        return None
+
+    def is_active(self, order):
+        return order is not None and order['state'] != OrderState.REMOVED
+
+    def owned_order_ids(self, exclude_owner=None):
+        """Ids of all tracked orders with an owner (except one)"""
+        with self.lock:
+            return {
+                order_id for order_id, order in self.orders.items()
+                if order['owner'] is not None and order['owner'] != exclude_owner
+            }
+
+    def apply_snapshot(self, snapshot):
+        """Update the tracked orders of the snapshot's pair (OrderbookCache subscriber)"""
+        if snapshot.filters or snapshot.is_empty():
+            return  # gefilterte oder leere Bücher sagen nichts über das eigene Order aus
+        with self.lock:
+            orders = [order for order in self.orders.values() if order['trading_pair'] == snapshot.trading_pair]
+            for order in orders:
+                amount = snapshot.order_amount(order['order_id'])
+                if amount is not None:
+                    order['remaining'] = amount
+                    order['misses'] = 0
+                    partial = order['amount'] is not None and amount < order['amount'] - 1e-12
+                    self._set_state(order, OrderState.PARTIAL if partial else OrderState.VISIBLE)
+                elif snapshot.fetched_at < order['created_at']:
+                    continue  # Snapshot älter als das Order
+                elif (order['state'] == OrderState.CREATED
+                        and time.monotonic() - order['created_at'] < self.grace_seconds):
+                    continue  # noch nicht in der Orderbuch-Datenbank angekommen
+                elif order['state'] != OrderState.MISSING:
+                    order['misses'] += 1
+                    if order['misses'] >= self.missing_limit:
+                        # Nur markieren - entfernt wird das Order erst durch den API-Abgleich
+                        self._set_state(order, OrderState.MISSING, f"{order['misses']} Snapshots ohne das Order")
+                        self.last_reconcile = None
+
+    def reconcile_due(self):
+        return self.last_reconcile is None or time.monotonic() - self.last_reconcile >= self.reconcile_interval
+
+    def request_reconcile(self):
+        """Reconcile with the API at the next opportunity"""
+        self.last_reconcile = None
+
+    def reconcile(self, open_orders, requested_at):
+        """Compare with the open orders of the API (GET /orders sent at requested_at, monotonic)"""
+        with self.lock:
+            open_ids = set()
+            for api_order in open_orders:
+                order_id = api_order.get('order_id')
+                if not order_id:
+                    continue
+                open_ids.add(order_id)
+                if order_id in self.removed:
+                    removed_at, order = self.removed[order_id]
+                    if removed_at >= requested_at:
+                        continue  # während des Abrufs gelöscht
+                    # Laut API noch offen: die API ist maßgeblich, das Order wieder verfolgen
+                    del self.removed[order_id]
+                    self.orders[order_id] = order
+                    order['misses'] = 0
+                    self._set_state(order, OrderState.VISIBLE, "laut API noch offen")
+                    continue
+                order = self.orders.get(order_id)
+                if order is None:
+                    order = self._new_order(
+                        order_id, api_order.get('trading_pair'), api_order.get('type'),
+                        api_order.get('price'), None, None, OrderState.VISIBLE
+                    )
+                    self.orders[order_id] = order
+                    self.logger.info(f"Offenes Order ohne Bot gefunden: {order_id}")
+                elif order['state'] in (OrderState.CREATED, OrderState.MISSING):
+                    order['misses'] = 0
+                    self._set_state(order, OrderState.VISIBLE, "API")
+            for order in list(self.orders.values()):
+                # Orders, die während des Abrufs erstellt wurden, fehlen in der Antwort noch
+                if order['order_id'] not in open_ids and order['created_at'] < requested_at:
+                    self._set_state(order, OrderState.REMOVED, "nicht mehr offen laut API")
+            self.last_reconcile = time.monotonic()
+            self.removed = {
+                order_id: entry for order_id, entry in self.removed.items()
+                if self.last_reconcile - entry[0] < 2 * self.reconcile_interval
+            }
+
+    def release_orphans(self, owners):
+        """Release the orders whose owner is not one of owners (e.g. revived orders of a stopped bot)"""
+        with self.lock:
+            for order in self.orders.values():
+                if order['owner'] is not None and order['owner'] not in owners:
+                    self.logger.info(f"Order {order['order_id']}: Bot {order['owner']} läuft nicht mehr, Order freigegeben")
+                    order['owner'] = None
+
+    def get_orders(self):
+        with self.lock:
+            return [dict(order) for order in self.orders.values()]
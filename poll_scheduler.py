@@ -0,0 +1,192 @@
+import time
+
+
+class PollView:
+    """State of one database-backed view registered at the PollScheduler"""
+
+    def __init__(self, name, poll, watermark, base_interval, min_interval, max_interval, tab_frame,
+                 poll_with_watermark=False):
+        self.name = name
+        self.poll = poll
+        self.watermark = watermark
+        self.poll_with_watermark = poll_with_watermark
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.tab_frame = tab_frame
+        self.interval = base_interval
+        self.next_run = 0.0  # Run on the first tick
+        self.last_watermark = None
+        self.registered_at = time.monotonic()
+        self.paused_seconds = 0.0
+
+        # Statistics
+        self.polls = 0
+        self.skipped = 0
+        self.paused_ticks = 0
+
+
+class PollScheduler:
+    """
+    Shared Tk timer for all database-backed views.
+
+    - a cheap watermark query decides whether the full poll is needed
+    - unchanged watermark: the interval grows (backoff) up to max_interval
+    - changed watermark: the interval shrinks towards min_interval (burst)
+    - views on a hidden notebook tab or in a minimized window are paused
+    """
+
+    TICK_MS = 100
+    BACKOFF_FACTOR = 1.5
+    SPEEDUP_FACTOR = 0.5
+    STATS_LOG_INTERVAL = 600  # Sekunden
+
+    def __init__(self, root, logger, notebook=None):
+        self.root = root
+        self.logger = logger
+        self.notebook = notebook
+        self.views = {}
+        self.after_id = None
+        self.last_stats_log = time.monotonic()
+        self.last_tick = time.monotonic()
+
+        if self.notebook is not None:
+            self.notebook.bind('<<NotebookTabChanged>>', self.on_tab_changed, add='+')
+
+    def register(self, name, poll, base_interval, min_interval=None, max_interval=None,
+                 watermark=None, tab_frame=None, poll_with_watermark=False):
+        """
+        Register a view. Intervals are in milliseconds.
+        poll() does the full update, watermark() returns a cheap comparable change marker.
+        With poll_with_watermark the checked marker is passed on as poll(watermark).
+        """
+        self.views[name] = PollView(
+            name,
+            poll,
+            watermark,
+            base_interval / 1000.0,
+            (min_interval or base_interval) / 1000.0,
+            (max_interval or base_interval) / 1000.0,
+            tab_frame,
+            poll_with_watermark
+        )
+        self.logger.debug(f"Poll view registered: {name} ({base_interval} ms)")
+        self.start()
+
+    def unregister(self, name):
+        """Remove a view from the scheduler"""
+        view = self.views.pop(name, None)
+        if view:
+            self.log_view_stats(view)
+
+    def trigger(self, name):
+        """Poll a view on the next tick and reset it to the fast interval"""
+        view = self.views.get(name)
+        if view:
+            view.interval = view.min_interval
+            view.next_run = 0.0
+            view.last_watermark = None
+
+    def start(self):
+        """Start the shared timer"""
+        if self.after_id is None:
+            self.last_tick = time.monotonic()
+            self.after_id = self.root.after(self.TICK_MS, self.tick)
+
+    def stop(self):
+        """Stop the shared timer and log the statistics"""
+        if self.after_id is not None:
+            self.root.after_cancel(self.after_id)
+            self.after_id = None
+        for view in self.views.values():
+            self.log_view_stats(view)
+
+    def is_visible(self, view):
+        """Check if the view is currently visible to the user"""
+        try:
+            if self.root.state() == 'iconic':
+                return False
+            if view.tab_frame is not None and self.notebook is not None:
+                return self.notebook.select() == str(view.tab_frame)
+        except Exception:
+            return True
+        return True
+
+    def on_tab_changed(self, event=None):
+        """Poll the newly selected view right away instead of waiting for its interval"""
+        for view in self.views.values():
+            if view.tab_frame is not None and self.is_visible(view):
+                view.next_run = 0.0
+
+    def tick(self):
+        """Run all views that are due"""
+        now = time.monotonic()
+        elapsed = now - self.last_tick
+        self.last_tick = now
+
+        for view in list(self.views.values()):
+            if not self.is_visible(view):
+                view.paused_ticks += 1
+                view.paused_seconds += elapsed
+                continue
+            if now < view.next_run:
+                continue
+            try:
+                self.run_view(view)
+            except Exception as e:
+                self.logger.error(f"Error polling {view.name}: {str(e)}")
+            view.next_run = time.monotonic() + view.interval
+
+        if now - self.last_stats_log >= self.STATS_LOG_INTERVAL:
+            self.last_stats_log = now
+            for view in self.views.values():
+                self.log_view_stats(view)
+
+        self.after_id = self.root.after(self.TICK_MS, self.tick)
+
+    def run_view(self, view):
+        """Check the watermark and run the full poll only if the data has changed"""
+        watermark = None
+        if view.watermark is not None:
+            watermark = view.watermark()
+            if watermark is not None and watermark == view.last_watermark:
+                view.skipped += 1
+                view.interval = min(view.interval * self.BACKOFF_FACTOR, view.max_interval)
+                return
+            changed_before = view.last_watermark is not None
+            view.last_watermark = watermark
+            if changed_before:
+                # Data is moving: poll faster
+                view.interval = max(view.interval * self.SPEEDUP_FACTOR, view.min_interval)
+            else:
+                view.interval = view.base_interval
+
+        if view.poll_with_watermark:
+            view.poll(watermark)
+        else:
+            view.poll()
+        view.polls += 1
+
+    def get_stats(self):
+        """Get poll statistics per view, including the polls saved against the fixed interval"""
+        stats = {}
+        now = time.monotonic()
+        for name, view in self.views.items():
+            fixed_rate_polls = int((now - view.registered_at) / view.base_interval)
+            stats[name] = {
+                'polls': view.polls,
+                'skipped': view.skipped,
+                'paused_seconds': round(view.paused_seconds, 1),
+                'interval_ms': int(view.interval * 1000),
+                'saved': max(fixed_rate_polls - view.polls, 0)
+            }
+        return stats
+
+    def log_view_stats(self, view):
+        """Log the statistics of one view"""
+        fixed_rate_polls = int((time.monotonic() - view.registered_at) / view.base_interval)
+        self.logger.info(
+            f"Polling {view.name}: {view.polls} Abfragen, {view.skipped} übersprungen "
+            f"(Watermark unverändert), {view.paused_seconds:.0f}s pausiert, "
+            f"{max(fixed_rate_polls - view.polls, 0)} Abfragen eingespart"
+        )
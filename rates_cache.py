@@ -0,0 +1,88 @@
+import threading
+import time
+
+from constants import PollSettings, TradingPairs
+
+
+class RatesCache:
+    """
+    Shared cache of the Basic API rates (BalancesTab, RatesTab, EUR equivalents).
+
+    Rates younger than the TTL are served from the cache, so a refresh cycle or a manual
+    refresh click within the TTL costs no requests. Only one thread fetches at a time
+    (single flight): concurrent callers wait for its result instead of fetching again.
+    Only valid responses (with 'rate') are cached; if a fetch fails the last known rate is kept.
+    """
+
+    def __init__(self, api_client, logger, ttl=PollSettings.RATES_CACHE_TTL_SECONDS):
+        self.api_client = api_client
+        self.logger = logger
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.rates = {}  # trading_pair -> (fetched_at, response)
+        self.in_flight = None  # (Event, abgerufene Paare) des laufenden Abrufs
+
+    def set_api_client(self, api_client):
+        self.api_client = api_client
+        self.invalidate()
+
+    def _cached(self, trading_pairs):
+        return {pair: self.rates[pair][1] for pair in trading_pairs if pair in self.rates}
+
+    def get_all(self, trading_pairs=None, max_age=None):
+        """Rates of the trading pairs (default: all), fetching the missing and outdated ones"""
+        trading_pairs = list(trading_pairs or TradingPairs.get_all_pairs())
+        max_age = self.ttl if max_age is None else max_age
+        attempted = set()  # Paare, die ein anderer Thread für diesen Aufruf schon abgerufen hat
+
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                stale = [
+                    pair for pair in trading_pairs
+                    if pair not in attempted and (pair not in self.rates or now - self.rates[pair][0] > max_age)
+                ]
+                if not stale:
+                    return self._cached(trading_pairs)
+                if self.in_flight is None:
+                    event = threading.Event()
+                    self.in_flight = (event, stale)
+                    break
+                event, requested = self.in_flight
+
+            # Ein anderer Thread ruft bereits Kurse ab - auf dessen Ergebnis warten, danach nur die Paare
+            # holen, die er nicht abgerufen hat
+            if not event.wait(PollSettings.RATES_CACHE_FETCH_TIMEOUT_SECONDS):
+                with self.lock:
+                    return self._cached(trading_pairs)
+            attempted.update(requested)
+
+        try:
+            fetched = self.api_client.get_basic_rates_many(stale)
+            fetched_at = time.monotonic()
+            with self.lock:
+                for pair, response in fetched.items():
+                    if response and 'rate' in response:
+                        self.rates[pair] = (fetched_at, response)
+            missing = [pair for pair in stale if pair not in fetched]
+            if missing:
+                self.logger.warning(f"Keine neuen Kurse für {', '.join(missing)} - letzte bekannte Kurse werden verwendet")
+        except Exception as e:
+            self.logger.error(f"Error fetching rates: {str(e)}")
+        finally:
+            with self.lock:
+                self.in_flight = None
+            event.set()
+
+        with self.lock:
+            return self._cached(trading_pairs)
+
+    def peek(self, trading_pair):
+        """Cached response of a trading pair without fetching (any age)"""
+        with self.lock:
+            entry = self.rates.get(trading_pair)
+        return entry[1] if entry else None
+
+    def invalidate(self):
+        with self.lock:
+            self.rates.clear()
@@ -0,0 +1,77 @@
+import itertools
+import json
+import logging
+
+from constants import ResponseLogSettings
+
+
+class LazyJson:
+    """
+    Log argument that serializes its data only when the record is formatted, i.e. not at all
+    if no handler emits it. Pass it as a %s argument, not inside an f-string.
+    """
+
+    def __init__(self, data, max_chars=ResponseLogSettings.MAX_CHARS, pretty=False):
+        self.data = data
+        self.max_chars = max_chars
+        self.pretty = pretty
+
+    def __str__(self):
+        try:
+            text = json.dumps(self.data, indent=2 if self.pretty else None, ensure_ascii=False, default=str)
+        except (TypeError, ValueError):
+            text = repr(self.data)
+        if self.max_chars and len(text) > self.max_chars:
+            return f"{text[:self.max_chars]}... ({len(text) - self.max_chars} Zeichen gekürzt)"
+        return text
+
+
+def summarize(data):
+    """Short structured description of a response: scalars as they are, lists and dicts by size"""
+    if not isinstance(data, dict):
+        return type(data).__name__
+    parts = []
+    for key, value in data.items():
+        if isinstance(value, list):
+            parts.append(f"{key}={len(value)}")
+        elif isinstance(value, dict):
+            parts.append(f"{key}={{{len(value)}}}")
+        else:
+            parts.append(f"{key}={value}")
+    return ", ".join(parts)
+
+
+class ResponseLogger:
+    """
+    Logging of the API responses of a client.
+
+    Every response gets one structured line (status, duration, summary of the body).
+    The body itself is logged for every n-th response (starting with the first) at DEBUG,
+    truncated; responses with errors always get their (truncated) errors at WARNING. Full
+    pretty-printed bodies only with full_bodies (wire debug of the client). Serialization happens in the formatter (LazyJson),
+    so a level that is switched off costs nothing.
+    """
+
+    def __init__(self, logger, sample_every=ResponseLogSettings.SAMPLE_EVERY,
+                 max_chars=ResponseLogSettings.MAX_CHARS, full_bodies=False):
+        self.logger = logger
+        self.sample_every = sample_every
+        self.max_chars = max_chars
+        self.full_bodies = full_bodies
+        self.counter = itertools.count(1)  # next() ist unter dem GIL threadsicher
+
+    def log(self, method, path, status_code, data, elapsed_ms=None):
+        count = next(self.counter)
+        if self.logger.isEnabledFor(logging.INFO):
+            duration = f" in {elapsed_ms:.0f} ms" if elapsed_ms is not None else ""
+            self.logger.info(f"{method} {path}: {status_code}{duration} ({summarize(data)})")
+
+        errors = data.get('errors') if isinstance(data, dict) else None
+        if errors:
+            self.logger.warning("API-Fehler %s %s: %s", method, path, LazyJson(errors, self.max_chars))
+
+        if self.full_bodies:
+            self.logger.info("Response body: %s", LazyJson(data, max_chars=None, pretty=True))
+        elif (self.sample_every and (count - 1) % self.sample_every == 0
+                and self.logger.isEnabledFor(logging.DEBUG)):
+            self.logger.debug("Response body (Stichprobe): %s", LazyJson(data, self.max_chars))
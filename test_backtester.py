@@ -0,0 +1,75 @@
+"""
+Fill model of the backtester on a hand-built journal.
+
+Run with: python -m unittest test_backtester
+"""
+import unittest
+
+from backtester import ADD, REMOVE, SNAPSHOT, Backtest, BacktestParams
+
+# Kaufen zu genau 100: das eigene Order wird beim ersten Durchlauf (t=1) gesetzt und danach
+# nicht mehr verschoben (sehr lange Intervalle und Entprellzeit, keine Latenz)
+PARAMS = dict(trade_type='buy', amount=1.0, min_price=100, max_price=100, check_interval=10 ** 6,
+              order_interval=10 ** 6, debounce_ms=10 ** 12, latency_ms=0, fee_rate=0.0)
+
+JOURNAL = [
+    (0, SNAPSHOT, None, None, 0.0, 0.0),
+    (1, ADD, 'ahead', 'bids', 101.0, 0.4),  # besserer Preis: vor dem eigenen Order
+    (2, ADD, 'behind-1', 'bids', 99.0, 0.5),  # schlechterer Preis: hinter dem eigenen Order
+    (3, REMOVE, 'behind-1', 'bids', 99.0, 0.5),  # 'ahead' ist noch da -> gelöscht, nicht ausgeführt
+    (4, REMOVE, 'ahead', 'bids', 101.0, 0.4),  # das eigene Order rückt an die Spitze
+    (5, ADD, 'behind-2', 'bids', 99.0, 0.3),
+    (6, REMOVE, 'behind-2', 'bids', 99.0, 0.3),  # eigenes Order an der Spitze -> Ausführung 0.3
+    (7, ADD, 'ask', 'asks', 102.0, 1.0),  # beliebiges Ereignis, damit der letzte Zustand gemessen wird
+]
+
+
+def replay(count):
+    """Backtest after the first count events of the journal"""
+    backtest = Backtest(BacktestParams(**PARAMS))
+    backtest.run(JOURNAL[:count])
+    return backtest
+
+
+class FillModelTest(unittest.TestCase):
+
+    def test_queue_position_behind_better_order(self):
+        backtest = replay(3)
+        self.assertEqual(backtest.own_price, 100)
+        self.assertEqual(backtest.own_index(), 1)
+        self.assertAlmostEqual(backtest.own_ahead, 0.4)
+
+    def test_removal_behind_with_orders_ahead_is_no_fill(self):
+        backtest = replay(4)
+        self.assertEqual(backtest.fills, [])
+        self.assertAlmostEqual(backtest.own_remaining, 1.0)
+        self.assertEqual(backtest.own_index(), 1)
+        self.assertAlmostEqual(backtest.own_ahead, 0.4)
+
+    def test_order_ahead_removed_moves_own_order_to_top(self):
+        backtest = replay(5)
+        self.assertEqual(backtest.fills, [])
+        self.assertEqual(backtest.own_index(), 0)
+        self.assertAlmostEqual(backtest.own_ahead, 0.0)
+
+    def test_removal_behind_top_of_queue_is_fill(self):
+        backtest = replay(len(JOURNAL))
+        self.assertEqual(len(backtest.fills), 1)
+        ts, price, amount = backtest.fills[0]
+        self.assertEqual((ts, price), (6, 100))
+        self.assertAlmostEqual(amount, 0.3)
+        self.assertAlmostEqual(backtest.own_remaining, 0.7)
+        self.assertEqual(backtest.own_index(), 0)
+
+    def test_report(self):
+        report = Backtest(BacktestParams(**PARAMS)).run(JOURNAL)
+        self.assertEqual(report['fills'], 1)
+        self.assertAlmostEqual(report['filled_amount'], 0.3)
+        self.assertEqual(report['avg_fill_price'], 100)
+        # Zeitgewichtete Warteschlange: t=1..4 hinter einem Order, t=4..7 an der Spitze
+        self.assertAlmostEqual(report['top_share'], 0.5)
+        self.assertAlmostEqual(report['avg_queue_orders'], 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
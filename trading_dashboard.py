@@ -11,6 +11,13 @@ from constants import TradingPairs
 from credentials_manager import CredentialsManager 
 from database_manager import DatabaseManager  
 from sqlite_database_manager import SQLiteDatabaseManager
+from poll_scheduler import PollScheduler
+from rates_cache import RatesCache
+from orderbook_cache import OrderbookCache
+from orderbook_mirror import OrderbookMirror
+from bot_engine import BotEngine
+from circuit_breaker import CircuitBreaker
+from constants import OrderbookSettings, ApiBudgetSettings
 import os
 
 class TradingDashboard:
@@ -38,6 +45,14 @@ class TradingDashboard:
             self.orderbook_tab.stop_auto_updates()
         if hasattr(self, 'rates_tab'):
             self.rates_tab.stop_auto_updates()
+        if hasattr(self, 'trade_bot_tab'):
+            self.trade_bot_tab.stop()
+        if hasattr(self, 'bot_engine'):
+            self.bot_engine.shutdown()
+        if hasattr(self, 'poll_scheduler'):
+            self.poll_scheduler.stop()
+        if getattr(self, 'orderbook_mirror', None):
+            self.orderbook_mirror.stop()
         self.root.quit()  # Stop the main loop
         self.root.destroy()  # Destroy the main window
 
@@ -81,6 +96,8 @@ class TradingDashboard:
             api_basic=self.api_basic_var.get(),
             logger=self.logger
         )
+        # Gemeinsamer Kurs-Cache: ein Abruf für Kontostände und Kurse-Tab
+        self.rates_cache = RatesCache(self.api_client, self.logger)
 
         # Initialize database manager if config exists
         self.loading.update_progress(30, "Initialisiere Databank...")
@@ -128,15 +145,26 @@ class TradingDashboard:
 
         # Initialize tab components
         self.loading.update_progress(40, "Initialisierung Interface Komponenten...")
-        self.balances_tab = BalancesTab(self.balances_frame, self.logger)
+        self.balances_tab = BalancesTab(self.balances_frame, self.logger, self.rates_cache)
         self.balances_tab.set_update_callback(self.update_balances_only)
-        self.rates_tab = RatesTab(self.rates_frame, self.logger, self.db_manager) 
+        # Shared adaptive polling for all database-backed views
+        self.poll_scheduler = PollScheduler(self.root, self.logger, self.notebook)
+        # Optional local read-mirror of the orderbook for slow database connections
+        self.orderbook_mirror = None
+        if OrderbookSettings.MIRROR_ENABLED and self.db_manager:
+            self.orderbook_mirror = OrderbookMirror(self.db_manager, self.logger)
+            self.orderbook_mirror.start()
+        # One orderbook cache for the orderbook view and the trade bot
+        self.orderbook_cache = OrderbookCache(self.db_manager, self.logger, mirror=self.orderbook_mirror)
+        self.rates_tab = RatesTab(self.rates_frame, self.logger, self.db_manager, self.poll_scheduler) 
         self.rates_tab.set_update_callback(self.update_rates_only)
         self.orderbook_tab = OrderbookTab(
             parent=self.orderbook_frame,
             logger=self.logger,
             db_manager=self.db_manager,
-            api_client=self.api_client    
+            api_client=self.api_client,
+            poll_scheduler=self.poll_scheduler,
+            orderbook_cache=self.orderbook_cache
         )
         # initialize Trading Tab
         self.trading_tab = TradingTab(  
@@ -162,12 +190,17 @@ class TradingDashboard:
             self.save_credentials
         )
 
+        # Shared engine for all trade bot instances (one scheduler, one API client, one orderbook cache)
+        self.bot_engine = BotEngine(self.api_client, self.orderbook_cache, logging.getLogger("TradeBotLogger"))
+
         # TradeBotTab initialisieren
         self.trade_bot_tab = TradeBotTab(
             parent=self.trade_bot_frame,
             logger=self.logger,
             api_client=self.api_client,
-            db_manager=self.db_manager
+            db_manager=self.db_manager,
+            orderbook_cache=self.orderbook_cache,
+            bot_engine=self.bot_engine
         )
 
         # Add refresh button (only for non-orderbook data)
@@ -191,6 +224,11 @@ class TradingDashboard:
         )
         self.theme_switcher.grid(row=1, column=0, padx=10, pady=10, sticky='e')
 
+        # Verbleibende API-Credits (gemeinsames Budget aller API-Aufrufe)
+        self.credits_label = ttk.Label(self.main_container, text="API-Credits: -")
+        self.credits_label.grid(row=1, column=0, pady=10)
+        self.update_credits_label()
+
         # Configure grid weights
         self.root.grid_rowconfigure(0, weight=1)
         self.root.grid_columnconfigure(0, weight=1)
@@ -205,6 +243,23 @@ class TradingDashboard:
         # Finish loading screen after all initializations
         self.loading.finish()
     
+    def update_credits_label(self):
+        """Show the remaining API credits, the waiting calls and an API outage"""
+        try:
+            status = self.api_client.get_budget_status()
+            text = f"API-Credits: {status['credits']:.0f}/{status['capacity']}"
+            if status['waiting']:
+                text += f" ({status['waiting']} wartend)"
+            if status['deferred']:
+                text += f", {status['deferred']} zurückgestellt"
+            breaker = self.api_client.get_breaker_status()
+            if breaker['state'] != CircuitBreaker.CLOSED:
+                text += f" - API {CircuitBreaker.LABELS[breaker['state']]}"
+            self.credits_label.config(text=text)
+        except Exception as e:
+            self.logger.error(f"Error updating API credits: {str(e)}")
+        self.root.after(ApiBudgetSettings.STATUS_REFRESH_MS, self.update_credits_label)
+
     def toggle_theme(self):
         if self.theme_var.get():
             self.root.style.theme_use("darkly")
@@ -290,6 +345,8 @@ class TradingDashboard:
                 api_basic=api_basic,
                 logger=self.logger
             )
+            self.trade_bot_tab.set_api_client(self.api_client)
+            self.rates_cache.set_api_client(self.api_client)
             
             # Update or initialize database manager
             try:
@@ -319,14 +376,7 @@ class TradingDashboard:
             
             # First collect all rates
             if self.api_basic_var.get():
-                rates_data = {}
-                for pair in TradingPairs.get_all_pairs():
-                    try:
-                        response = self.api_client.get_basic_rates(pair)
-                        if response and 'rate' in response:
-                            rates_data[pair] = response
-                    except Exception as e:
-                        self.logger.error(f"Failed to fetch rates for {pair}: {str(e)}")
+                rates_data = self.rates_cache.get_all(TradingPairs.get_all_pairs())
                 
                 # Update rates in balances tab first
                 self.loading.update_progress(75, "verarbeite Account information...")
@@ -337,7 +387,7 @@ class TradingDashboard:
             self.loading.update_progress(95, "Lade Kontostände...")
             self.balances_tab.update_balances(account_data)
             
-            # Update rates display
+            # Update rates display (Kurse kommen aus dem Cache, kein zweiter Abruf)
             self.update_rates_only()
             
             self.logger.info("Account data refresh completed")
@@ -373,15 +423,12 @@ class TradingDashboard:
         try:
             # Refresh rates
             self.logger.debug("Fetching rates...")
+            rates_data = self.rates_cache.get_all(TradingPairs.get_all_pairs())
             self.rates_tab.clear_rates()
             for pair in TradingPairs.get_all_pairs():
-                try:
-                    response = self.api_client.get_basic_rates(pair)
-                    if response and 'rate' in response:
-                        response['trading_pair'] = pair
-                        self.rates_tab.update_rates(response)
-                except Exception as e:
-                    self.logger.error(f"Failed to fetch rates for {pair}: {str(e)}")
+                response = rates_data.get(pair)
+                if response and 'rate' in response:
+                    self.rates_tab.update_rates(dict(response, trading_pair=pair))
             self.logger.info("Rates updated successfully")
             
             # Update window title with last refresh time
@@ -8,11 +8,13 @@ from pathlib import Path
 import json  
 import logging
 import datetime 
+from response_log import LazyJson
 
 class BalancesTab:
-    def __init__(self, parent, logger):
+    def __init__(self, parent, logger, rates_cache=None):
         self.parent = parent
         self.logger = logger
+        self.rates_cache = rates_cache  # gemeinsamer Kurs-Cache (RatesCache)
         self.setup_ui()
         self.rates = {}  # Store current rates
         self.update_callback = None  # Add callback storage
@@ -120,7 +122,7 @@ class BalancesTab:
         """Update stored rates"""
         try:
             self.rates = rates_data
-            self.logger.debug(f"Updated rates: {json.dumps(rates_data, indent=2)}")
+            self.logger.debug("Updated rates: %s", LazyJson(rates_data))
         except Exception as e:
             self.logger.error(f"Error updating rates: {str(e)}")
     
@@ -131,8 +133,9 @@ class BalancesTab:
                 return float(amount)
     
             rate_key = f"{currency.lower()}eur"
-            if rate_key in self.rates:
-                rate = self.rates[rate_key].get('rate', {}).get('rate_weighted')
+            rates = self.rates_cache.peek(rate_key) if self.rates_cache else self.rates.get(rate_key)
+            if rates:
+                rate = rates.get('rate', {}).get('rate_weighted')
                 if rate and rate != 'N/A':
                     return float(amount) * float(rate)
                 return 0
@@ -189,15 +192,18 @@ from datetime import datetime
 import numpy as np
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import matplotlib.pyplot as plt
+from constants import PollSettings
 
 class RatesTab:
-    def __init__(self, parent, logger, db_manager):
+    def __init__(self, parent, logger, db_manager, poll_scheduler=None):
         self.parent = parent
         self.logger = logger
         self.db_manager = db_manager
+        self.poll_scheduler = poll_scheduler
         self.rates_data = {}  # Add this to store rates
         self.analysis_data = {}  # Add this to store analysis data
         self.gauges = {}  # Store gauges for each trading pair
+        self.analysis_cache = {}  # interval -> (watermark, data)
         self.selected_interval = StringVar(value='Halber Tag')  # Default interval
         self.interval_mapping = {
             'Halber Tag': '30m',
@@ -206,8 +212,20 @@ class RatesTab:
             'Monat': '24h'
         }
         self.setup_ui()
-        self.update_analysis_data()  # Initial data load
-        self.schedule_updates()  # Schedule periodic updates
+        if self.poll_scheduler:
+            # Initial load happens on the first scheduler tick
+            self.poll_scheduler.register(
+                'rates',
+                self.update_analysis_data,
+                PollSettings.RATES_BASE_MS,
+                PollSettings.RATES_MIN_MS,
+                PollSettings.RATES_MAX_MS,
+                watermark=self.get_analysis_watermark,
+                tab_frame=self.parent,
+                poll_with_watermark=True
+            )
+        else:
+            self.schedule_updates()  # Initial data load and periodic updates
 
     def show_info_message(self, title, message):
         icon_path = os.path.join(os.path.dirname(__file__), 'bitcoin.ico')
@@ -377,17 +395,36 @@ class RatesTab:
         # Redraw the canvas
         ax.figure.canvas.draw()
 
-    def update_analysis_data(self):
-        """Update analysis data for all trading pairs"""
+    def update_analysis_data(self, checked_watermark=None):
+        """Update analysis data for all trading pairs (checked_watermark: (interval, watermark) of the scheduler check)"""
         if not self.db_manager:
             self.logger.warning("Database manager is not initialized. Skipping analysis data retrieval.")
             return
 
         interval_display = self.selected_interval.get()  # Get the selected interval display value
         interval = self.interval_mapping[interval_display]  # Map to the actual interval value
+
+        # Use the watermark the poll scheduler just fetched, otherwise ask the database
+        if checked_watermark and checked_watermark[0] == interval:
+            watermark = checked_watermark[1]
+        else:
+            watermark = self.db_manager.get_analysis_watermark(interval)
+
+        cached = self.analysis_cache.get(interval)
+        if cached and watermark is not None and cached[0] == watermark:
+            self.render_analysis_data(cached[1])
+            return
+
+        data, watermark = self.db_manager.get_analysis_data_bulk(interval)
+        if watermark is not None:
+            self.analysis_cache[interval] = (watermark, data)
+        self.render_analysis_data(data)
+
+    def render_analysis_data(self, analysis_data):
+        """Show the analysis data (trading_pair -> indicator dict) in the labels and gauges"""
         trading_pairs = ['btceur', 'bcheur', 'etheur', 'soleur', 'xrpeur', 'ltceur', 'dogeeur', 'btgeur', 'trxeur', 'usdceur']
         for pair in trading_pairs:
-            data = self.db_manager.get_analysis_data(pair, interval)  # Pass the interval to the database manager
+            data = analysis_data.get(pair)
             if data:
                 self.analysis_data[pair]['rsi_value'].configure(text=f"{data['rsi_value']:.2f}" if data['rsi_value'] is not None else "N/A")
                 self.analysis_data[pair]['bb_sma'].configure(text=f"{data['bb_sma']:.2f}" if data['bb_sma'] is not None else "N/A")
@@ -401,15 +438,29 @@ class RatesTab:
                 self.analysis_data[pair]['score'].configure(text="N/A")
                 self.update_gauge(pair, 0)
 
+    def get_analysis_watermark(self):
+        """Change marker of the analysis tables for the selected interval"""
+        if not self.db_manager:
+            return None
+        interval = self.interval_mapping[self.selected_interval.get()]
+        return (interval, self.db_manager.get_analysis_watermark(interval))
+
     def on_interval_changed(self, event):
         """Handle interval change event"""
-        self.update_analysis_data()
+        interval = self.interval_mapping[self.selected_interval.get()]
+        cached = self.analysis_cache.get(interval)
+        if cached:
+            # Show the cached values right away, the scheduler checks if they are still current
+            self.render_analysis_data(cached[1])
+        if self.poll_scheduler:
+            self.poll_scheduler.trigger('rates')
+        else:
+            self.update_analysis_data()
 
     def schedule_updates(self):
         """Schedule periodic updates for analysis data"""
         self.update_analysis_data()
-        update_interval_minutes = 5  # Set the update interval in minutes
-        self.parent.after(update_interval_minutes * 60 * 1000, self.schedule_updates)  # Convert minutes to milliseconds
+        self.after_id = self.parent.after(PollSettings.RATES_BASE_MS, self.schedule_updates)
     
     def set_update_callback(self, callback):
         """Set the callback function for the update button"""
@@ -470,6 +521,8 @@ class RatesTab:
         
     def stop_auto_updates(self):
         """Stop automatic updates"""
+        if self.poll_scheduler:
+            self.poll_scheduler.unregister('rates')
         if hasattr(self, 'after_id'):
             self.parent.after_cancel(self.after_id)
         
@@ -482,12 +535,92 @@ from datetime import datetime, timedelta
 from decimal import Decimal, InvalidOperation
 import threading
 import time
+from constants import OrderbookSettings, PollSettings
+from orderbook_data import book_side_to_arrays, aggregate_price_levels, DepthBook
+from orderbook_cache import OrderbookCache, filters_key
+from constants import TradingConstants
+import heapq
+
+class TreeHighlighter:
+    """
+    Flash highlights for the rows of one treeview.
+    Expiry times are kept in a heap and all expired highlights are cleared in one tick,
+    instead of scheduling one after() callback per row.
+    """
+
+    TAGS = {
+        'green': ('flash_green', '#90EE90'),  # Light green
+        'red': ('flash_red', '#FFB6C1')       # Light red
+    }
+    TICK_MS = 100
+
+    def __init__(self, tree, duration_ms):
+        self.tree = tree
+        self.duration = duration_ms / 1000.0
+        self.heap = []  # (expiry, item)
+        self.active = {}  # item -> (expiry, remove, original_tags)
+        self.after_id = None
+
+        # Tags are configured once per tree
+        for tag, background in self.TAGS.values():
+            tree.tag_configure(tag, background=background)
+
+    def highlight(self, item, color, remove=False):
+        """Highlight a row; with remove=True the row is deleted when the highlight expires"""
+        original_tags = self.active[item][2] if item in self.active else self.tree.item(item, 'tags')
+        self.tree.item(item, tags=(self.TAGS[color][0],))
+        expiry = time.monotonic() + self.duration
+        self.active[item] = (expiry, remove, original_tags)
+        heapq.heappush(self.heap, (expiry, item))
+        if self.after_id is None:
+            self.after_id = self.tree.after(self.TICK_MS, self.tick)
+
+    def is_pending_removal(self, item):
+        """Check if the row is a removed order that is only shown for its flash"""
+        entry = self.active.get(item)
+        return bool(entry and entry[1])
+
+    def forget(self, item):
+        """Stop tracking a row that was deleted elsewhere"""
+        self.active.pop(item, None)
+
+    def clear(self):
+        """Drop all highlights (e.g. when the tree is rebuilt)"""
+        if self.after_id is not None:
+            self.tree.after_cancel(self.after_id)
+            self.after_id = None
+        self.heap.clear()
+        self.active.clear()
+
+    def tick(self):
+        """Clear all expired highlights at once"""
+        now = time.monotonic()
+        while self.heap and self.heap[0][0] <= now:
+            expiry, item = heapq.heappop(self.heap)
+            entry = self.active.get(item)
+            if not entry or entry[0] != expiry:
+                continue  # Row was re-highlighted or forgotten in the meantime
+            del self.active[item]
+            if not self.tree.exists(item):
+                continue
+            if entry[1]:
+                self.tree.delete(item)
+            else:
+                self.tree.item(item, tags=entry[2])
+
+        # Only keep the timer running while highlights are active
+        if self.heap:
+            self.after_id = self.tree.after(self.TICK_MS, self.tick)
+        else:
+            self.after_id = None
 
 class OrderbookTab:
-    def __init__(self, parent, logger, db_manager=None, trading_tab=None, api_client=None):  # Added db_manager parameter with default None
+    def __init__(self, parent, logger, db_manager=None, trading_tab=None, api_client=None, poll_scheduler=None, orderbook_cache=None):  # Added db_manager parameter with default None
         self.parent = parent
         self.logger = logger
         self.db_manager = db_manager
+        self.poll_scheduler = poll_scheduler
+        self.orderbook_cache = orderbook_cache or OrderbookCache(db_manager, logger)
         self.selected_pair = tk.StringVar(value="Bitcoin (BTC/EUR)")  # Default value
         self.trading_tab = trading_tab  # Store reference to trading tab
         self.api_client = api_client
@@ -495,17 +628,26 @@ class OrderbookTab:
         # Add variables to track previous counts
         self.previous_ask_count = 0
         self.previous_bid_count = 0
-        self.update_interval = 500  # Update every 1/2 second
+        self.update_interval = PollSettings.ORDERBOOK_BASE_MS  # Update every 1/2 second
+        self.aggregation_var = tk.StringVar(value=OrderbookSettings.AGGREGATION_NONE)
+        self.level_orders = {}  # Tree item -> Einzelorders der Preisstufe (Drill-down)
+        self.filter_trust_level = tk.StringVar(value=OrderbookSettings.FILTER_ALL)
+        self.filter_payment = tk.StringVar(value=OrderbookSettings.FILTER_ALL)
+        self.filter_country = tk.StringVar(value=OrderbookSettings.FILTER_ALL)
+        self.filter_kyc_full = tk.BooleanVar(value=False)
         if self.db_manager:  # Only start auto-updates if db_manager exists
             self.start_auto_updates()
 
         self.current_pair = None  # Add this to track the current pair
         self.previous_orders = {'asks': set(), 'bids': set()}  # Store previous orders
         self.flash_duration = 500  # Duration of flash effect in milliseconds
+        self.depth_book = DepthBook()  # Price levels for the depth chart
+        self.depth_version_drawn = -1
 
         self.setup_ui()
         self.create_context_menu()
         self.order_ids = {}
+        self.schedule_depth_redraw()
 
     def show_info_message(self, title, message):
         icon_path = os.path.join(os.path.dirname(__file__), 'bitcoin.ico')
@@ -560,27 +702,112 @@ class OrderbookTab:
         
         # Bind the combobox selection event
         self.pair_combobox.bind('<<ComboboxSelected>>', self.on_pair_changed)
-       
+
+        # Add aggregation selector (Preisstufen)
+        ttk.Label(selector_frame, text="Preisstufen:").grid(row=0, column=2, padx=5, pady=5)
+        self.aggregation_combobox = ttk.Combobox(
+            selector_frame,
+            textvariable=self.aggregation_var,
+            values=list(OrderbookSettings.AGGREGATION_MODES.keys()),
+            state='readonly',
+            width=14
+        )
+        self.aggregation_combobox.grid(row=0, column=3, padx=5, pady=5)
+        self.aggregation_combobox.bind('<<ComboboxSelected>>', self.on_aggregation_changed)
+
+        # Staleness of the local orderbook mirror (only shown when the mirror is used)
+        self.mirror_status_label = ttk.Label(selector_frame, text="")
+        self.mirror_status_label.grid(row=0, column=4, padx=5, pady=5)
+
+        # Filters: only show orders that can be traded with the own account
+        filter_frame = ttk.Frame(selector_frame)
+        filter_frame.grid(row=1, column=0, columnspan=4, sticky='w')
+
+        ttk.Label(filter_frame, text="Mein Trust-Level:").grid(row=0, column=0, padx=5, pady=5)
+        self.filter_trust_combobox = ttk.Combobox(
+            filter_frame,
+            textvariable=self.filter_trust_level,
+            values=[OrderbookSettings.FILTER_ALL] + OrderbookSettings.TRUST_LEVEL_ORDER,
+            state='readonly',
+            width=10
+        )
+        self.filter_trust_combobox.grid(row=0, column=1, padx=5, pady=5)
+
+        ttk.Label(filter_frame, text="Zahlungsart:").grid(row=0, column=2, padx=5, pady=5)
+        self.filter_payment_combobox = ttk.Combobox(
+            filter_frame,
+            textvariable=self.filter_payment,
+            values=[OrderbookSettings.FILTER_ALL] + list(OrderbookSettings.FILTER_PAYMENT_OPTIONS.keys()),
+            state='readonly',
+            width=10
+        )
+        self.filter_payment_combobox.grid(row=0, column=3, padx=5, pady=5)
+
+        ttk.Label(filter_frame, text="Bankland:").grid(row=0, column=4, padx=5, pady=5)
+        self.filter_country_combobox = ttk.Combobox(
+            filter_frame,
+            textvariable=self.filter_country,
+            values=[OrderbookSettings.FILTER_ALL] + [country.value for country in TradingConstants.BankCountry],
+            state='readonly',
+            width=6
+        )
+        self.filter_country_combobox.grid(row=0, column=5, padx=5, pady=5)
+
+        ttk.Checkbutton(
+            filter_frame,
+            text="Nur voll identifiziert (KYC)",
+            variable=self.filter_kyc_full,
+            command=self.on_filter_changed
+        ).grid(row=0, column=6, padx=5, pady=5)
+
+        for combobox in (self.filter_trust_combobox, self.filter_payment_combobox, self.filter_country_combobox):
+            combobox.bind('<<ComboboxSelected>>', self.on_filter_changed)
+
         # Store the mapping of display names to API values
         self.pair_mapping = {pair[0]: pair[1] for pair in self.pairs}
-    
+
         # Create frames for asks and bids
         self.asks_frame = ttk.LabelFrame(main_frame, text="Verkäufe (Sell Orders)")
         self.bids_frame = ttk.LabelFrame(main_frame, text="Kaufaufträge (Buy Orders)")
-        
+
         # Position frames (asks left, bids right)
         self.asks_frame.grid(row=1, column=0, padx=5, pady=5, sticky='nsew')
         self.bids_frame.grid(row=1, column=1, padx=5, pady=5, sticky='nsew')
-    
+
         # Create Treeviews
-        columns = ('Kurs', 'Volumen', 'Total Preis')
-        
+        # Order ID and min Volumen are hidden values used by the context menu,
+        # Anzahl and Kumuliert are only displayed in the aggregated view
+        columns = ('Kurs', 'Volumen', 'Total Preis', 'Order ID', 'min Volumen', 'Anzahl', 'Kumuliert')
+        self.raw_display_columns = ('Kurs', 'Volumen', 'Total Preis')
+        self.aggregated_display_columns = ('Kurs', 'Volumen', 'Anzahl', 'Kumuliert')
+
         self.asks_tree = self.create_treeview(self.asks_frame, columns)
         self.bids_tree = self.create_treeview(self.bids_frame, columns)
+        self.highlighters = {
+            self.asks_tree: TreeHighlighter(self.asks_tree, self.flash_duration),
+            self.bids_tree: TreeHighlighter(self.bids_tree, self.flash_duration)
+        }
 
         # Bind the context menu to the Treeviews
         self.asks_tree.bind('<Button-3>', self.show_context_menu)
         self.bids_tree.bind('<Button-3>', self.show_context_menu)
+
+        # Double click on an aggregated level shows the single orders
+        self.asks_tree.bind('<Double-1>', self.show_level_orders)
+        self.bids_tree.bind('<Double-1>', self.show_level_orders)
+
+        # Create depth chart (cumulative bid/ask curves)
+        depth_frame = ttk.LabelFrame(main_frame, text="Markttiefe (kumuliert)")
+        depth_frame.grid(row=2, column=0, columnspan=2, padx=5, pady=5, sticky='nsew')
+        self.depth_canvas = tk.Canvas(depth_frame, height=140, highlightthickness=0)
+        self.depth_canvas.pack(fill='both', expand=True)
+        self.depth_lines = {
+            'bids': self.depth_canvas.create_line(0, 0, 0, 0, fill='#28a745', width=2),
+            'asks': self.depth_canvas.create_line(0, 0, 0, 0, fill='#dc3545', width=2)
+        }
+        self.depth_text = self.depth_canvas.create_text(5, 5, anchor='nw', text="", font=("Helvetica", 8))
+        # Redraw on the next tick after a resize
+        self.depth_canvas.bind('<Configure>', lambda event: setattr(self, 'depth_version_drawn', -1))
     
         # Configure grid weights
         main_frame.columnconfigure(0, weight=1)
@@ -622,10 +849,19 @@ class OrderbookTab:
         # Create "min Kaufen mit Zahlungsmethode" menu item
         self.order_submenu.add_cascade(label="min Kaufen mit Zahlungsmethode", menu=self.min_buy_submenu)
         self.buy_with_min_payment_item_index = self.order_submenu.index("end")
-    
+
+        # Context menu for aggregated price levels
+        self.level_context_menu = tk.Menu(self.parent, tearoff=0)
+        self.level_context_menu.add_command(label="Einzelorders anzeigen", command=lambda: self.show_level_orders())
+
     def show_context_menu(self, event):
         tree = event.widget
         item = tree.identify_row(event.y)
+        if item and self.is_aggregated():
+            # Orders can only be taken from the single order view
+            self.selected_level = (tree, item)
+            self.level_context_menu.post(event.x_root, event.y_root)
+            return
         if item:
             self.selected_order = tree.item(item, 'values')
             self.selected_order_id = self.order_ids.get(item)  # Retrieve the hidden order_id
@@ -716,7 +952,8 @@ class OrderbookTab:
 
         # Create treeview
         tree = ttk.Treeview(frame, columns=columns, show='headings', height=28)
-        
+        tree.configure(displaycolumns=self.raw_display_columns)
+
         # Set column headings
         for col in columns:
             tree.heading(col, text=col)
@@ -746,7 +983,125 @@ class OrderbookTab:
         """Handle trading pair change"""
         if self.db_manager:
             self.update_from_database()
- 
+            if self.poll_scheduler:
+                self.poll_scheduler.trigger('orderbook')
+
+    def get_aggregation(self):
+        """Get (tick, relative) for the selected aggregation or None for single orders"""
+        return OrderbookSettings.AGGREGATION_MODES.get(self.aggregation_var.get())
+
+    def is_aggregated(self):
+        """Check if the orderbook is shown as aggregated price levels"""
+        return self.get_aggregation() is not None
+
+    def on_aggregation_changed(self, *args):
+        """Switch between single orders and aggregated price levels"""
+        display_columns = self.aggregated_display_columns if self.is_aggregated() else self.raw_display_columns
+        for tree in (self.asks_tree, self.bids_tree):
+            tree.configure(displaycolumns=display_columns)
+            self.highlighters[tree].clear()
+            tree.delete(*tree.get_children())
+        self.level_orders.clear()
+        if self.db_manager:
+            self.update_from_database()
+
+    def get_filters(self):
+        """Get the orderbook filters for DatabaseManager.get_orderbook() or None if nothing is filtered"""
+        filters = {}
+        trust_level = self.filter_trust_level.get()
+        if trust_level in OrderbookSettings.TRUST_LEVEL_ORDER:
+            # Orders requiring the own trust level or a lower one
+            index = OrderbookSettings.TRUST_LEVEL_ORDER.index(trust_level)
+            filters['trust_levels'] = OrderbookSettings.TRUST_LEVEL_ORDER[:index + 1]
+        payment = self.filter_payment.get()
+        if payment in OrderbookSettings.FILTER_PAYMENT_OPTIONS:
+            filters['payment_options'] = OrderbookSettings.FILTER_PAYMENT_OPTIONS[payment]
+        country = self.filter_country.get()
+        if country != OrderbookSettings.FILTER_ALL:
+            filters['seat_of_bank'] = [country]
+        if self.filter_kyc_full.get():
+            filters['kyc_full'] = True
+        return filters or None
+
+    def on_filter_changed(self, *args):
+        """Reload the orderbook with the new filters"""
+        for tree in (self.asks_tree, self.bids_tree):
+            self.highlighters[tree].clear()
+            tree.delete(*tree.get_children())
+        self.level_orders.clear()
+        self.order_ids.clear()
+        self.previous_orders = {'asks': set(), 'bids': set()}
+        self.depth_book.reset()
+        if self.db_manager:
+            self.update_from_database()
+            if self.poll_scheduler:
+                self.poll_scheduler.trigger('orderbook')
+
+    def show_level_orders(self, event=None):
+        """Show the single orders of an aggregated price level (drill-down)"""
+        if not self.is_aggregated():
+            return
+        if event is not None:
+            tree = event.widget
+            item = tree.identify_row(event.y)
+        else:
+            tree, item = getattr(self, 'selected_level', (None, None))
+        orders = self.level_orders.get(item)
+        if not orders:
+            return
+
+        currency_symbol = self.get_selected_currency_symbol()
+        level_window = tk.Toplevel(self.parent)
+        level_window.title(f"Einzelorders {tree.item(item, 'values')[0]}")
+
+        columns = ('Kurs', 'Volumen', 'Total Preis', 'Order ID')
+        level_tree = ttk.Treeview(level_window, columns=columns, show='headings', height=15)
+        for col in columns:
+            level_tree.heading(col, text=col)
+            level_tree.column(col, width=170, anchor='center')
+        for price, amount, min_amount, order_id in orders:
+            level_tree.insert('', 'end', values=(
+                f"{float(price):,.2f} €",
+                f"{float(amount):.8f} {currency_symbol}",
+                f"{float(price) * float(amount):,.2f} €",
+                order_id
+            ))
+
+        scrollbar = ttk.Scrollbar(level_window, orient=tk.VERTICAL, command=level_tree.yview)
+        level_tree.configure(yscrollcommand=scrollbar.set)
+        level_tree.grid(row=0, column=0, sticky='nsew')
+        scrollbar.grid(row=0, column=1, sticky='ns')
+        level_window.columnconfigure(0, weight=1)
+        level_window.rowconfigure(0, weight=1)
+
+    def update_aggregated_side(self, tree, orders, side, currency_symbol):
+        """Render one side of the orderbook as aggregated price levels"""
+        tick, relative = self.get_aggregation()
+        prices, amounts, _ = book_side_to_arrays(orders)
+        levels = aggregate_price_levels(prices, amounts, tick, relative, side)
+
+        for item in tree.get_children():
+            self.level_orders.pop(item, None)
+        tree.delete(*tree.get_children())
+
+        # Einzelorders pro Stufe für den Drill-down gruppieren
+        grouped_orders = [[] for _ in range(len(levels['prices']))]
+        for order, level in zip(orders, levels['order_levels']):
+            grouped_orders[level].append(order)
+
+        price_format = ",.4f" if relative or tick < 0.01 else ",.2f"
+        for index in range(len(levels['prices'])):
+            item = tree.insert('', 'end', values=(
+                f"{levels['prices'][index]:{price_format}} €",
+                f"{levels['amounts'][index]:.8f} {currency_symbol}",
+                "",
+                "",
+                "",
+                int(levels['counts'][index]),
+                f"{levels['cumulative'][index]:.8f} {currency_symbol}"
+            ))
+            self.level_orders[item] = grouped_orders[index]
+
     def update_from_database(self):
         """Update orderbook data from database"""
         if not self.db_manager:
@@ -754,25 +1109,14 @@ class OrderbookTab:
                 
         try:
             pair = self.get_selected_pair_api_value()
-            total_orders = self.db_manager.check_orders(pair)
-            data = self.db_manager.get_orderbook(pair)
+            data = self.orderbook_cache.get_orderbook(pair, filters=self.get_filters())
             self.update_orderbook(data)
         except Exception as e:
             self.logger.error(f"Error updating from database: {str(e)}")
 
-    def flash_item(self, tree, item, color):
-        """Apply flash effect to a tree item"""
-        original_tags = tree.item(item, 'tags')
-        tree.tag_configure('flash_green', background='#90EE90')  # Light green
-        tree.tag_configure('flash_red', background='#FFB6C1')    # Light red
-        
-        if color == 'green':
-            tree.item(item, tags=('flash_green',))
-        elif color == 'red':
-            tree.item(item, tags=('flash_red',))
-        
-        # Schedule removal of flash effect
-        tree.after(self.flash_duration, lambda: tree.item(item, tags=original_tags))
+    def flash_item(self, tree, item, color, remove=False):
+        """Apply flash effect to a tree item (removed when the highlight expires if remove=True)"""
+        self.highlighters[tree].highlight(item, color, remove)
     
     def update_orderbook(self, data):
         """Update the orderbook display"""
@@ -781,10 +1125,23 @@ class OrderbookTab:
             orderbook = data.get('orders', {})
             currency_symbol = self.get_selected_currency_symbol()
             current_pair = self.get_selected_pair_api_value()
+
+            if current_pair != self.current_pair:
+                self.depth_book.reset()
+            self.update_depth_book(current_pair, data)
     
             # Create sets of current orders
             current_asks = {(float(ask[0]), float(ask[1])) for ask in orderbook.get('asks', []) if len(ask) >= 2}
             current_bids = {(float(bid[0]), float(bid[1])) for bid in orderbook.get('bids', []) if len(bid) >= 2}
+
+            # Aggregated view: one row per price level instead of one row per order
+            if self.is_aggregated():
+                self.update_aggregated_side(self.asks_tree, orderbook.get('asks', []), 'asks', currency_symbol)
+                self.update_aggregated_side(self.bids_tree, orderbook.get('bids', []), 'bids', currency_symbol)
+                self.current_pair = current_pair
+                self.previous_orders['asks'] = current_asks
+                self.previous_orders['bids'] = current_bids
+                return
     
             # Find deleted orders (present in previous but not in current)
             deleted_asks = self.previous_orders['asks'] - current_asks
@@ -798,8 +1155,7 @@ class OrderbookTab:
                     f"{amount:.8f} {currency_symbol}",
                     f"{total:,.2f} €"
                 ))
-                self.flash_item(self.asks_tree, item, 'red')
-                self.asks_tree.after(self.flash_duration, lambda item=item: self.asks_tree.delete(item))
+                self.flash_item(self.asks_tree, item, 'red', remove=True)
     
             for price, amount in deleted_bids:
                 total = price * amount
@@ -808,16 +1164,16 @@ class OrderbookTab:
                     f"{amount:.8f} {currency_symbol}",
                     f"{total:,.2f} €"
                 ))
-                self.flash_item(self.bids_tree, item, 'red')
-                self.bids_tree.after(self.flash_duration, lambda item=item: self.bids_tree.delete(item))
+                self.flash_item(self.bids_tree, item, 'red', remove=True)
     
             # Clear existing items (except the ones being deleted)
-            for item in self.asks_tree.get_children():
-                if not self.asks_tree.item(item, 'tags'):  # Only delete items without flash tags
-                    self.asks_tree.delete(item)
-            for item in self.bids_tree.get_children():
-                if not self.bids_tree.item(item, 'tags'):
-                    self.bids_tree.delete(item)
+            for tree in (self.asks_tree, self.bids_tree):
+                highlighter = self.highlighters[tree]
+                stale_items = [item for item in tree.get_children() if not highlighter.is_pending_removal(item)]
+                for item in stale_items:
+                    highlighter.forget(item)
+                    self.order_ids.pop(item, None)
+                tree.delete(*stale_items)
     
             # Process new asks
             sorted_asks = sorted(current_asks, key=lambda x: x[0])  # Sort by price
@@ -864,13 +1220,117 @@ class OrderbookTab:
         except Exception as e:
             self.logger.error(f"Error updating orderbook display: {str(e)}")
               
+    def schedule_depth_redraw(self):
+        """Redraw the depth chart at a fixed rate, independent of the data updates"""
+        try:
+            self.redraw_depth_chart()
+            self.update_mirror_status()
+        except Exception as e:
+            self.logger.error(f"Error drawing depth chart: {str(e)}")
+        self.depth_after_id = self.parent.after(OrderbookSettings.DEPTH_REDRAW_INTERVAL_MS, self.schedule_depth_redraw)
+
+    def update_mirror_status(self):
+        """Show how old the local mirror copy of the selected pair is"""
+        status = self.orderbook_cache.get_source_status(self.get_selected_pair_api_value())
+        if status is None:
+            return
+        if status['age'] is None:
+            text, color = "Lokaler Spiegel: wird geladen", 'orange'
+        elif status['stale']:
+            text, color = f"Lokaler Spiegel: veraltet ({status['age']:.0f} s)", 'red'
+        else:
+            text, color = f"Lokaler Spiegel: {status['age']:.1f} s", ''
+        self.mirror_status_label.configure(text=text, foreground=color)
+
+    def update_depth_book(self, pair, data):
+        """Update the depth book with the mirror deltas (only changed orders touch the arrays) or load the snapshot"""
+        # Die Deltas des Spiegels sind ungefiltert - mit aktiven Filtern wird der Snapshot geladen
+        if not self.get_filters():
+            changes = self.orderbook_cache.get_changes(pair, self.depth_book.source_version)
+            if changes is not None:
+                version, deltas = changes
+                for added, removed in deltas:
+                    self.depth_book.apply_delta(added, removed)
+                self.depth_book.source_version = version
+                return
+            self.depth_book.load(data.get('orders', {}), data.get('version'))
+        else:
+            self.depth_book.load(data.get('orders', {}))
+
+    def get_depth_curve(self, side):
+        """Get the cumulative depth curve of one side, limited to the configured price range"""
+        prices, cumulative = self.depth_book.curve(side, OrderbookSettings.DEPTH_MAX_LEVELS)
+        if len(prices):
+            in_range = np.abs(prices / prices[0] - 1.0) <= OrderbookSettings.DEPTH_PRICE_RANGE
+            count = int(np.argmin(in_range)) if not in_range.all() else len(prices)
+            prices, cumulative = prices[:count], cumulative[:count]
+        return prices, cumulative
+
+    def redraw_depth_chart(self):
+        """Move the depth polylines to the current curves if the book has changed"""
+        if self.depth_version_drawn == self.depth_book.version:
+            return
+        self.depth_version_drawn = self.depth_book.version
+
+        width = self.depth_canvas.winfo_width()
+        height = self.depth_canvas.winfo_height()
+        margin = 10
+        curves = {side: self.get_depth_curve(side) for side in ('bids', 'asks')}
+        all_prices = [prices for prices, _ in curves.values() if len(prices)]
+        if not all_prices or width <= 2 * margin or height <= 2 * margin:
+            for line in self.depth_lines.values():
+                self.depth_canvas.coords(line, 0, 0, 0, 0)
+            self.depth_canvas.itemconfigure(self.depth_text, text="")
+            return
+
+        low = min(prices.min() for prices in all_prices)
+        high = max(prices.max() for prices in all_prices)
+        price_span = (high - low) or 1.0
+        max_cumulative = max(cumulative[-1] for _, cumulative in curves.values() if len(cumulative)) or 1.0
+
+        for side, (prices, cumulative) in curves.items():
+            if not len(prices):
+                self.depth_canvas.coords(self.depth_lines[side], 0, 0, 0, 0)
+                continue
+            # Treppenkurve: (p0, 0), (p0, c0), (p1, c0), (p1, c1), ...
+            xs = np.repeat(prices, 2)
+            ys = np.concatenate(([0.0], np.repeat(cumulative, 2)[:-1]))
+            xs = margin + (xs - low) / price_span * (width - 2 * margin)
+            ys = height - margin - ys / max_cumulative * (height - 2 * margin)
+            self.depth_canvas.coords(self.depth_lines[side], *np.column_stack((xs, ys)).ravel())
+
+        self.depth_canvas.itemconfigure(
+            self.depth_text,
+            text=f"{low:,.2f} € - {high:,.2f} €   max. {max_cumulative:.4f} {self.get_selected_currency_symbol()}"
+        )
+
+    def get_orderbook_watermark(self):
+        """Change marker of the orderbook table for the selected pair"""
+        if not self.db_manager:
+            return None
+        pair = self.get_selected_pair_api_value()
+        return (pair, filters_key(self.get_filters()), self.orderbook_cache.get_watermark(pair))
+
     def start_auto_updates(self):
         """Start automatic updates from database"""
+        if self.poll_scheduler:
+            self.poll_scheduler.register(
+                'orderbook',
+                self.update_from_database,
+                PollSettings.ORDERBOOK_BASE_MS,
+                PollSettings.ORDERBOOK_MIN_MS,
+                PollSettings.ORDERBOOK_MAX_MS,
+                watermark=self.get_orderbook_watermark,
+                tab_frame=self.parent
+            )
+            return
         self.update_from_database()
         self.after_id = self.parent.after(self.update_interval, self.start_auto_updates)
 
     def stop_auto_updates(self):
         """Stop automatic updates"""
+        if self.poll_scheduler:
+            self.poll_scheduler.unregister('orderbook')
         if hasattr(self, 'after_id'):
             self.parent.after_cancel(self.after_id)
 
@@ -878,6 +1338,7 @@ class OrderbookTab:
         """Update the database manager and restart automatic updates"""
         self.stop_auto_updates()
         self.db_manager = db_manager
+        self.orderbook_cache.set_db_manager(db_manager)
         if self.db_manager:
             self.start_auto_updates()
 
@@ -2072,16 +2533,98 @@ from tkinter import ttk, StringVar, IntVar, BooleanVar, messagebox
 from ttkbootstrap.constants import *
 from datetime import datetime, timedelta, timezone
 import time
-from constants import TradingPairs  
-import threading
+from constants import TradingPairs, TradeBotSettings, ConsoleSettings
+from orderbook_cache import OrderbookCache
+from bot_engine import BotEngine, BotSettings
+from collections import deque
+import queue
+import re
+
+class ConsoleHandler(logging.Handler):
+    """
+    Logging handler for a Tk Text console, safe to use from any thread.
+    emit() formats the record in the logging thread and only queues the line; a Tk timer
+    drains the queue in the GUI thread and inserts all waiting lines with one insert call.
+    The console keeps at most max_lines lines.
+    """
+
+    def __init__(self, console, keywords=None, max_lines=ConsoleSettings.MAX_LINES, drain_ms=ConsoleSettings.DRAIN_MS):
+        super().__init__()
+        self.console = console
+        self.max_lines = max_lines
+        self.drain_ms = drain_ms
+        self.queue = queue.SimpleQueue()
+        # Ein regulärer Ausdruck für alle Schlüsselwörter statt einer Schleife pro Zeile
+        self.highlight = re.compile('|'.join(re.escape(keyword) for keyword in keywords)) if keywords else None
+        self.console.tag_configure("bold", font=("Helvetica", 10, "bold"))
+        self.after_id = self.console.after(self.drain_ms, self.drain)
+
+    def emit(self, record):
+        try:
+            msg = self.format(record) + '\n'
+            # Wert nach dem ": " fett darstellen, wenn die Nachricht ein Schlüsselwort enthält
+            if self.highlight and self.highlight.search(msg):
+                parts = msg.split(": ")
+                if len(parts) == 2:
+                    self.queue.put(((parts[0] + ": ", ()), (parts[1], ("bold",))))
+                    return
+            self.queue.put(((msg, ()),))
+        except Exception:
+            self.handleError(record)
+
+    def drain(self):
+        """Insert all queued lines (GUI thread)"""
+        lines = deque(maxlen=self.max_lines)  # ältere Zeilen würden sofort wieder entfernt
+        received = 0
+        try:
+            while True:
+                lines.append(self.queue.get_nowait())
+                received += 1
+        except queue.Empty:
+            pass
+
+        if lines:
+            try:
+                args = []
+                if received > len(lines):
+                    args.extend((f"... {received - len(lines)} Zeilen übersprungen ...\n", ()))
+                for segments in lines:
+                    for text, tags in segments:
+                        args.extend((text, tags))
+                state = self.console.cget('state')
+                self.console.configure(state='normal')
+                self.console.insert('end', *args)
+                excess = int(self.console.index('end-1c').split('.')[0]) - 1 - self.max_lines
+                if excess > 0:
+                    self.console.delete('1.0', f'{excess + 1}.0')
+                self.console.configure(state=state)
+                self.console.see('end')
+            except tk.TclError:
+                self.after_id = None
+                return  # Konsole wurde geschlossen
+        self.after_id = self.console.after(self.drain_ms, self.drain)
+
+    def close(self):
+        if self.after_id is not None:
+            try:
+                self.console.after_cancel(self.after_id)
+            except tk.TclError:
+                pass
+            self.after_id = None
+        super().close()
 
 class TradeBotTab:
-    def __init__(self, parent, logger, api_client, db_manager):
+    def __init__(self, parent, logger, api_client, db_manager, orderbook_cache=None, bot_engine=None):
         self.parent = parent
         self.logger = logging.getLogger("TradeBotLogger")  # Neuer Logger für den Trade-Bot
         self.logger.setLevel(logging.INFO)  # Setze das Log-Level
         self.api_client = api_client
         self.db_manager = db_manager
+        # Gemeinsamer Orderbuch-Cache: ein Bot-Durchlauf fragt das Orderbuch nur einmal ab
+        self.orderbook_cache = orderbook_cache or OrderbookCache(db_manager, self.logger)
+        # Die Bots laufen in der BotEngine (mehrere Instanzen, ein Scheduler), der Tab ist nur die Steuerung
+        self.bot_engine = bot_engine or BotEngine(api_client, self.orderbook_cache, self.logger)
+        self.refresh_after_id = None
     
         # Variablen für die Einstellungen des Bots
         self.selected_pair = StringVar(value=TradingPairs.DISPLAY_NAMES[TradingPairs.BTCEUR])
@@ -2243,6 +2786,42 @@ class TradeBotTab:
         self.stop_button = ttk.Button(self.controls_frame, text="Bot Stoppen", command=self.stop_bot, state="disabled")
         self.stop_button.pack(side='left', padx=5, pady=10)
 
+        self.remove_button = ttk.Button(self.controls_frame, text="Bot Entfernen", command=self.remove_bot)
+        self.remove_button.pack(side='left', padx=5, pady=10)
+
+        # Latenz je Durchlauf (p50/p95 in der Konsole, alle Messwerte als CSV)
+        self.latency_button = ttk.Button(self.controls_frame, text="Latenz anzeigen", command=self.bot_engine.log_latency)
+        self.latency_button.pack(side='left', padx=5, pady=10)
+
+        self.latency_export_button = ttk.Button(self.controls_frame, text="Latenz exportieren", command=self.export_latency)
+        self.latency_export_button.pack(side='left', padx=5, pady=10)
+
+        # Einstellungen als Konfiguration für bot_runner.py (Bot ohne GUI, z.B. auf dem Server)
+        self.save_config_button = ttk.Button(self.controls_frame, text="Konfiguration speichern", command=self.save_bot_config)
+        self.save_config_button.pack(side='left', padx=5, pady=10)
+
+        # Liste der Bot-Instanzen (Stoppen/Entfernen wirkt auf die Auswahl)
+        bots_frame = ttk.LabelFrame(self.main_frame, text="Laufende Bots", padding="5")
+        bots_frame.pack(fill='x', padx=5, pady=5)
+
+        columns = ('name', 'pair', 'type', 'status', 'price', 'iterations', 'orders', 'gap', 'errors')
+        self.bot_tree = ttk.Treeview(bots_frame, columns=columns, show='headings', height=4)
+        headings = {
+            'name': ("Bot", 160),
+            'pair': ("Handelspaar", 90),
+            'type': ("Typ", 50),
+            'status': ("Status", 140),
+            'price': ("Eigener Preis", 100),
+            'iterations': ("Durchläufe", 80),
+            'orders': ("Orders", 60),
+            'gap': ("Lücke (ms)", 80),
+            'errors': ("Fehler", 60)
+        }
+        for column, (text, width) in headings.items():
+            self.bot_tree.heading(column, text=text)
+            self.bot_tree.column(column, width=width, anchor='center')
+        self.bot_tree.pack(fill='x', expand=True)
+
         # Logging-Konsole hinzufügen
         console_frame = ttk.LabelFrame(self.main_frame, text="TradeBot Logs", padding="5")
         console_frame.pack(fill='both', expand=True, padx=5, pady=5)
@@ -2266,64 +2845,38 @@ class TradeBotTab:
         self.order_interval = IntVar(value=15)  # Standardwert: 5 Sekunden
         self.order_interval_entry = ttk.Entry(time_settings_frame, textvariable=self.order_interval, width=5)
         self.order_interval_entry.pack(side='left', padx=5)
+
+        # Add debounce setting for top-of-book changes
+        ttk.Label(time_settings_frame, text="Entprellung (ms):").pack(side='left', padx=5)
+        self.debounce_ms = IntVar(value=TradeBotSettings.TOP_OF_BOOK_DEBOUNCE_MS)
+        self.debounce_entry = ttk.Entry(time_settings_frame, textvariable=self.debounce_ms, width=5)
+        self.debounce_entry.pack(side='left', padx=5)
     
         # Logging-Handler hinzufügen
         self.add_console_handler()
 
+        self.schedule_bot_list_refresh()
+
     def add_console_handler(self):
-        """Fügt einen benutzerdefinierten Logging-Handler für die TradeBot-Konsole hinzu."""
-        class ConsoleHandler(logging.Handler):
-            def __init__(self, console):
-                super().__init__()
-                self.console = console
-    
-            def emit(self, record):
-                msg = self.format(record) + '\n'
-                self.console.configure(state='normal')  # Aktivieren des Schreibens
-    
-                # Schlüsselwörter, die fett dargestellt werden sollen
-                keywords = ["Höchster Ankaufs-Preis",
-                            "Niedrigster Verkaufs-Preis", 
-                            "Order erfolgreich erstellt", 
-                            "Aktueller Preis",
-                            "Nächstniedriger Preis im Orderbuch",
-                            "Nächsthöherer Preis im Orderbuch",
-                            "Lösche bestehendes Order",
-                            "Order erfolgreich gelöscht", 
-                            "neuer Preis"]
-    
-                # Prüfen, ob die Nachricht eines der Schlüsselwörter enthält
-                for keyword in keywords:
-                    if keyword in msg:
-                        # Fett formatieren
-                        self.console.tag_configure("bold", font=("Helvetica", 10, "bold"))
-    
-                        # Teile die Nachricht in normale und fett formatierte Teile
-                        parts = msg.split(": ")
-                        if len(parts) == 2:
-                            # Erster Teil (normaler Text)
-                            self.console.insert('end', parts[0] + ": ")
-    
-                            # Zweiter Teil (fett formatierter Wert)
-                            self.console.insert('end', parts[1], "bold")
-                        else:
-                            # Falls die Nachricht nicht wie erwartet formatiert ist, normal einfügen
-                            self.console.insert('end', msg)
-                        break
-                else:
-                    # Normale Nachricht
-                    self.console.insert('end', msg)
-    
-                self.console.configure(state='disabled')  # Deaktivieren des Schreibens
-                self.console.see('end')  # Scrollen zum Ende
-    
+        """Fügt einen Logging-Handler für die TradeBot-Konsole hinzu (gepuffert, aus jedem Thread nutzbar)."""
+        # Schlüsselwörter, deren Wert fett dargestellt wird
+        keywords = ["Höchster Ankaufs-Preis",
+                    "Niedrigster Verkaufs-Preis",
+                    "Order erfolgreich erstellt",
+                    "Aktueller Preis",
+                    "Nächstniedriger Preis im Orderbuch",
+                    "Nächsthöherer Preis im Orderbuch",
+                    "Lösche bestehendes Order",
+                    "Order erfolgreich gelöscht",
+                    "neuer Preis"]
+
         # Erstellen und Konfigurieren des Handlers
-        console_handler = ConsoleHandler(self.console)
-        console_handler.setLevel(logging.DEBUG)  # Nur INFO und höher loggen
-        console_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
-    
+        self.console_handler = ConsoleHandler(self.console, keywords=keywords)
+        self.console_handler.setLevel(logging.DEBUG)
+        self.console_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+
         # Hinzufügen des Handlers zum TradeBotLogger
-        self.logger.addHandler(console_handler)
+        self.logger.addHandler(self.console_handler)
 
     def on_trade_type_changed(self, _):
         """Handle trade type changes"""
@@ -2417,7 +2970,7 @@ class TradeBotTab:
         return future_date_with_tz.isoformat()
   
     def start_bot(self):
-        """Startet den Trade-Bot mit Sicherheitsabfrage."""
+        """Startet eine neue Bot-Instanz mit Sicherheitsabfrage."""
         # Sammle die aktuellen Einstellungen
         settings_summary = (
             f"Handelspaar: {self.selected_pair.get()}\n"
@@ -2441,340 +2994,155 @@ class TradeBotTab:
         if not confirm:
             self.logger.info("Bot-Start abgebrochen durch den Benutzer.")
             return
-    
-        # Starte den Bot, wenn der Benutzer bestätigt hat
-        self.logger.info("Trade-Bot gestartet.")
-        self.start_button.configure(state="disabled")
-        self.stop_button.configure(state="normal")
-    
-        # Starte die Handelslogik in einem separaten Thread
-        self.bot_running = True
-        threading.Thread(target=self.run_bot_logic, daemon=True).start()
-    
-    def run_bot_logic(self):
-        """Führt die Handelslogik aus, solange der Bot läuft."""
-        while self.bot_running:
-            try:
-                # Warte, bis ein eigenes Order erstellt wurde
-                if not hasattr(self, 'own_order') or not self.own_order:
-                    self.logger.info("Kein eigenes Order vorhanden. Neues Order wird erstellt.")
-                    order_needed, dynamic_price = self.check_if_order_needed()
-                    if order_needed:
-                        self.execute_bot_trade(dynamic_price)
-                    else:
-                        self.logger.info("Keine neue Order erforderlich. Warte...")
-                        threading.Event().wait(self.check_interval.get())  # Wartezeit aus der GUI
-                    continue
-    
-                # Überprüfen, ob das eigene Order noch existiert
-                if not self.check_own_order_exists():
-                    self.logger.info("Das eigene Order wurde entfernt. Bot wird gestoppt.")
-                    self.stop_bot()
-                    break
-    
-                # Überprüfen, ob eine neue Order erforderlich ist
-                order_needed, dynamic_price = self.check_if_order_needed()
-                if not order_needed:
-                    self.logger.info("Keine neue Order erforderlich. Warte...")
-                    threading.Event().wait(self.check_interval.get())  # Wartezeit aus der GUI
-                    continue
-    
-                # Handelslogik ausführen
-                self.execute_bot_trade(dynamic_price)
-    
-            except Exception as e:
-                self.logger.error(f"Fehler in der Handelslogik: {str(e)}")
-            finally:
-                # Warte eine bestimmte Zeit, bevor die nächste Order ausgeführt wird
-                threading.Event().wait(self.order_interval.get())  # Wartezeit aus der GUI
-    
-    def check_own_order_exists(self):
-        """Überprüft, ob das eigene Order noch in der Datenbank vorhanden ist."""
-        if not hasattr(self, 'own_order') or not self.own_order:
-            return False  # Kein eigenes Order vorhanden
-    
+
+        if not self.bot_engine.api_client:
+            self.logger.error("API-Client nicht konfiguriert.")
+            return
+
         try:
-            trading_pair = self.own_order.get("trading_pair")
-            order_id = self.own_order.get("order_id")
-    
-            if not trading_pair or not order_id:
-                self.logger.error("Ungültige Order-Daten. Überprüfung nicht möglich.")
-                self.own_order = None  # Zurücksetzen
-                return False
-    
-            # Hole das Orderbuch für das Handelspaar
-            orderbook = self.db_manager.get_orderbook(trading_pair)
-    
-            # Überprüfen, ob das eigene Order noch in den `bids` oder `asks` vorhanden ist
-            for order in orderbook.get('orders', {}).get('bids', []) + orderbook.get('orders', {}).get('asks', []):
-                if order[3] == order_id:  # Vergleiche die Order-ID
-                    return True  # Order existiert noch
-    
-            self.logger.info(f"Das eigene Order mit ID {order_id} wurde entfernt.")
-            self.own_order = None  # Zurücksetzen, da das Order nicht mehr existiert
-            return False
-    
-        except Exception as e:
-            self.logger.error(f"Fehler bei der Überprüfung des eigenen Orders: {str(e)}")
-            self.own_order = None  # Zurücksetzen bei Fehlern
-            return False
+            instance = self.bot_engine.add_instance(self.get_bot_settings())
+        except (ValueError, TypeError) as e:
+            self.logger.error(f"Ungültige Bot-Einstellungen: {str(e)}")
+            messagebox.showerror("Fehler", f"Ungültige Bot-Einstellungen: {str(e)}")
+            return
+
+        # Jede Instanz läuft in der gemeinsamen BotEngine (ein Scheduler für alle Bots)
+        self.bot_engine.start_instance(instance.name)
+        self.refresh_bot_list()
+
+    def get_bot_settings(self):
+        """Collect the settings of the form into a BotSettings object"""
+        trading_pair = self.pair_mapping.get(self.selected_pair.get())
+        if not trading_pair:
+            raise ValueError(f"Ungültiges Handelspaar: {self.selected_pair.get()}")
+        return BotSettings(
+            trading_pair=trading_pair,
+            trade_type=self.trade_type.get(),
+            amount=self.trade_amount.get(),
+            min_price=self.min_price.get(),
+            max_price=self.max_price.get(),
+            min_trust_level=self.min_trust_level.get(),
+            payment_option=self.payment_option.get(),
+            sepa_option=self.sepa_option.get(),
+            seat_of_bank=self.seat_of_bank.get(),
+            check_interval=self.check_interval.get(),
+            order_interval=self.order_interval.get(),
+            debounce_ms=self.debounce_ms.get()
+        )
+
+    def get_selected_bots(self):
+        """Names of the bots selected in the list"""
+        return list(self.bot_tree.selection())
 
-    def check_if_order_needed(self):
-        """Prüft, ob eine neue Order erforderlich ist."""
+    def stop_bot(self):
+        """Stoppt die ausgewählten Bot-Instanzen (ohne Auswahl: alle)."""
+        names = self.get_selected_bots() or [status['name'] for status in self.bot_engine.get_status()]
+        for name in names:
+            self.bot_engine.stop_instance(name)
+        self.refresh_bot_list()
+
+    def remove_bot(self):
+        """Stoppt und entfernt die ausgewählten Bot-Instanzen."""
+        for name in self.get_selected_bots():
+            self.bot_engine.remove_instance(name)
+        self.refresh_bot_list()
+
+    def save_bot_config(self):
+        """Save the form settings as bot_runner.py configuration (without credentials)"""
         try:
-            # Hole das aktuelle Handelspaar
-            selected_display_name = self.selected_pair.get()
-            trading_pair = self.pair_mapping.get(selected_display_name)
-            orderbook = self.db_manager.get_orderbook(trading_pair)
-    
-            # Überprüfen, ob das Orderbuch gültige Daten enthält
-            if not orderbook or 'orders' not in orderbook:
-                self.logger.info("Orderbuch ist leer. Keine Aktion erforderlich.")
-                return False, None
-    
-            # Überprüfen, ob das eigene Order bekannt ist
-            own_order = getattr(self, 'own_order', None)
-            if not own_order:
-                self.logger.info("Kein eigenes Order lokal gespeichert. Abrufen...")
-                existing_orders = self.api_client.get_orders()
-                for order in existing_orders.get('orders', []):
-                    if order['trading_pair'] == trading_pair and order['type'] == self.trade_type.get():
-                        self.own_order = order
-                        self.logger.info(f"Eigenes Order gefunden: {order['order_id']}")
-                        return False, None
-                self.logger.info("Kein eigenes Order vorhanden. Neues Order erforderlich.")
-                return True, float(self.min_price.get())  # Fallback auf `min_price`
-    
-            # Eigene Order-Daten
-            own_price = float(own_order.get('price', 0))
-            own_order_id = own_order.get('order_id')  # ID des eigenen Orders
-            trade_type = own_order['type']
-            max_price = float(self.max_price.get())
-            min_price = float(self.min_price.get())
-    
-            # Logik für Kauforders (buy)
-            if trade_type == "buy":
-                bids = orderbook['orders'].get('bids', [])
-                if not bids:
-                    self.logger.warning("Keine Kauforders ('bids') im Orderbuch verfügbar.")
-                    return False, None
-    
-                # Höchstes Gebot (ohne eigenes Order)
-                highest_bid = next((bid for bid in bids if bid[3] != own_order_id), None)
-                if not highest_bid:
-                    self.logger.info("Kein anderes Gebot im Orderbuch. Keine Aktion erforderlich.")
-                    return False, None
-    
-                highest_bid_price = float(highest_bid[0])
-                self.logger.info(f"Höchster Ankaufs-Preis im Orderbuch (ohne eigenes Order): {highest_bid_price}")
-    
-                # Prüfen, ob das eigene Order das höchste ist
-                if own_price > highest_bid_price:
-                    # Preis senken, falls möglich
-                    new_price = max(highest_bid_price + 0.01, min_price)
-                    if new_price != own_price:
-                        self.logger.info(f"Preisänderung erforderlich: Aktueller Preis {own_price}, neuer Preis {new_price}.")
-                        return True, new_price                
-                elif own_price < highest_bid_price:
-                    # Preis erhöhen, falls nötig
-                    if highest_bid_price > max_price:
-                        # Setze auf den nächsthöheren Preis innerhalb der Spanne
-                        next_highest_bid = next((bid for bid in bids if bid[3] != own_order_id and float(bid[0]) < max_price), None)
-                        if next_highest_bid:
-                            next_highest_price = float(next_highest_bid[0]) + 0.01
-                            if next_highest_price <= max_price:
-                                # Logge den nächstniedrigeren Preis, da er relevant ist
-                                self.logger.info(f"Nächstniedriger Preis im Orderbuch: {float(next_highest_bid[0])}")
-                                self.logger.info(f"Preisänderung erforderlich: Aktueller Preis {own_price}, neuer Preis {next_highest_price}.")
-                                return True, next_highest_price
-                        self.logger.info("Kein gültiger Preis innerhalb der Spanne verfügbar. Keine Aktion erforderlich.")
-                        return False, None
-                    else:
-                        new_price = min(highest_bid_price + 0.01, max_price)
-                        if new_price != own_price:
-                            self.logger.info(f"Preisänderung erforderlich: Aktueller Preis {own_price}, neuer Preis {new_price}.")
-                            return True, new_price
-                
-                self.logger.info("Das eigene Order hat bereits die beste Position. Keine Aktion erforderlich.")
-                return False, None
-    
-            # Logik für Verkaufsorders (sell)
-            elif trade_type == "sell":
-                asks = orderbook['orders'].get('asks', [])
-                if not asks:
-                    self.logger.warning("Keine Verkaufsorders ('asks') im Orderbuch verfügbar.")
-                    return False, None
-            
-                # Niedrigstes Angebot (ohne eigenes Order)
-                lowest_ask = next((ask for ask in asks if ask[3] != own_order_id), None)
-                if not lowest_ask:
-                    self.logger.info("Kein anderes Angebot im Orderbuch. Keine Aktion erforderlich.")
-                    return False, None
-            
-                lowest_ask_price = float(lowest_ask[0])
-                self.logger.info(f"Niedrigster Verkaufs-Preis im Orderbuch (ohne eigenes Order): {lowest_ask_price}")
-            
-                # Prüfen, ob das eigene Order das niedrigste ist
-                if own_price < lowest_ask_price:
-                    # Preis erhöhen, falls nötig
-                    new_price = min(lowest_ask_price - 0.01, max_price)
-                    if new_price != own_price:
-                        self.logger.info(f"Preisänderung erforderlich: Aktueller Preis {own_price}, neuer Preis {new_price}.")
-                        return True, new_price
-                elif own_price > lowest_ask_price:
-                    # Preis senken, falls möglich
-                    if lowest_ask_price < min_price:
-                        # Setze auf den nächsthöheren Preis innerhalb der Spanne
-                        next_lowest_ask = next((ask for ask in asks if ask[3] != own_order_id and float(ask[0]) > min_price), None)
-                        if next_lowest_ask:
-                            next_lowest_price = float(next_lowest_ask[0]) - 0.01
-                            if next_lowest_price >= min_price:
-                                # Logge den nächsthöheren Preis, da er relevant ist
-                                self.logger.info(f"Nächsthöherer Preis im Orderbuch: {float(next_lowest_ask[0])}")
-                                self.logger.info(f"Preisänderung erforderlich: Aktueller Preis {own_price}, neuer Preis {next_lowest_price}.")
-                                return True, next_lowest_price
-                        self.logger.info("Kein gültiger Preis innerhalb der Spanne verfügbar. Keine Aktion erforderlich.")
-                        return False, None
-                    else:
-                        new_price = max(lowest_ask_price - 0.01, min_price)
-                        if new_price != own_price:
-                            self.logger.info(f"Preisänderung erforderlich: Aktueller Preis {own_price}, neuer Preis {new_price}.")
-                            return True, new_price
-            
-                self.logger.info("Das eigene Order hat bereits die beste Position. Keine Aktion erforderlich.")
-                return False, None
-            
-            self.logger.info("Keine Aktion erforderlich.")
-            return False, None
-    
+            settings = self.get_bot_settings()
+            settings.validate()
+        except (ValueError, TypeError) as e:
+            messagebox.showerror("Fehler", f"Ungültige Bot-Einstellungen: {str(e)}")
+            return
+
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".json",
+            filetypes=[("JSON files", "*.json")],
+            initialfile="bot_runner.json"
+        )
+        if not file_path:
+            return
+        try:
+            bot = {'name': f"{settings.trading_pair}-{settings.trade_type}", **settings.to_dict()}
+            with open(file_path, 'w', encoding='utf-8') as config_file:
+                json.dump({'bots': [bot]}, config_file, indent=4)
+            self.logger.info(f"Bot-Konfiguration gespeichert: {file_path}")
         except Exception as e:
-            self.logger.error(f"Fehler bei der Überprüfung, ob eine Order erforderlich ist: {str(e)}")
-            return False, None
-  
-    def execute_bot_trade(self, dynamic_price):
-        """Führt eine Order basierend auf den aktuellen Einstellungen aus."""
-        if not self.api_client:
-            self.logger.error("API-Client nicht konfiguriert.")
+            self.logger.error(f"Fehler beim Speichern der Bot-Konfiguration: {str(e)}")
+            messagebox.showerror("Fehler", f"Fehler beim Speichern der Bot-Konfiguration: {str(e)}")
+
+    def export_latency(self):
+        """Export the latency records of all bots as CSV"""
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".csv",
+            filetypes=[("CSV files", "*.csv")],
+            initialfile=f"bot_latenz_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+        )
+        if not file_path:
             return
-    
         try:
-            # Hole das aktuelle Handelspaar
-            selected_display_name = self.selected_pair.get()
-            trading_pair = self.pair_mapping.get(selected_display_name)
-    
-            if not trading_pair:
-                self.logger.error(f"Ungültiges Handelspaar: {selected_display_name}")
-                return
-    
-            self.logger.info(f"Abfrage des Orderbuchs für Handelspaar: {trading_pair}")
-            orderbook = self.db_manager.get_orderbook(trading_pair)
-    
-            # Logge den Inhalt des Orderbuchs
-            self.logger.debug(f"Orderbuch-Daten (asks): {orderbook.get('orders', {}).get('asks', [])}")
-            self.logger.debug(f"Orderbuch-Daten (bids): {orderbook.get('orders', {}).get('bids', [])}")
-    
-            if not orderbook or 'orders' not in orderbook or 'asks' not in orderbook['orders'] or 'bids' not in orderbook['orders']:
-                self.logger.error("Orderbuch enthält keine gültigen 'asks' oder 'bids'.")
-                return
-    
-            # Sicherstellen, dass `dynamic_price` gesetzt ist
-            min_price = float(self.min_price.get())
-            if dynamic_price is None:
-                self.logger.warning("`dynamic_price` ist None. Fallback auf `min_price`.")
-                dynamic_price = min_price
-    
-            # Überprüfen, ob ein bestehendes Order vorhanden ist
-            if hasattr(self, 'own_order') and self.own_order:
-                existing_order_id = self.own_order.get("order_id")
-                existing_trading_pair = self.own_order.get("trading_pair")
-    
-                if existing_order_id and existing_trading_pair:
-                    # Lösche das bestehende Order
-                    self.logger.info(f"Lösche bestehendes Order: {existing_order_id}")
-                    delete_response = self.api_client.delete_order(existing_trading_pair, existing_order_id)
-                    if delete_response and not delete_response.get('errors'):
-                        self.logger.info(f"Bestehendes Order erfolgreich gelöscht: {existing_order_id}")
-                        self.own_order = None  # Lösche die gespeicherte Order
-                    else:
-                        error_message = delete_response.get('errors', ['Unbekannter Fehler'])[0] if delete_response else 'Keine Antwort von der API'
-                        self.logger.error(f"Fehler beim Löschen des bestehenden Orders: {error_message}")
-                        return  # Abbrechen, wenn das Löschen fehlschlägt
-    
-            # Erstelle die Order-Parameter
-            order_params = {
-                "trading_pair": trading_pair.lower(),
-                "type": self.trade_type.get(),
-                "max_amount_currency_to_trade": float(self.trade_amount.get()),
-                "price": dynamic_price,
-                "end_datetime": self.get_default_end_datetime(),
-                "min_trust_level": self.min_trust_level.get(),
-                "seat_of_bank": [self.seat_of_bank.get().split()[0]]
-            }
-    
-            # Zusätzliche Parameter für `sell`-Orders
-            if self.trade_type.get() == "sell":
-                payment_option = self.payment_option.get()
-                if payment_option > 0:
-                    order_params["payment_option"] = payment_option
-                    if payment_option in [2, 3]:  # SEPA-Only oder Express & SEPA
-                        sepa_value = self.sepa_option.get()
-                        if sepa_value is not None:
-                            order_params["sepa_option"] = sepa_value
-    
-            # Neues Order erstellen
-            self.logger.info(f"Creating order for {trading_pair}: {order_params}")
-            response = self.api_client.create_order(**order_params)
-            self.logger.debug(f"API-Antwort beim Erstellen der Order: {response}")
-            if response and 'order_id' in response and not response.get('errors'):
-                self.logger.info(f"Order erfolgreich erstellt: {response['order_id']}")
-                self.own_order = {
-                    "order_id": response['order_id'],
-                    "trading_pair": trading_pair,
-                    "type": self.trade_type.get(),
-                    "price": dynamic_price
-                }
-            else:
-                error_message = response.get('errors', ['Unbekannter Fehler'])[0] if response else 'Keine Antwort von der API'
-                self.logger.error(f"Fehler beim Erstellen der Order: {error_message}")
-    
+            rows = self.bot_engine.export_latency_csv(file_path)
+            self.logger.info(f"{rows} Latenz-Messwerte exportiert: {file_path}")
         except Exception as e:
-            self.logger.error(f"Fehler beim Ausführen der Order: {str(e)}")
+            self.logger.error(f"Fehler beim Exportieren der Latenz: {str(e)}")
+            messagebox.showerror("Fehler", f"Fehler beim Exportieren der Latenz: {str(e)}")
 
-    def stop_bot(self):
-        """Stoppt den Trade-Bot."""
-        self.logger.info("Trade-Bot wird gestoppt.")
-        self.bot_running = False  # Stoppe die Handelslogik
-    
-        # Lösche die aktive Order, falls vorhanden
-        if hasattr(self, 'own_order') and self.own_order:
-            try:
-                trading_pair = self.own_order.get("trading_pair")
-                order_id = self.own_order.get("order_id")
-    
-                if not trading_pair or not order_id:
-                    self.logger.error("Ungültige Order-Daten. Order konnte nicht gelöscht werden.")
-                    self.own_order = None  # Zurücksetzen, um den Zustand zu korrigieren
-                    return
-    
-                delete_response = self.api_client.delete_order(trading_pair, order_id)
-                if delete_response and not delete_response.get('errors'):
-                    self.logger.info(f"Order erfolgreich gelöscht: {order_id}")
-                    self.own_order = None  # Lösche die gespeicherte Order
+    def refresh_bot_list(self):
+        """Show status and metrics of all bot instances"""
+        try:
+            statuses = self.bot_engine.get_status()
+            names = set()
+            for status in statuses:
+                name = status['name']
+                names.add(name)
+                values = (
+                    name,
+                    status['trading_pair'],
+                    status['trade_type'],
+                    f"{status['status']} ({status['order_state']})" if status['order_state'] else status['status'],
+                    f"{status['own_price']:.2f}" if status['own_price'] is not None else "-",
+                    status['iterations'],
+                    status['orders_created'],
+                    f"{status['last_gap_ms']:.0f}" if status['last_gap_ms'] is not None else "-",
+                    status['errors']
+                )
+                if self.bot_tree.exists(name):
+                    self.bot_tree.item(name, values=values)
                 else:
-                    error_message = delete_response.get('errors', ['Unbekannter Fehler'])[0] if delete_response else 'Keine Antwort von der API'
-                    self.logger.error(f"Fehler beim Löschen der Order: {error_message}")
-                    self.own_order = None  # Zurücksetzen, auch wenn das Löschen fehlschlägt
-            except Exception as e:
-                self.logger.error(f"Fehler beim Löschen der Order: {str(e)}")
-                self.own_order = None  # Zurücksetzen, um den Zustand zu korrigieren
-    
-        # Aktualisiere die UI
-        self.start_button.configure(state="normal")
-        self.stop_button.configure(state="disabled")
-    
-        # Aktualisiere die UI
-        self.start_button.configure(state="normal")
-        self.stop_button.configure(state="disabled")
+                    self.bot_tree.insert('', 'end', iid=name, values=values)
+            for item in self.bot_tree.get_children():
+                if item not in names:
+                    self.bot_tree.delete(item)
+
+            any_running = any(status['status'] == "läuft" for status in statuses)
+            self.stop_button.configure(state="normal" if any_running else "disabled")
+        except Exception as e:
+            self.logger.error(f"Fehler beim Aktualisieren der Bot-Liste: {str(e)}")
+
+    def schedule_bot_list_refresh(self):
+        """Refresh the bot list periodically (the bots change state in their worker threads)"""
+        self.refresh_bot_list()
+        self.refresh_after_id = self.parent.after(TradeBotSettings.STATUS_REFRESH_MS, self.schedule_bot_list_refresh)
+
+    def stop(self):
+        """Stop the refresh timer and the console handler"""
+        if self.refresh_after_id:
+            try:
+                self.parent.after_cancel(self.refresh_after_id)
+            except Exception:
+                pass
+            self.refresh_after_id = None
+        if getattr(self, 'console_handler', None):
+            self.logger.removeHandler(self.console_handler)
+            self.console_handler.close()
+            self.console_handler = None
+
+    def set_api_client(self, api_client):
+        """Use a new API client for all bot instances"""
+        self.api_client = api_client
+        self.bot_engine.set_api_client(api_client)
+
 
 from tkinter import ttk, StringVar, IntVar, BooleanVar, messagebox
 from tkinter import filedialog
@@ -2908,16 +3276,6 @@ class SettingsTab:
             messagebox.showerror("Fehler", f"Fehler beim Speichern der Einstellungen: {str(e)}")
 
     def add_console_handler(self):
-        class ConsoleHandler(logging.Handler):
-            def __init__(self, console):
-                logging.Handler.__init__(self)
-                self.console = console
-
-            def emit(self, record):
-                msg = self.format(record) + '\n'
-                self.console.insert('end', msg)
-                self.console.see('end')
-
         console_handler = ConsoleHandler(self.console)
         console_handler.setLevel(logging.INFO)
         console_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))